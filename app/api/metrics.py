@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, Response
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Métricas no formato de exposição do Prometheus.
+    """
+    rendered = render_metrics()
+    if rendered is None:
+        raise HTTPException(status_code=503, detail="prometheus_client não instalado")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.schema import SearchHit
+from app.core.config import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from app.core.database import get_db
+from app.core.search import search_segments
+
+router = APIRouter()
+
+@router.get("/search", response_model=List[SearchHit])
+async def search(
+    q: str = Query(..., min_length=1, description='Termos da busca; use "aspas" para frases'),
+    transcription_id: Optional[int] = None,
+    speaker: Optional[str] = None,
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Busca textual nos segmentos de todas as transcrições (ou de uma só, com
+    transcription_id), ordenada por relevância, com o trecho encontrado destacado.
+    """
+    try:
+        return await db.run_sync(
+            search_segments, q, limit, offset, transcription_id=transcription_id, speaker=speaker
+        )
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar: {str(e)}")
@@ -0,0 +1,153 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Depends, Response
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.schema import (
+    Speaker, SpeakerEmbedding, SpeakerEnroll, SpeakerResponse, Transcription, TranscriptionSpeakerResponse
+)
+from app.core.database import get_db
+from app.core.segment_store import rename_speaker
+
+router = APIRouter()
+
+def _speaker_response(speaker: Speaker, embeddings: int) -> SpeakerResponse:
+    return SpeakerResponse(id=speaker.id, name=speaker.name, created_at=speaker.created_at, embeddings=embeddings)
+
+@router.get("/speakers", response_model=List[SpeakerResponse])
+async def list_speakers(db: AsyncSession = Depends(get_db)):
+    """
+    Lista as identidades cadastradas e a quantidade de embeddings de cada uma.
+    """
+    counts = (
+        select(SpeakerEmbedding.speaker_id, func.count(SpeakerEmbedding.id).label("embeddings"))
+        .where(SpeakerEmbedding.enrolled.is_(True))
+        .group_by(SpeakerEmbedding.speaker_id)
+        .subquery()
+    )
+    rows = (await db.execute(
+        select(Speaker, func.coalesce(counts.c.embeddings, 0))
+        .outerjoin(counts, counts.c.speaker_id == Speaker.id)
+        .order_by(Speaker.name)
+    )).all()
+    return [_speaker_response(speaker, embeddings) for speaker, embeddings in rows]
+
+def _enroll(db: Session, enrollment: SpeakerEnroll, name: str) -> SpeakerResponse:
+    """
+    Cadastro síncrono (roda com db.run_sync): copia o embedding do interlocutor
+    como cadastrado e renomeia os segmentos dele.
+    """
+    source = db.execute(
+        select(SpeakerEmbedding).where(
+            SpeakerEmbedding.transcription_id == enrollment.transcription_id,
+            SpeakerEmbedding.label == enrollment.label,
+            SpeakerEmbedding.enrolled.is_(False)
+        )
+    ).scalar_one_or_none()
+    if source is None:
+        raise HTTPException(status_code=404, detail="Interlocutor não encontrado na transcrição")
+
+    try:
+        speaker = db.execute(select(Speaker).where(Speaker.name == name)).scalar_one_or_none()
+        if speaker is None:
+            speaker = Speaker(name=name)
+            db.add(speaker)
+            db.flush()
+
+        # Nome exibido até agora nos segmentos: a identidade reconhecida ou o rótulo
+        previous = source.speaker.name if source.speaker is not None else source.label
+
+        # Recadastrar o mesmo interlocutor substitui o cadastro anterior
+        db.execute(delete(SpeakerEmbedding).where(
+            SpeakerEmbedding.transcription_id == source.transcription_id,
+            SpeakerEmbedding.label == source.label,
+            SpeakerEmbedding.enrolled.is_(True)
+        ))
+        db.add(SpeakerEmbedding(
+            transcription_id=source.transcription_id,
+            label=source.label,
+            speaker_id=speaker.id,
+            enrolled=True,
+            model=source.model,
+            dim=source.dim,
+            speech_seconds=source.speech_seconds,
+            vector=source.vector
+        ))
+        source.speaker_id = speaker.id
+        source.score = None
+
+        if previous != speaker.name:
+            rename_speaker(db, enrollment.transcription_id, previous, speaker.name)
+
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    embeddings = db.execute(
+        select(func.count(SpeakerEmbedding.id))
+        .where(SpeakerEmbedding.speaker_id == speaker.id, SpeakerEmbedding.enrolled.is_(True))
+    ).scalar()
+    return _speaker_response(speaker, embeddings)
+
+@router.post("/speakers", response_model=SpeakerResponse)
+async def enroll_speaker(enrollment: SpeakerEnroll, db: AsyncSession = Depends(get_db)):
+    """
+    Cadastra a voz de um interlocutor de uma transcrição sob um nome.
+
+    O nome é criado se ainda não existir; cadastrar vozes de várias gravações
+    sob o mesmo nome melhora o reconhecimento. Os segmentos da transcrição
+    passam a exibir o nome, e as próximas gravações com essa voz são rotuladas
+    automaticamente.
+    """
+    name = enrollment.name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="Nome inválido")
+    return await db.run_sync(_enroll, enrollment, name)
+
+@router.delete("/speakers/{speaker_id}", status_code=204)
+async def delete_speaker(speaker_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Remove uma identidade e os seus embeddings cadastrados. Os segmentos já
+    rotulados com o nome não são alterados.
+    """
+    speaker = await db.get(Speaker, speaker_id)
+    if speaker is None:
+        raise HTTPException(status_code=404, detail="Interlocutor não encontrado")
+
+    await db.execute(delete(SpeakerEmbedding).where(
+        SpeakerEmbedding.speaker_id == speaker_id, SpeakerEmbedding.enrolled.is_(True)
+    ))
+    await db.execute(
+        update(SpeakerEmbedding).where(SpeakerEmbedding.speaker_id == speaker_id).values(speaker_id=None, score=None)
+    )
+    await db.delete(speaker)
+    await db.commit()
+    return Response(status_code=204)
+
+@router.get("/transcripts/{transcription_id}/speakers", response_model=List[TranscriptionSpeakerResponse])
+async def get_transcription_speakers(transcription_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Interlocutores de uma transcrição, com a identidade reconhecida de cada um.
+    """
+    if await db.get(Transcription, transcription_id) is None:
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+
+    rows = (await db.execute(
+        select(SpeakerEmbedding, Speaker.name)
+        .outerjoin(Speaker, Speaker.id == SpeakerEmbedding.speaker_id)
+        .where(SpeakerEmbedding.transcription_id == transcription_id, SpeakerEmbedding.enrolled.is_(False))
+        .order_by(SpeakerEmbedding.label)
+    )).all()
+    return [
+        TranscriptionSpeakerResponse(
+            label=embedding.label,
+            speaker_id=embedding.speaker_id,
+            name=name,
+            score=embedding.score,
+            speech_seconds=embedding.speech_seconds
+        )
+        for embedding, name in rows
+    ]
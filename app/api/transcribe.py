@@ -1,152 +1,750 @@
+import base64
+import contextlib
+import hashlib
+import json
+import logging
 import os
-import shutil
+import threading
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from starlette.websockets import WebSocketState
 
-from app.core.audio_utils import extract_audio_from_video, convert_to_mono, normalize_audio
-from app.core.transcription import WhisperTranscriber
-from app.core.diarization import SpeakerDiarizer
-from app.models.schema import Transcription, TranscriptionSegment, TranscriptionCreate, TranscriptionResponse
-from app.core.database import get_db
+from app.models.schema import (
+    Transcription, TranscriptionJob, TranscriptionSegment, TranscriptionCreate, TranscriptionResponse,
+    TranscriptionSegmentResponse, TranscriptionMetricsResponse
+)
+from app.core.database import AsyncSessionLocal, SessionLocal, get_db
+from app.core.config import (
+    WHISPER_MODEL_SIZE, WHISPER_ALLOWED_MODELS, WHISPER_BACKEND, WHISPER_ALLOWED_BACKENDS,
+    TRANSCRIPTION_LANGUAGE, DIARIZATION_MODEL,
+    MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES, LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT,
+    SEGMENTS_DEFAULT_LIMIT, SEGMENTS_MAX_LIMIT, EXPORT_BATCH_SIZE, EVENTS_KEEPALIVE_SECONDS,
+    AUDIO_SAMPLE_RATE, STREAMING_MAX_SESSIONS, SCHEDULER_INTERACTIVE_MAX_SECONDS, WHISPER_WORD_TIMESTAMPS
+)
+from app.core.artifacts import stored_audio
+from app.core.checkpoints import resolve_path
+from app.core.export import EXPORT_MEDIA_TYPES, export_segments
+from app.core.events import TERMINAL_STATUSES, get_broker, publish_event
+from app.core.ingest import MediaIngest, MultipartIngest, UploadRejected
+from app.core.jobs import enqueue_job, find_cached_transcription
+from app.core.scheduler import (
+    DEFAULT_TENANT, PRIORITY_CLASSES, AdmissionRejected, check_admission, default_priority, estimate_cost
+)
+from app.core.segment_store import decode_words
+from app.core.storage import store
+from app.core.streaming import STREAM_FORMATS, StreamingSession
 
 router = APIRouter()
 
-# Configura os caminhos
-VIDEOS_DIR = "videos"
-TRANSCRIPTS_DIR = "transcripts"
+logger = logging.getLogger(__name__)
 
-# Inicializa os componentes
-transcriber = WhisperTranscriber()
-diarizer = SpeakerDiarizer()
+# Folga para cabeçalhos e campos do multipart na checagem do Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
-@router.post("/transcribe", response_model=TranscriptionResponse)
-async def upload_and_transcribe(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    db: Session = get_db()
-):
+# As rotas usam a sessão assíncrona (AsyncSession), sem ocupar threads
+# enquanto esperam o banco; funções síncronas que recebem uma Session rodam
+# com db.run_sync. O processamento pesado roda nos workers (python -m app.worker).
+
+def _register_upload(db: Session, media: MediaIngest, model_size: str, backend: str,
+                     priority: Optional[str], tenant_id: str) -> Transcription:
     """
-    Faz upload de um arquivo de vídeo e inicia o processo de transcrição.
+    Registra a transcrição de um upload ingerido e a coloca na fila.
+
+    Raises:
+        AdmissionRejected: Se o custo estimado do job não cabe na fila (ver app.core.scheduler)
     """
     try:
-        # Cria diretórios se não existirem
-        os.makedirs(VIDEOS_DIR, exist_ok=True)
-        os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
-        
-        # Salva o vídeo enviado
-        video_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        video_path = os.path.join(VIDEOS_DIR, video_filename)
-        
-        with open(video_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Com a duração conhecida, confirma a admissão pelo custo estimado, na
+        # mesma classe em que o job será enfileirado
+        priority = priority or default_priority(media.duration)
+        try:
+            check_admission(db, tenant_id, priority, estimate_cost(media.duration, model_size, backend))
+        except AdmissionRejected:
+            _discard_media(db, media)
+            raise
         
         # Cria registro de transcrição
         transcription = Transcription(
-            video_filename=video_filename,
-            audio_filename="",  # Será atualizado após o processamento
+            video_filename=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{media.filename}",
+            audio_filename=store.relative_path(media.audio_path),
             transcript_filename="",  # Será atualizado após o processamento
-            status="processing"
+            status="queued",
+            model_size=model_size,
+            whisper_backend=backend,
+            content_hash=media.content_hash,
+            language=TRANSCRIPTION_LANGUAGE,
+            diarization_model=DIARIZATION_MODEL,
+            word_timestamps=WHISPER_WORD_TIMESTAMPS
         )
         db.add(transcription)
-        db.commit()
-        db.refresh(transcription)
+        db.flush()
         
-        # Inicia processamento em segundo plano
-        background_tasks.add_task(
-            process_transcription,
-            video_path,
-            transcription.id,
-            db
+        # Enfileira o processamento na mesma transação do registro
+        enqueue_job(
+            db, transcription, media.video_path,
+            media_seconds=media.duration, priority=priority, tenant_id=tenant_id
         )
-        
+        db.commit()
+        db.refresh(transcription)
         return transcription
-    except Exception as e:
+    except Exception:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        file.file.close()
+        raise
 
-async def process_transcription(video_path: str, transcription_id: int, db: Session):
+def _discard_media(db: Session, media: MediaIngest) -> None:
     """
-    Processa a transcrição do vídeo em segundo plano.
+    Remove do armazenamento o áudio e o vídeo de um upload recusado, se
+    nenhuma outra transcrição usa o mesmo conteúdo.
     """
+    in_use = db.query(Transcription.id).filter(Transcription.content_hash == media.content_hash).first()
+    if in_use is not None:
+        return
+    for path in (media.audio_path, media.video_path):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+@router.post("/transcribe", response_model=TranscriptionResponse)
+async def upload_and_transcribe(
+    request: Request,
+    model_size: Optional[str] = None,
+    backend: Optional[str] = None,
+    filename: Optional[str] = None,
+    priority: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Faz upload de um arquivo de vídeo e coloca a transcrição na fila de processamento.
+    
+    Aceita multipart/form-data (campo "file" e, opcionalmente, "model_size" e
+    "backend") ou o vídeo bruto no corpo, com o nome em ?filename=.
+    O backend de inferência do Whisper (reference, int8 ou ctranslate2) deve
+    estar em WHISPER_ALLOWED_BACKENDS; por padrão, WHISPER_BACKEND. O corpo é processado em
+    fluxo: o áudio é extraído enquanto o upload chega e os limites de tamanho e
+    duração são aplicados sem esperar o arquivo completo.
+
+    A classe de prioridade (interactive, standard ou batch; campo ou
+    ?priority=) padrão depende da duração, e o inquilino vem do cabeçalho
+    X-Tenant-Id. Com a fila saturada o upload é recusado com 429 ou 503 e
+    Retry-After (ver app.core.scheduler).
+    """
+    tenant_id = request.headers.get("x-tenant-id") or DEFAULT_TENANT
+    if priority is not None and priority not in PRIORITY_CLASSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Prioridade inválida. Opções: {', '.join(PRIORITY_CLASSES)}"
+        )
+    # Recusa cedo, antes de receber o corpo, quando nem um job mínimo seria admitido
     try:
-        # Atualiza o status da transcrição
-        transcription = db.query(Transcription).filter(Transcription.id == transcription_id).first()
-        if not transcription:
-            return
-        
-        # Extrai o áudio
-        audio_filename = extract_audio_from_video(video_path, VIDEOS_DIR)
-        transcription.audio_filename = audio_filename
-        db.commit()
-        
-        # Converte para mono e normaliza
-        audio_path = os.path.join(VIDEOS_DIR, audio_filename)
-        mono_path = convert_to_mono(audio_path)
-        normalized_path = normalize_audio(mono_path)
-        
-        # Transcreve o áudio
-        transcription_result = transcriber.transcribe_audio(normalized_path)
-        transcript_filename = transcriber.save_transcription(transcription_result, TRANSCRIPTS_DIR)
-        transcription.transcript_filename = transcript_filename
-        db.commit()
-        
-        # Realiza a diarização
-        diarization_segments = diarizer.diarize_audio(normalized_path)
-        transcription_segments = transcriber.process_segments(transcription_result)
-        final_segments = diarizer.assign_speakers_to_segments(transcription_segments, diarization_segments)
+        await db.run_sync(check_admission, tenant_id, priority or "interactive")
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+
+    content_length = int(request.headers.get("content-length") or 0)
+    if MAX_UPLOAD_BYTES and content_length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Arquivo excede o limite de {MAX_UPLOAD_BYTES} bytes")
+    
+    content_type = request.headers.get("content-type", "")
+    ingest = None
+    try:
+        if content_type.startswith("multipart/form-data"):
+            ingest = await run_in_threadpool(MultipartIngest, content_type)
+        else:
+            ingest = await run_in_threadpool(MediaIngest, filename or "upload")
         
-        # Salva os segmentos no banco de dados
-        for segment in final_segments:
-            db_segment = TranscriptionSegment(
-                transcription_id=transcription_id,
-                start_time=segment['start_time'],
-                end_time=segment['end_time'],
-                speaker=segment['speaker'],
-                text=segment['text']
+        # Agrupa os blocos da rede para reduzir as trocas com o threadpool
+        buffer = bytearray()
+        async for chunk in request.stream():
+            buffer.extend(chunk)
+            if len(buffer) >= UPLOAD_CHUNK_BYTES:
+                await run_in_threadpool(ingest.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(ingest.write, bytes(buffer))
+        await run_in_threadpool(ingest.finish)
+    except UploadRejected as e:
+        if ingest is not None:
+            await run_in_threadpool(ingest.abort)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        if ingest is not None:
+            await run_in_threadpool(ingest.abort)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if isinstance(ingest, MultipartIngest):
+        media = ingest.media
+        model_size = ingest.fields.get("model_size") or model_size
+        backend = ingest.fields.get("backend") or backend
+        priority = ingest.fields.get("priority") or priority
+    else:
+        media = ingest
+    model_size = model_size or WHISPER_MODEL_SIZE
+    backend = backend or WHISPER_BACKEND
+
+    try:
+        if model_size not in WHISPER_ALLOWED_MODELS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Modelo inválido. Opções: {', '.join(WHISPER_ALLOWED_MODELS)}"
             )
-            db.add(db_segment)
-        
-        # Atualiza o status da transcrição
-        transcription.status = "completed"
-        db.commit()
-        
+        if backend not in WHISPER_ALLOWED_BACKENDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Backend inválido. Opções: {', '.join(WHISPER_ALLOWED_BACKENDS)}"
+            )
+        if priority is not None and priority not in PRIORITY_CLASSES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Prioridade inválida. Opções: {', '.join(PRIORITY_CLASSES)}"
+            )
+
+        # Mesmo conteúdo com as mesmas configurações: devolve o resultado
+        # existente assim que o hash é conhecido, sem esperar o áudio nem
+        # gravar no armazenamento
+        cached = await db.run_sync(
+            find_cached_transcription, media.content_hash, model_size,
+            TRANSCRIPTION_LANGUAGE, DIARIZATION_MODEL, backend
+        )
+        if cached:
+            await run_in_threadpool(media.abort)
+            return cached
+
+        await run_in_threadpool(media.decode)
+        if priority == "interactive" and media.duration > SCHEDULER_INTERACTIVE_MAX_SECONDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A prioridade interactive é limitada a mídias de até {SCHEDULER_INTERACTIVE_MAX_SECONDS:g} s"
+            )
+        await run_in_threadpool(media.save)
+    except UploadRejected as e:
+        await run_in_threadpool(media.abort)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        await run_in_threadpool(media.abort)
+        raise
     except Exception as e:
-        # Atualiza o status da transcrição para falha
-        transcription = db.query(Transcription).filter(Transcription.id == transcription_id).first()
-        if transcription:
-            transcription.status = "failed"
-            db.commit()
+        await run_in_threadpool(media.abort)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/transcripts", response_model=List[TranscriptionResponse])
-async def list_transcriptions(db: Session = get_db()):
+    try:
+        transcription = await db.run_sync(
+            _register_upload, media, model_size, backend, priority, tenant_id
+        )
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Com PostgreSQL a publicação é um NOTIFY pelo engine síncrono
+    await run_in_threadpool(_publish_queued, transcription.id, media)
+    return transcription
+
+def _admission_error(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+def _publish_queued(transcription_id: int, media: MediaIngest) -> None:
+    publish_event(transcription_id, "upload", "completed", bytes=media.size, duration=media.duration)
+    publish_event(transcription_id, "job", "queued")
+
+def _encode_cursor(*values) -> str:
+    payload = json.dumps(jsonable_encoder(values)).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str, *types) -> tuple:
     """
-    Lista todas as transcrições.
+    Decodifica um cursor de paginação convertendo cada valor com o tipo correspondente.
     """
     try:
-        transcriptions = db.query(Transcription).all()
-        return transcriptions
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+@router.get(
+    "/transcripts",
+    response_model=None,
+    responses={200: {"model": List[TranscriptionResponse]}}
+)
+async def list_transcriptions(
+    request: Request,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lista as transcrições, das mais recentes para as mais antigas, em páginas.
+    
+    A paginação é por cursor (created_at, id): a resposta traz o cursor da
+    próxima página no cabeçalho X-Next-Cursor, ausente na última página.
+    Aceita filtros por status (separados por vírgula) e por intervalo de
+    criação, e ?fields= para devolver apenas alguns campos. Respostas
+    inalteradas retornam 304 quando o cliente envia If-None-Match.
+    """
+    available = list(TranscriptionResponse.model_fields)
+    selected = available
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = set(selected) - set(available)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos inválidos: {', '.join(sorted(unknown))}. Opções: {', '.join(available)}"
+            )
+    
+    # created_at e id sempre são lidos para montar o cursor
+    columns = {name: getattr(Transcription, name) for name in dict.fromkeys(selected + ["created_at", "id"])}
+    query = select(*columns.values())
+    if status:
+        query = query.where(Transcription.status.in_([value.strip() for value in status.split(",")]))
+    if created_after:
+        query = query.where(Transcription.created_at >= created_after)
+    if created_before:
+        query = query.where(Transcription.created_at < created_before)
+    if cursor:
+        query = query.where(tuple_(Transcription.created_at, Transcription.id) < tuple_(*_decode_cursor(cursor, datetime, int)))
+    query = query.order_by(Transcription.created_at.desc(), Transcription.id.desc()).limit(limit + 1)
+    
+    try:
+        rows = (await db.execute(query)).mappings().all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    body = json.dumps(
+        jsonable_encoder([{name: row[name] for name in selected} for row in rows]),
+        separators=(",", ":")
+    ).encode("utf-8")
+    headers["ETag"] = f'"{hashlib.sha1(body + headers.get("X-Next-Cursor", "").encode()).hexdigest()}"'
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/transcripts/{transcription_id}", response_model=TranscriptionResponse)
-async def get_transcription(transcription_id: int, db: Session = get_db()):
+async def get_transcription(transcription_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtém uma transcrição específica por ID.
     """
     try:
-        transcription = db.query(Transcription).filter(Transcription.id == transcription_id).first()
+        transcription = await db.get(Transcription, transcription_id)
         if not transcription:
             raise HTTPException(status_code=404, detail="Transcrição não encontrada")
         return transcription
     except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/transcripts/{transcription_id}/metrics", response_model=TranscriptionMetricsResponse)
+async def get_transcription_metrics(transcription_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Métricas do último processamento concluído de uma transcrição: duração de
+    cada etapa, duração do áudio, fator de tempo real e pico de RSS do worker.
+    """
+    try:
+        await _ensure_transcription(db, transcription_id)
+        job = (await db.execute(
+            select(TranscriptionJob)
+            .where(TranscriptionJob.transcription_id == transcription_id, TranscriptionJob.metrics.isnot(None))
+            .order_by(TranscriptionJob.id.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Métricas não disponíveis para esta transcrição")
+    return TranscriptionMetricsResponse(
+        transcription_id=transcription_id, job_id=job.id, attempts=job.attempts, **job.metrics
+    )
+
+# Etapas que podem ser refeitas por /reprocess; o áudio preparado é sempre reaproveitado
+REPROCESS_STAGES = ("transcription", "diarization")
+
+def _enqueue_reprocess(db: Session, transcription_id: int, stages: List[str]) -> Transcription:
+    """
+    Enfileira um novo job da transcrição que refaz apenas `stages`,
+    reaproveitando os checkpoints das demais etapas do último job.
+    """
+    transcription = db.get(Transcription, transcription_id)
+    if not transcription:
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+    if transcription.status in ("queued", "processing"):
+        raise HTTPException(status_code=409, detail="A transcrição ainda está em processamento")
+    last_job = db.query(TranscriptionJob).filter(
+        TranscriptionJob.transcription_id == transcription_id
+    ).order_by(TranscriptionJob.id.desc()).first()
+    if last_job is None:
+        raise HTTPException(status_code=409, detail="A transcrição não tem processamento anterior")
+
+    checkpoints = {
+        stage: entry for stage, entry in (last_job.checkpoints or {}).items() if stage not in stages
+    }
+    audio_entry = checkpoints.get("audio_prep")
+    media_available = (
+        (audio_entry is not None and os.path.exists(resolve_path(audio_entry["path"])))
+        or (transcription.content_hash and stored_audio(transcription.content_hash))
+        or os.path.exists(last_job.video_path)
+    )
+    if not media_available:
+        raise HTTPException(status_code=409, detail="A mídia desta transcrição não está mais disponível")
+
+    try:
+        transcription.status = "queued"
+        enqueue_job(
+            db, transcription, last_job.video_path, checkpoints,
+            media_seconds=last_job.media_seconds, priority=last_job.priority,
+            tenant_id=last_job.tenant_id or DEFAULT_TENANT
+        )
+        db.commit()
+        db.refresh(transcription)
+    except Exception:
+        db.rollback()
+        raise
+    return transcription
+
+@router.post("/transcripts/{transcription_id}/reprocess", response_model=TranscriptionResponse)
+async def reprocess_transcription(
+    transcription_id: int,
+    stages: str = Query(",".join(REPROCESS_STAGES), description="Etapas a refazer, separadas por vírgula"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Refaz etapas de uma transcrição já processada (ex.: só a diarização, após
+    trocar o modelo). As etapas não pedidas são retomadas dos checkpoints do
+    último job, sem extrair o áudio nem rodar o Whisper de novo.
+    """
+    requested = [stage.strip() for stage in stages.split(",") if stage.strip()]
+    invalid = [stage for stage in requested if stage not in REPROCESS_STAGES]
+    if not requested or invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Etapas inválidas. Opções: {', '.join(REPROCESS_STAGES)}"
+        )
+
+    try:
+        transcription = await db.run_sync(_enqueue_reprocess, transcription_id, requested)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    await run_in_threadpool(publish_event, transcription.id, "job", "queued", stages=requested)
+    return transcription
+
+def _segments_query(transcription_id: int, start: Optional[float], end: Optional[float], speaker: Optional[str]):
+    """
+    Seleção dos segmentos de uma transcrição em ordem de início, limitada a
+    uma janela de tempo (segmentos que a intersectam) e a interlocutores.
+    """
+    query = select(
+        TranscriptionSegment.id,
+        TranscriptionSegment.transcription_id,
+        TranscriptionSegment.start_time,
+        TranscriptionSegment.end_time,
+        TranscriptionSegment.speaker,
+        TranscriptionSegment.text
+    ).where(TranscriptionSegment.transcription_id == transcription_id)
+    if end is not None:
+        query = query.where(TranscriptionSegment.start_time <= end)
+    if start is not None:
+        query = query.where(TranscriptionSegment.end_time >= start)
+    if speaker:
+        query = query.where(TranscriptionSegment.speaker.in_([value.strip() for value in speaker.split(",")]))
+    return query.order_by(TranscriptionSegment.start_time, TranscriptionSegment.id)
+
+async def _ensure_transcription(db: AsyncSession, transcription_id: int) -> None:
+    exists = (await db.execute(select(Transcription.id).where(Transcription.id == transcription_id))).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+
+@router.get(
+    "/transcripts/{transcription_id}/segments",
+    response_model=List[TranscriptionSegmentResponse],
+    response_model_exclude_unset=True
+)
+async def list_segments(
+    transcription_id: int,
+    response: Response,
+    start: Optional[float] = Query(None, ge=0),
+    end: Optional[float] = Query(None, ge=0),
+    speaker: Optional[str] = None,
+    limit: int = Query(SEGMENTS_DEFAULT_LIMIT, ge=1, le=SEGMENTS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    words: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lista os segmentos de uma transcrição que intersectam a janela [start, end]
+    (em segundos), opcionalmente apenas de alguns interlocutores (separados por vírgula).
+    
+    Janelas com mais de `limit` segmentos continuam a partir do cursor
+    devolvido no cabeçalho X-Next-Cursor. Com words=true cada segmento traz
+    também as palavras com os seus tempos.
+    """
+    try:
+        await _ensure_transcription(db, transcription_id)
+        query = _segments_query(transcription_id, start, end, speaker)
+        if words:
+            query = query.add_columns(TranscriptionSegment.words)
+        if cursor:
+            query = query.where(
+                tuple_(TranscriptionSegment.start_time, TranscriptionSegment.id)
+                > tuple_(*_decode_cursor(cursor, float, int))
+            )
+        rows = (await db.execute(query.limit(limit + 1))).mappings().all()
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["start_time"], rows[-1]["id"])
+    if words:
+        return [dict(row, words=decode_words(row["words"], row["start_time"])) for row in rows]
+    return rows
+
+@router.get("/transcripts/{transcription_id}/export")
+async def export_transcription(
+    transcription_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|srt|vtt)$"),
+    start: Optional[float] = Query(None, ge=0),
+    end: Optional[float] = Query(None, ge=0),
+    speaker: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exporta os segmentos em NDJSON, SRT ou WebVTT.
+    
+    O arquivo é gerado enquanto é enviado, lendo os segmentos do banco por um
+    cursor no servidor, de modo que a memória usada não cresce com a duração
+    da gravação. A geração é síncrona e roda no threadpool, com sessão própria.
+    """
+    await _ensure_transcription(db, transcription_id)
+    query = _segments_query(transcription_id, start, end, speaker).execution_options(
+        stream_results=True, yield_per=EXPORT_BATCH_SIZE
+    )
+    
+    def generate():
+        # Sessão própria: a da dependência é fechada antes do fim da resposta
+        with SessionLocal() as stream_db:
+            rows = stream_db.execute(query).mappings()
+            segments = (
+                {
+                    'start_time': row['start_time'],
+                    'end_time': row['end_time'],
+                    'speaker': row['speaker'],
+                    'text': row['text']
+                }
+                for row in rows
+            )
+            yield from export_segments(segments, format)
+    
+    filename = f"transcricao_{transcription_id}.{format}"
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def _status_snapshot(transcription_id: int) -> Optional[dict]:
+    """
+    Evento inicial com o status atual, para quem assina depois de etapas já concluídas.
+    """
+    async with AsyncSessionLocal() as db:
+        status = (await db.execute(select(Transcription.status).where(Transcription.id == transcription_id))).scalar()
+    if status is None:
+        return None
+    return {"transcription_id": transcription_id, "stage": "job", "status": status, "timestamp": time.time()}
+
+def _is_terminal(event: dict) -> bool:
+    return event["stage"] == "job" and event["status"] in TERMINAL_STATUSES
+
+async def _events(transcription_id: int):
+    """
+    Gera os eventos de uma transcrição, começando pelo status atual e
+    terminando quando ela é concluída ou falha. Produz None a cada
+    EVENTS_KEEPALIVE_SECONDS sem eventos, para manter a conexão viva.
+
+    A cada intervalo sem eventos o status é relido do banco: o evento final
+    pode não chegar (broker "memory" com o pipeline em outro processo, ou
+    NOTIFY perdido), e o fluxo termina mesmo assim.
+    """
+    # Assina antes de ler o status para não perder eventos entre os dois passos
+    subscription = get_broker().subscribe(transcription_id)
+    try:
+        snapshot = await _status_snapshot(transcription_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Transcrição não encontrada")
+        yield snapshot
+        if _is_terminal(snapshot):
+            return
+        while True:
+            event = await subscription.get(timeout=EVENTS_KEEPALIVE_SECONDS)
+            if event is None:
+                snapshot = await _status_snapshot(transcription_id)
+                if snapshot is not None and _is_terminal(snapshot):
+                    yield snapshot
+                    return
+            yield event
+            if event is not None and _is_terminal(event):
+                return
+    finally:
+        subscription.close()
+
+@router.get("/transcripts/{transcription_id}/events")
+async def transcription_events(transcription_id: int):
+    """
+    Acompanha o progresso de uma transcrição por Server-Sent Events.
+    
+    Cada evento traz a etapa (upload, audio_prep, transcription, diarization,
+    persistence...) e o status (started, progress, completed...); o fluxo
+    termina com o evento da etapa "job" com status completed ou failed.
+    """
+    events = _events(transcription_id)
+    # Valida a transcrição antes de abrir o fluxo, para responder 404 normalmente
+    first = await events.__anext__()
+    
+    async def stream():
+        try:
+            yield f"data: {json.dumps(first)}\n\n"
+            async for event in events:
+                yield ": keepalive\n\n" if event is None else f"data: {json.dumps(event)}\n\n"
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/transcripts/{transcription_id}/events")
+async def transcription_events_ws(websocket: WebSocket, transcription_id: int):
+    """
+    Acompanha o progresso de uma transcrição por WebSocket (mesmos eventos do SSE).
+    """
+    await websocket.accept()
+    events = _events(transcription_id)
+    try:
+        async for event in events:
+            if event is None:
+                await websocket.send_json({"stage": "keepalive"})
+            else:
+                await websocket.send_json(event)
+        await websocket.close()
+    except HTTPException as e:
+        await websocket.close(code=4404, reason=e.detail)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await events.aclose()
+
+# Sessões ao vivo simultâneas neste processo (cada uma ocupa o Whisper a cada passo)
+_streaming_slots = threading.BoundedSemaphore(max(STREAMING_MAX_SESSIONS, 1))
+
+def _open_streaming_session(model_size: str, input_format: str, sample_rate: int, filename: str) -> StreamingSession:
+    from app.core.model_registry import registry
+    
+    transcriber = registry.get_transcriber(model_size)
+    try:
+        diarizer = registry.get_diarizer()
+    except Exception as e:
+        # Sem diarizador (ex.: sem token do Hugging Face) a sessão segue sem interlocutores
+        logger.warning("Transcrição ao vivo sem identificação de interlocutores: %s", e)
+        diarizer = None
+    session = StreamingSession(transcriber, diarizer, input_format, sample_rate)
+    session.start(filename)
+    return session
+
+@router.websocket("/stream")
+async def stream_transcription(
+    websocket: WebSocket,
+    format: str = "pcm_s16le",
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+    model_size: Optional[str] = None,
+    filename: str = "ao_vivo"
+):
+    """
+    Transcrição ao vivo por WebSocket.
+    
+    O cliente envia o áudio em mensagens binárias (PCM mono "pcm_s16le" ou
+    "pcm_f32le" em ?sample_rate=, ou Opus em Ogg/WebM com ?format=opus, como o
+    produzido pelo MediaRecorder) e uma mensagem de texto {"type": "stop"} ao
+    terminar. O servidor responde com:
+    - {"type": "started", "transcription_id": ...}
+    - {"type": "partial", "start", "end", "text"}: legenda ainda sujeita a mudança
+    - {"type": "final", "segment": {...}}: segmento estável, já gravado no banco
+    - {"type": "completed", "transcription_id": ...}
+    """
+    await websocket.accept()
+    model_size = model_size or WHISPER_MODEL_SIZE
+    if STREAMING_MAX_SESSIONS <= 0:
+        await websocket.close(code=1008, reason="Transcrição ao vivo desativada")
+        return
+    if model_size not in WHISPER_ALLOWED_MODELS or format not in STREAM_FORMATS:
+        await websocket.close(code=1008, reason="Modelo ou formato inválido")
+        return
+    if not _streaming_slots.acquire(blocking=False):
+        await websocket.close(code=1013, reason="Limite de sessões ao vivo atingido")
+        return
+    
+    session = None
+    try:
+        session = await run_in_threadpool(_open_streaming_session, model_size, format, sample_rate, filename)
+        transcription_id = session.transcription_id
+        await websocket.send_json({"type": "started", "transcription_id": transcription_id})
+        
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                await run_in_threadpool(session.feed, message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                break
+            
+            if session.ready():
+                for event in await run_in_threadpool(session.process):
+                    await websocket.send_json(event)
+        
+        finishing, session = session, None
+        events = await run_in_threadpool(finishing.finish)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            for event in events:
+                await websocket.send_json(event)
+            await websocket.send_json({"type": "completed", "transcription_id": transcription_id})
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception("Erro na transcrição ao vivo")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(code=1011, reason=str(e)[:120])
+    finally:
+        if session is not None:
+            # Conexão perdida: ainda finaliza e grava o que foi recebido
+            try:
+                await run_in_threadpool(session.finish)
+            except Exception:
+                logger.exception("Erro ao finalizar a transcrição ao vivo")
+        _streaming_slots.release()
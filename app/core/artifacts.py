@@ -0,0 +1,184 @@
+"""
+Ciclo de vida dos artefatos do processamento.
+
+- Transcrições e demais artefatos JSON são gravados compactos (sem
+  indentação) e comprimidos com gzip, ou zstd com o pacote zstandard
+  (ARTIFACT_COMPRESSION). A leitura reconhece o formato pela extensão, então
+  arquivos .json antigos continuam legíveis.
+- O WAV float32 preparado para o processamento ocupa ~230 MB por hora de
+  áudio. Depois de consumido ele é arquivado em FLAC (16 bits, sem perdas
+  adicionais) ou Opus (STORE_AUDIO_CODEC) e removido; quando um novo
+  processamento precisa do áudio, o WAV é restaurado do arquivo.
+- Arquivos temporários abandonados são removidos e o armazenamento respeita
+  as cotas STORE_MAX_MEDIA_BYTES e STORE_MAX_BYTES (descarte LRU).
+"""
+import contextlib
+import gzip
+import json
+import logging
+import os
+import subprocess
+import time
+from typing import Any, Iterable, List, Optional
+
+from app.core.config import (
+    ARTIFACT_COMPRESSION, AUDIO_SAMPLE_RATE, FFMPEG_BINARY, STORE_AUDIO_CODEC, STORE_AUDIO_ARCHIVE_AFTER_SECONDS
+)
+from app.core.storage import store
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+JSON_SUFFIXES = {"gzip": ".json.gz", "zstd": ".json.zst", "none": ".json"}
+
+# Sufixo e argumentos de codificação do ffmpeg de cada formato de arquivamento
+AUDIO_CODECS = {
+    "flac": (".flac", ["-c:a", "flac", "-sample_fmt", "s16", "-compression_level", "8"]),
+    "opus": (".opus", ["-c:a", "libopus", "-b:a", "32k", "-application", "voip"]),
+}
+
+if ARTIFACT_COMPRESSION not in JSON_SUFFIXES:
+    raise ValueError(f"ARTIFACT_COMPRESSION inválido: {ARTIFACT_COMPRESSION}")
+if STORE_AUDIO_CODEC != "wav" and STORE_AUDIO_CODEC not in AUDIO_CODECS:
+    raise ValueError(f"STORE_AUDIO_CODEC inválido: {STORE_AUDIO_CODEC}")
+
+if ARTIFACT_COMPRESSION == "zstd" and zstandard is None:
+    logger.warning("Pacote zstandard não instalado; artefatos JSON serão comprimidos com gzip")
+    JSON_SUFFIX = JSON_SUFFIXES["gzip"]
+else:
+    JSON_SUFFIX = JSON_SUFFIXES[ARTIFACT_COMPRESSION]
+
+def _compress(payload: bytes, path: str) -> bytes:
+    if path.endswith(".gz"):
+        return gzip.compress(payload, compresslevel=6)
+    if path.endswith(".zst"):
+        return zstandard.ZstdCompressor(level=10).compress(payload)
+    return payload
+
+def _decompress(payload: bytes, path: str) -> bytes:
+    if path.endswith(".gz"):
+        return gzip.decompress(payload)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"O pacote zstandard é necessário para ler {path}")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Grava um artefato JSON compacto, comprimido conforme a extensão do caminho
+    (.json.gz, .json.zst ou .json). A gravação é atômica.
+    """
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_compress(payload, path))
+    os.replace(tmp_path, path)
+
+def read_json(path: str) -> Any:
+    """
+    Lê um artefato JSON, descomprimindo conforme a extensão.
+    """
+    with open(path, "rb") as f:
+        return json.loads(_decompress(f.read(), path))
+
+def _run_ffmpeg(arguments: List[str], action: str) -> None:
+    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *arguments]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except FileNotFoundError:
+        raise Exception(f"Erro ao {action}: executável '{FFMPEG_BINARY}' não encontrado")
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Erro ao {action}: {e.stderr.decode('utf-8', errors='replace').strip()}")
+
+def stored_audio(content_hash: str) -> Optional[str]:
+    """
+    Áudio de um conteúdo no armazenamento: o WAV preparado ou, se ele já foi
+    arquivado, o arquivo compactado. None se nenhum dos dois existe.
+    """
+    for suffix in (".wav", *(suffix for suffix, _ in AUDIO_CODECS.values())):
+        path = store.get(content_hash, suffix)
+        if path is not None:
+            return path
+    return None
+
+def restore_audio(content_hash: str) -> Optional[str]:
+    """
+    WAV preparado de um conteúdo, decodificado do arquivo compactado se necessário.
+    """
+    path = stored_audio(content_hash)
+    if path is None or path.endswith(".wav"):
+        return path
+    tmp_path = store.temp_path(".wav")
+    try:
+        _run_ffmpeg(
+            ["-i", path, "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), "-c:a", "pcm_f32le", tmp_path],
+            "restaurar o áudio"
+        )
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return store.put(tmp_path, content_hash, ".wav")
+
+def archive_audio(protected_digests: Iterable[str] = (),
+                  min_idle_seconds: float = STORE_AUDIO_ARCHIVE_AFTER_SECONDS) -> int:
+    """
+    Arquiva no formato STORE_AUDIO_CODEC os WAVs preparados sem uso há
+    min_idle_seconds e remove os originais.
+
+    Args:
+        protected_digests: Hashes dos jobs pendentes, cujo WAV ainda será lido
+        min_idle_seconds: Tempo mínimo sem uso, para não arquivar o áudio de um
+            upload que acabou de chegar e ainda está sendo enfileirado
+
+    Returns:
+        Bytes economizados
+    """
+    if STORE_AUDIO_CODEC == "wav":
+        return 0
+    suffix, codec_arguments = AUDIO_CODECS[STORE_AUDIO_CODEC]
+    protected = set(protected_digests)
+    cutoff = time.time() - min_idle_seconds
+    saved = 0
+    for path, stat in list(store.artifacts(".wav")):
+        digest = os.path.basename(path).split(".", 1)[0]
+        if digest in protected or stat.st_mtime > cutoff:
+            continue
+        archive_path = store.path_for(digest, suffix)
+        if not os.path.exists(archive_path):
+            tmp_path = store.temp_path(suffix)
+            try:
+                _run_ffmpeg(["-i", path, *codec_arguments, tmp_path], "arquivar o áudio")
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                if not os.path.exists(path):
+                    continue  # arquivado e removido por outro worker durante a codificação
+                raise
+            store.put(tmp_path, digest, suffix)
+        # Outro worker pode ter arquivado e removido o mesmo WAV ao mesmo tempo
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+            saved += stat.st_size - os.path.getsize(archive_path)
+    return saved
+
+def collect_garbage(protected_digests: Iterable[str] = ()) -> int:
+    """
+    Manutenção do armazenamento após cada job: arquiva o áudio consumido,
+    remove temporários abandonados e aplica as cotas de mídia e total.
+
+    Returns:
+        Bytes liberados
+    """
+    protected = list(protected_digests)
+    freed = archive_audio(protected)
+    freed += store.clean_temp()
+    freed += store.evict_media(protected_digests=protected)
+    freed += store.evict(protected_digests=protected)
+    return freed
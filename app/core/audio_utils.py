@@ -1,10 +1,378 @@
 import os
+import struct
+import subprocess
 import uuid
-from typing import Optional
+from typing import List, Optional, Tuple
 
+import numpy as np
 from moviepy.editor import VideoFileClip
 from pydub import AudioSegment
 
+from app.core.config import (
+    FFMPEG_BINARY, AUDIO_SAMPLE_RATE, AUDIO_LOUDNESS_TARGET, AUDIO_MMAP_THRESHOLD_BYTES,
+    VAD_FRAME_SECONDS, VAD_THRESHOLD_DB, VAD_MIN_SILENCE_SECONDS, VAD_MIN_SPEECH_SECONDS, VAD_PADDING_SECONDS
+)
+
+# Códigos de formato WAV aceitos por load_audio
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Silêncio inserido entre os trechos de fala concatenados em um bloco, para
+# que o Whisper não emende palavras de trechos diferentes
+SPEECH_JOIN_GAP_SECONDS = 0.3
+
+def _prepare_command(source: str, audio_path: str) -> List[str]:
+    """
+    Monta o comando ffmpeg que gera o WAV mono, 16 kHz, normalizado e em float32.
+    """
+    # Mono antes da normalização para que o loudnorm processe um único canal
+    filters = (
+        "aformat=channel_layouts=mono,"
+        f"loudnorm=I={AUDIO_LOUDNESS_TARGET}:TP=-1.5:LRA=11,"
+        f"aresample={AUDIO_SAMPLE_RATE}"
+    )
+    return [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source,
+        "-vn", "-sn", "-dn",
+        "-af", filters,
+        "-ac", "1",
+        "-ar", str(AUDIO_SAMPLE_RATE),
+        "-c:a", "pcm_f32le",
+        audio_path,
+    ]
+
+def prepare_audio(video_path: str, output_dir: str) -> str:
+    """
+    Prepara o áudio de um vídeo para transcrição em uma única passagem do ffmpeg.
+    
+    Decodifica o contêiner, converte para mono, normaliza a loudness e reamostra
+    para 16 kHz em fluxo, gravando um único WAV em float32. Substitui a cadeia
+    extract_audio_from_video -> convert_to_mono -> normalize_audio, que carregava
+    o arquivo inteiro em memória e gravava três WAVs em disco.
+    
+    Args:
+        video_path: Caminho para o arquivo de vídeo
+        output_dir: Diretório para salvar o arquivo de áudio
+    
+    Returns:
+        Nome do arquivo de áudio preparado
+    """
+    audio_filename = f"{uuid.uuid4()}.wav"
+    audio_path = os.path.join(output_dir, audio_filename)
+    command = _prepare_command(video_path, audio_path)
+    command.insert(1, "-nostdin")
+    
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+        return audio_filename
+    except FileNotFoundError:
+        raise Exception(f"Erro ao preparar o áudio: executável '{FFMPEG_BINARY}' não encontrado")
+    except subprocess.CalledProcessError as e:
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+        stderr = e.stderr.decode("utf-8", errors="replace").strip()
+        raise Exception(f"Erro ao preparar o áudio: {stderr}")
+
+def start_audio_decoder(audio_path: str, stderr) -> subprocess.Popen:
+    """
+    Inicia um ffmpeg que prepara o áudio (como prepare_audio) lendo o vídeo pela entrada padrão.
+    
+    Permite decodificar o áudio enquanto o upload ainda está chegando. Contêineres
+    que exigem acesso aleatório (ex.: MP4 com o índice no final) fazem o ffmpeg
+    falhar; nesse caso o chamador deve recorrer a prepare_audio com o arquivo completo.
+    
+    Args:
+        audio_path: Caminho do WAV a gerar
+        stderr: Arquivo que recebe as mensagens de erro do ffmpeg
+    
+    Returns:
+        Processo do ffmpeg, com stdin aberto para escrita
+    """
+    try:
+        return subprocess.Popen(
+            _prepare_command("pipe:0", audio_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr
+        )
+    except FileNotFoundError:
+        raise Exception(f"Erro ao preparar o áudio: executável '{FFMPEG_BINARY}' não encontrado")
+
+def start_stream_decoder(input_format: str, sample_rate: int = AUDIO_SAMPLE_RATE) -> subprocess.Popen:
+    """
+    Inicia um ffmpeg que converte áudio ao vivo, recebido pela entrada padrão,
+    em PCM float32 mono de 16 kHz na saída padrão, com o mínimo de buffer.
+    
+    Sem loudnorm: o filtro precisa de vários segundos de antecedência, o que
+    atrasaria as legendas.
+    
+    Args:
+        input_format: "pcm_s16le" ou "pcm_f32le" (mono, em sample_rate), ou
+            "opus" (Ogg ou WebM, detectado pelo ffmpeg)
+        sample_rate: Taxa de amostragem do PCM de entrada
+    
+    Returns:
+        Processo do ffmpeg, com stdin e stdout abertos
+    """
+    if input_format in ("pcm_s16le", "pcm_f32le"):
+        source = ["-f", input_format[4:], "-ar", str(sample_rate), "-ac", "1"]
+    else:
+        source = ["-probesize", "4096", "-analyzeduration", "0"]
+    
+    command = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+        "-fflags", "nobuffer", *source, "-i", "pipe:0",
+        "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-f", "f32le", "pipe:1",
+    ]
+    try:
+        return subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        raise Exception(f"Erro ao preparar o áudio: executável '{FFMPEG_BINARY}' não encontrado")
+
+def wav_duration(audio_path: str) -> float:
+    """
+    Duração aproximada em segundos de um WAV float32 mono em AUDIO_SAMPLE_RATE, pelo tamanho do arquivo.
+    
+    Funciona também com o arquivo ainda sendo escrito pelo ffmpeg.
+    """
+    try:
+        size = os.path.getsize(audio_path)
+    except FileNotFoundError:
+        return 0.0
+    return max(0, size - 44) / 4 / AUDIO_SAMPLE_RATE
+
+def wav_header(num_samples: int, sample_rate: int = AUDIO_SAMPLE_RATE) -> bytes:
+    """
+    Cabeçalho de um WAV float32 mono no formato lido por load_audio.
+    
+    Permite gravar o áudio aos poucos: escreve-se o cabeçalho com o total
+    provisório, acrescentam-se as amostras e reescreve-se o cabeçalho no fim.
+    """
+    data_size = num_samples * 4
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, _WAVE_FORMAT_IEEE_FLOAT, 1, sample_rate, sample_rate * 4, 4, 32,
+        b"data", data_size
+    )
+
+def _find_wav_data(audio_path: str) -> Tuple[int, int, int]:
+    """
+    Localiza o bloco de amostras de um WAV float32 mono gerado por prepare_audio.
+    
+    Returns:
+        Tupla (offset do bloco 'data', tamanho em bytes, taxa de amostragem)
+    """
+    with open(audio_path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError("arquivo não é um WAV RIFF")
+        
+        sample_rate = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("bloco 'data' não encontrado")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                format_tag, channels, sample_rate = struct.unpack("<HHI", fmt[:8])
+                bits_per_sample = struct.unpack("<H", fmt[14:16])[0]
+                if format_tag == _WAVE_FORMAT_EXTENSIBLE:
+                    format_tag = struct.unpack("<H", fmt[24:26])[0]
+                if format_tag != _WAVE_FORMAT_IEEE_FLOAT or channels != 1 or bits_per_sample != 32:
+                    raise ValueError("esperado WAV mono em float32 (use prepare_audio)")
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if sample_rate is None:
+                    raise ValueError("bloco 'fmt ' ausente")
+                offset = f.tell()
+                # O ffmpeg pode deixar o tamanho zerado/inválido quando não consegue voltar ao cabeçalho
+                available = os.path.getsize(audio_path) - offset
+                if chunk_size == 0 or chunk_size > available:
+                    chunk_size = available
+                return offset, chunk_size - chunk_size % 4, sample_rate
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+def load_audio(audio_path: str) -> np.ndarray:
+    """
+    Carrega o áudio preparado como um vetor float32 mono, sem decodificar novamente.
+    
+    O WAV gerado por prepare_audio já está em 16 kHz e float32, que é exatamente o
+    formato que o Whisper e o pyannote esperam, então as amostras são lidas
+    direto do disco. Arquivos grandes são mapeados em memória (cópia na escrita)
+    para que o pico de memória não dobre quando os dois modelos os usam.
+    
+    Args:
+        audio_path: Caminho para o WAV gerado por prepare_audio
+    
+    Returns:
+        Vetor float32 com as amostras em AUDIO_SAMPLE_RATE
+    """
+    try:
+        offset, size, sample_rate = _find_wav_data(audio_path)
+        if sample_rate != AUDIO_SAMPLE_RATE:
+            raise ValueError(f"taxa de amostragem {sample_rate} Hz, esperado {AUDIO_SAMPLE_RATE} Hz")
+        
+        num_samples = size // 4
+        if size >= AUDIO_MMAP_THRESHOLD_BYTES:
+            return np.memmap(audio_path, dtype="<f4", mode="c", offset=offset, shape=(num_samples,))
+        return np.fromfile(audio_path, dtype="<f4", count=num_samples, offset=offset)
+    except Exception as e:
+        raise Exception(f"Erro ao carregar o áudio: {str(e)}")
+
+def _frame_energy_db(audio: np.ndarray, frame_size: int, block_frames: int = 100000) -> np.ndarray:
+    """
+    Calcula a energia (dB) de cada quadro em blocos, sem copiar o áudio inteiro.
+    """
+    num_frames = len(audio) // frame_size
+    energy = np.empty(num_frames, dtype=np.float32)
+    for first in range(0, num_frames, block_frames):
+        last = min(first + block_frames, num_frames)
+        frames = np.asarray(audio[first * frame_size:last * frame_size], dtype=np.float32).reshape(-1, frame_size)
+        energy[first:last] = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    return energy
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retorna o início e o fim (exclusivo) de cada sequência de valores True.
+    """
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def detect_speech_regions(audio: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE) -> List[Tuple[float, float]]:
+    """
+    Detecta trechos de fala por energia (VAD simples e vetorizado).
+    
+    O limiar se adapta ao ruído de fundo da gravação (10 dB acima do percentil
+    10 da energia), limitado pelo piso absoluto VAD_THRESHOLD_DB e a 15 dB
+    abaixo do nível típico da fala. Silêncios curtos são absorvidos, falas
+    muito curtas descartadas e cada trecho recebe uma pequena margem.
+    
+    Args:
+        audio: Vetor float32 mono
+        sample_rate: Taxa de amostragem do vetor
+    
+    Returns:
+        Lista de (início, fim) em segundos
+    """
+    frame_size = int(sample_rate * VAD_FRAME_SECONDS)
+    energy = _frame_energy_db(audio, frame_size)
+    if len(energy) == 0:
+        return []
+    
+    noise_floor, speech_level = np.percentile(energy, [10, 95])
+    threshold = min(max(noise_floor + 10, VAD_THRESHOLD_DB), speech_level - 15)
+    speech = energy > threshold
+    
+    # Fecha silêncios mais curtos que o mínimo
+    starts, ends = _runs(~speech)
+    min_silence = int(VAD_MIN_SILENCE_SECONDS / VAD_FRAME_SECONDS)
+    for start, end in zip(starts, ends):
+        if end - start < min_silence and start > 0 and end < len(speech):
+            speech[start:end] = True
+    
+    # Descarta falas mais curtas que o mínimo e aplica a margem
+    starts, ends = _runs(speech)
+    keep = (ends - starts) >= int(VAD_MIN_SPEECH_SECONDS / VAD_FRAME_SECONDS)
+    duration = len(audio) / sample_rate
+    regions = []
+    for start, end in zip(starts[keep], ends[keep]):
+        region_start = max(0.0, start * VAD_FRAME_SECONDS - VAD_PADDING_SECONDS)
+        region_end = min(duration, end * VAD_FRAME_SECONDS + VAD_PADDING_SECONDS)
+        if regions and region_start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], region_end)
+        else:
+            regions.append((region_start, region_end))
+    return regions
+
+def plan_chunks(regions: List[Tuple[float, float]], max_seconds: float, overlap_seconds: float,
+                gap_seconds: float = SPEECH_JOIN_GAP_SECONDS) -> List[Tuple[float, float, float, List[Tuple[float, float]]]]:
+    """
+    Agrupa trechos de fala em blocos de até max_seconds de áudio.
+    
+    Só os trechos de fala entram no bloco: eles são concatenados (ver
+    join_speech) com gap_seconds de silêncio entre si, e os silêncios entre
+    eles nunca chegam ao modelo. Um trecho contínuo maior que o limite é
+    dividido à força com sobreposição; nesses cortes o ponto de costura fica
+    no meio da sobreposição.
+    
+    Args:
+        regions: Trechos de fala (início, fim) em segundos, ordenados
+        max_seconds: Duração máxima do áudio de um bloco
+        overlap_seconds: Sobreposição usada nos cortes forçados
+        gap_seconds: Silêncio entre trechos concatenados
+    
+    Returns:
+        Lista de (início, fim, costura, trechos) em segundos, onde "costura" é o
+        instante a partir do qual os segmentos do bloco prevalecem sobre os do
+        bloco anterior e "trechos" são os intervalos de fala do bloco
+    """
+    overlap_seconds = min(overlap_seconds, max_seconds / 2)
+    chunks = []
+    pieces: List[Tuple[float, float]] = []
+    length = 0.0
+    seam = 0.0
+    for start, end in regions:
+        added = end - start + gap_seconds
+        if pieces and length + added <= max_seconds:
+            pieces.append((start, end))
+            length += added
+            continue
+        if pieces:
+            chunks.append((pieces[0][0], pieces[-1][1], seam, pieces))
+        pieces, length, seam = [(start, end)], end - start, start
+        
+        # Trecho contínuo longo demais: divide com sobreposição
+        while length > max_seconds:
+            cut_start = pieces[0][0]
+            cut_end = cut_start + max_seconds
+            chunks.append((cut_start, cut_end, seam, [(cut_start, cut_end)]))
+            next_start = cut_end - overlap_seconds
+            pieces, length, seam = [(next_start, end)], end - next_start, next_start + overlap_seconds / 2
+    if pieces:
+        chunks.append((pieces[0][0], pieces[-1][1], seam, pieces))
+    return chunks
+
+def _piece_samples(pieces: List[Tuple[float, float]], sample_rate: int) -> List[Tuple[int, int]]:
+    return [(int(start * sample_rate), int(end * sample_rate)) for start, end in pieces]
+
+def speech_offsets(pieces: List[Tuple[float, float]], gap_seconds: float = SPEECH_JOIN_GAP_SECONDS,
+                   sample_rate: int = AUDIO_SAMPLE_RATE) -> np.ndarray:
+    """
+    Instante, no áudio montado por join_speech, em que começa cada trecho.
+    """
+    lengths = [end - start for start, end in _piece_samples(pieces, sample_rate)]
+    gap = int(gap_seconds * sample_rate)
+    return np.concatenate(([0], np.cumsum(np.add(lengths, gap))[:-1])) / sample_rate
+
+def join_speech(audio: np.ndarray, pieces: List[Tuple[float, float]], gap_seconds: float = SPEECH_JOIN_GAP_SECONDS,
+                sample_rate: int = AUDIO_SAMPLE_RATE) -> np.ndarray:
+    """
+    Concatena os trechos de fala de um bloco, separados por gap_seconds de silêncio.
+    """
+    gap = np.zeros(int(gap_seconds * sample_rate), dtype=np.float32)
+    parts = []
+    for start, end in _piece_samples(pieces, sample_rate):
+        if parts:
+            parts.append(gap)
+        parts.append(audio[start:end])
+    return np.concatenate(parts).astype(np.float32, copy=False)
+
+def to_source_time(seconds: float, pieces: List[Tuple[float, float]], offsets: np.ndarray) -> float:
+    """
+    Converte um instante do áudio montado por join_speech para o áudio original.
+
+    Instantes no silêncio inserido após um trecho caem no fim desse trecho.
+    """
+    index = max(int(np.searchsorted(offsets, seconds, side="right")) - 1, 0)
+    start, end = pieces[index]
+    return min(start + seconds - float(offsets[index]), end)
+
 def extract_audio_from_video(video_path: str, output_dir: str) -> str:
     """
     Extrai o áudio de um arquivo de vídeo e salva no formato WAV.
@@ -0,0 +1,83 @@
+"""
+Checkpoints das etapas caras do processamento.
+
+audio_prep, transcription e diarization gravam o seu resultado como artefato
+em disco e registram no job (TranscriptionJob.checkpoints) o caminho, o
+SHA-256 do arquivo e a chave das configurações que o produziram. Uma nova
+tentativa do job, ou um reprocessamento, retoma desses artefatos: a etapa só
+é refeita se o arquivo sumiu, foi alterado ou se as configurações mudaram.
+"""
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.storage import store
+from app.models.schema import TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+# Etapas com artefato reaproveitável, na ordem do pipeline
+CHECKPOINT_STAGES = ("audio_prep", "transcription", "diarization")
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _stored_path(path: str) -> str:
+    # Artefatos do armazenamento ficam relativos à raiz, como nos demais registros
+    relative = store.relative_path(path)
+    return path if relative.startswith("..") else relative
+
+def resolve_path(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(store.root, path)
+
+class StageCheckpoints:
+    """
+    Checkpoints das etapas de um job. Sem job (ex.: chamadas diretas ao
+    pipeline) nada é registrado e nenhuma etapa é retomada.
+    """
+
+    def __init__(self, db: Session, job: Optional[TranscriptionJob]):
+        self.db = db
+        self.job = job
+
+    def load(self, stage: str, key: str) -> Optional[str]:
+        """
+        Caminho do artefato de uma etapa já concluída com a mesma chave, se ele
+        ainda existir intacto; None se a etapa precisa ser executada.
+        """
+        entry = (self.job.checkpoints or {}).get(stage) if self.job is not None else None
+        if not entry or entry.get("key") != key:
+            return None
+        path = resolve_path(entry["path"])
+        try:
+            if file_sha256(path) != entry["sha256"]:
+                logger.warning("Artefato de %s alterado (%s); a etapa será refeita", stage, path)
+                return None
+        except OSError:
+            return None
+        return path
+
+    def record(self, stage: str, path: str, key: str) -> None:
+        """
+        Registra a conclusão de uma etapa e confirma a transação, para que o
+        checkpoint sobreviva a uma falha nas etapas seguintes.
+        """
+        if self.job is None:
+            return
+        entry = {
+            "path": _stored_path(path),
+            "sha256": file_sha256(path),
+            "key": key,
+            "completed_at": datetime.utcnow().isoformat(timespec="seconds"),
+        }
+        # Atribui um novo dicionário: mutações no JSON não são detectadas pelo ORM
+        self.job.checkpoints = {**(self.job.checkpoints or {}), stage: entry}
+        self.db.commit()
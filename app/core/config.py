@@ -16,4 +16,155 @@ DB_NAME = os.getenv("DB_NAME", "transcriber_db")
 encoded_password = urllib.parse.quote_plus(DB_PASSWORD)
 
 # URL de conexão do banco de dados
-DATABASE_URL = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}" 
\ No newline at end of file
+DATABASE_URL = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}" 
+
+# Pool de conexões (por engine e por processo; a API usa o engine assíncrono e
+# os workers o síncrono). Não se aplica ao SQLite.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # conexões extras em picos
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # espera por uma conexão livre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos até renovar uma conexão (-1 desativa)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Configurações de processamento de áudio
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_SAMPLE_RATE = 16000  # taxa esperada pelo Whisper e pelo pyannote
+AUDIO_LOUDNESS_TARGET = float(os.getenv("AUDIO_LOUDNESS_TARGET", "-16"))  # LUFS
+# Acima deste tamanho o áudio decodificado é mapeado em memória em vez de carregado
+AUDIO_MMAP_THRESHOLD_BYTES = int(os.getenv("AUDIO_MMAP_THRESHOLD_BYTES", str(256 * 1024 * 1024)))
+
+# Threads de CPU. O pool intra-op do torch é único por processo: a
+# transcrição (backends reference e int8) e a diarização, que rodam em
+# paralelo, dividem TORCH_NUM_THREADS, definido uma vez por processo.
+# WHISPER_NUM_THREADS vale só onde o modelo tem pool próprio: o backend
+# ctranslate2 e os processos de LONGFORM_WORKERS, que o dividem entre si
+CPU_COUNT = os.cpu_count() or 1
+WHISPER_NUM_THREADS = int(os.getenv("WHISPER_NUM_THREADS", str(max(1, CPU_COUNT // 2))))
+
+# Diretórios de arquivos
+VIDEOS_DIR = os.getenv("VIDEOS_DIR", "videos")
+TRANSCRIPTS_DIR = os.getenv("TRANSCRIPTS_DIR", "transcripts")
+STORE_DIR = os.getenv("STORE_DIR", "store")  # vídeos, áudios e transcrições endereçados por hash
+STORE_MAX_MEDIA_BYTES = int(os.getenv("STORE_MAX_MEDIA_BYTES", str(50 * 1024 ** 3)))
+STORE_MAX_BYTES = int(os.getenv("STORE_MAX_BYTES", "0"))  # todos os artefatos (0 = sem limite)
+STORE_TEMP_MAX_AGE_SECONDS = float(os.getenv("STORE_TEMP_MAX_AGE_SECONDS", str(24 * 3600)))
+# Áudio preparado guardado após o processamento: flac, opus ou wav (sem compactar)
+STORE_AUDIO_CODEC = os.getenv("STORE_AUDIO_CODEC", "flac").lower()
+STORE_AUDIO_ARCHIVE_AFTER_SECONDS = float(os.getenv("STORE_AUDIO_ARCHIVE_AFTER_SECONDS", "60"))
+# Compressão das transcrições e demais artefatos JSON: gzip, zstd (requer zstandard) ou none
+ARTIFACT_COMPRESSION = os.getenv("ARTIFACT_COMPRESSION", "gzip").lower()
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Ingestão de uploads (0 desativa o limite)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 ** 3)))
+MAX_MEDIA_SECONDS = float(os.getenv("MAX_MEDIA_SECONDS", str(4 * 3600)))
+KEEP_UPLOADED_VIDEO = os.getenv("KEEP_UPLOADED_VIDEO", "false").lower() in ("1", "true", "yes")
+
+# Paginação da listagem de transcrições
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "50"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "500"))
+
+# Eventos de progresso (SSE/WebSocket): "auto", "memory" ou "postgres"
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "auto")
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))  # eventos pendentes por assinante
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Consulta e exportação de segmentos
+SEGMENTS_DEFAULT_LIMIT = int(os.getenv("SEGMENTS_DEFAULT_LIMIT", "500"))
+SEGMENTS_MAX_LIMIT = int(os.getenv("SEGMENTS_MAX_LIMIT", "5000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # linhas lidas do cursor por vez
+
+# Busca textual nos segmentos (/api/search)
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "portuguese")  # configuração de texto do PostgreSQL
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+# A relevância é calculada só entre os N segmentos mais recentes com os termos (0 = todos);
+# limita o custo de termos muito frequentes
+SEARCH_RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "10000"))
+
+# Além das linhas por segmento, grava os segmentos de cada transcrição em um blob colunar
+SEGMENT_BLOB_ENABLED = os.getenv("SEGMENT_BLOB_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Idioma das transcrições (parte da chave do cache de resultados)
+TRANSCRIPTION_LANGUAGE = os.getenv("TRANSCRIPTION_LANGUAGE", "pt")
+# Tempos por palavra do Whisper: guardados com os segmentos e usados para
+# dividir um segmento onde o interlocutor da diarização muda
+WHISPER_WORD_TIMESTAMPS = os.getenv("WHISPER_WORD_TIMESTAMPS", "true").lower() in ("1", "true", "yes")
+
+# Fila de jobs e workers
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", str(max(1, CPU_COUNT // WORKER_PROCESSES))))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+MAX_RUNNING_JOBS = int(os.getenv("MAX_RUNNING_JOBS", "0"))  # 0 = sem limite além dos workers
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))  # sem heartbeat = worker morto
+
+# Modelos
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+WHISPER_ALLOWED_MODELS = [size.strip() for size in os.getenv("WHISPER_ALLOWED_MODELS", "tiny,base,small,medium").split(",") if size.strip()]
+# Backend de inferência: reference (openai-whisper), int8 (quantização dinâmica do torch) ou ctranslate2 (faster-whisper)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "reference")
+WHISPER_ALLOWED_BACKENDS = [name.strip() for name in os.getenv("WHISPER_ALLOWED_BACKENDS", WHISPER_BACKEND).split(",") if name.strip()]
+FASTER_WHISPER_DEVICE = os.getenv("FASTER_WHISPER_DEVICE", "cpu")
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+DIARIZATION_MODEL = os.getenv("DIARIZATION_MODEL", "pyannote/speaker-diarization")
+SPEAKER_EMBEDDING_MODEL = os.getenv("SPEAKER_EMBEDDING_MODEL", "pyannote/wespeaker-voxceleb-resnet34-LM")
+# Reconhecimento de interlocutores cadastrados entre gravações
+SPEAKER_INDEX_BACKEND = os.getenv("SPEAKER_INDEX_BACKEND", "numpy")  # numpy (busca exata) ou faiss (HNSW)
+SPEAKER_MATCH_THRESHOLD = float(os.getenv("SPEAKER_MATCH_THRESHOLD", "0.6"))  # similaridade mínima de cosseno
+SPEAKER_SEARCH_K = int(os.getenv("SPEAKER_SEARCH_K", "10"))  # vizinhos consultados por interlocutor
+SPEAKER_EMBEDDING_MAX_SECONDS = float(os.getenv("SPEAKER_EMBEDDING_MAX_SECONDS", "30"))  # fala usada por interlocutor
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(6 * 1024 ** 3)))
+MODEL_CACHE_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "3"))
+# Modelos carregados na subida de cada worker, ex.: "whisper:base,whisper:small@int8,diarization"
+WARM_MODELS = [name.strip() for name in os.getenv("WARM_MODELS", f"whisper:{WHISPER_MODEL_SIZE},diarization").split(",") if name.strip()]
+
+# Transcrição de áudios longos em blocos separados por silêncio (VAD)
+LONGFORM_MIN_SECONDS = float(os.getenv("LONGFORM_MIN_SECONDS", "600"))  # 0 desativa
+LONGFORM_CHUNK_SECONDS = float(os.getenv("LONGFORM_CHUNK_SECONDS", "120"))
+LONGFORM_OVERLAP_SECONDS = float(os.getenv("LONGFORM_OVERLAP_SECONDS", "2"))
+LONGFORM_WORKERS = int(os.getenv("LONGFORM_WORKERS", "1"))  # processos com cópia própria do modelo
+VAD_FRAME_SECONDS = 0.03
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))  # piso absoluto de energia de fala
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "0.5"))
+VAD_MIN_SPEECH_SECONDS = float(os.getenv("VAD_MIN_SPEECH_SECONDS", "0.25"))
+VAD_PADDING_SECONDS = float(os.getenv("VAD_PADDING_SECONDS", "0.2"))
+
+# Inferência em lote de clipes curtos (até 30 s) de jobs diferentes
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "1"))  # 1 desativa
+WHISPER_BATCH_MAX_WAIT_SECONDS = float(os.getenv("WHISPER_BATCH_MAX_WAIT_SECONDS", "0.2"))
+WORKER_JOB_CONCURRENCY = int(os.getenv("WORKER_JOB_CONCURRENCY", "1"))  # jobs simultâneos por processo worker
+
+# Escalonamento e admissão de jobs (app.core.scheduler)
+try:
+    PHYSICAL_MEMORY_BYTES = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+except (AttributeError, ValueError, OSError):
+    PHYSICAL_MEMORY_BYTES = 0  # desconhecida: sem orçamento de memória por padrão
+SCHEDULER_INTERACTIVE_MAX_SECONDS = float(os.getenv("SCHEDULER_INTERACTIVE_MAX_SECONDS", "120"))  # clipes curtos
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "600"))  # espera que promove o job uma classe
+SCHEDULER_CANDIDATES = int(os.getenv("SCHEDULER_CANDIDATES", "200"))  # jobs da fila avaliados a cada reserva
+# Jobs simultâneos de todos os workers, usado para estimar a espera na fila
+SCHEDULER_SLOTS = int(os.getenv("SCHEDULER_SLOTS", str(WORKER_PROCESSES * WORKER_JOB_CONCURRENCY)))
+SCHEDULER_INTERACTIVE_SLOTS = int(os.getenv("SCHEDULER_INTERACTIVE_SLOTS", "1"))  # por host, reservados a interactive
+SCHEDULER_MEMORY_BUDGET_BYTES = int(os.getenv("SCHEDULER_MEMORY_BUDGET_BYTES", str(int(PHYSICAL_MEMORY_BYTES * 0.8))))
+SCHEDULER_AUDIO_MEMORY_FACTOR = float(os.getenv("SCHEDULER_AUDIO_MEMORY_FACTOR", "4"))  # cópias do áudio float32
+SCHEDULER_REAL_TIME_FACTORS = os.getenv("SCHEDULER_REAL_TIME_FACTORS", "")  # ex.: base=0.15,small@int8=0.25
+# Recusa uploads (com Retry-After) acima destes limites, em segundos de processamento; 0 desativa
+SCHEDULER_MAX_WAIT_SECONDS = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "3600"))  # fila à frente do job (503)
+SCHEDULER_TENANT_MAX_SECONDS = float(os.getenv("SCHEDULER_TENANT_MAX_SECONDS", "14400"))  # pendente por inquilino (429)
+
+# Transcrição ao vivo por WebSocket (/api/stream)
+STREAMING_MAX_SESSIONS = int(os.getenv("STREAMING_MAX_SESSIONS", "2"))  # por processo da API; 0 desativa
+STREAMING_STEP_SECONDS = float(os.getenv("STREAMING_STEP_SECONDS", "1.0"))  # áudio novo entre passagens do Whisper
+STREAMING_BUFFER_SECONDS = float(os.getenv("STREAMING_BUFFER_SECONDS", "15"))  # janela a partir da qual o início é descartado
+STREAMING_MAX_SEGMENT_SECONDS = float(os.getenv("STREAMING_MAX_SEGMENT_SECONDS", "12"))
+STREAMING_SPEAKER_THRESHOLD = float(os.getenv("STREAMING_SPEAKER_THRESHOLD", "0.55"))  # similaridade mínima de cosseno
+STREAMING_MIN_EMBED_SECONDS = float(os.getenv("STREAMING_MIN_EMBED_SECONDS", "1.0"))
+
+# Observabilidade
+# Métricas do Prometheus em /metrics (requer prometheus_client). Com API e
+# workers em processos distintos, defina também PROMETHEUS_MULTIPROC_DIR.
+OTEL_TRACING_ENABLED = os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"  # spans por job e etapa
@@ -1,10 +1,20 @@
 import os
-from typing import Generator
-from sqlalchemy import create_engine, text
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Dict, Iterator
+from sqlalchemy import Float, Integer, MetaData, create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 
+from app.core.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
@@ -18,33 +28,143 @@ DB_NAME = os.getenv("DB_NAME", "transcriber_db")
 # Codifica a senha para URL
 encoded_password = quote_plus(DB_PASSWORD)
 
-# URL de conexão do banco de dados
-DATABASE_URL = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# URL de conexão do banco de dados (DATABASE_URL permite usar SQLite localmente)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
 
-try:
-    # Tenta conectar ao banco de dados
-    engine = create_engine(DATABASE_URL)
-    
-    # Testa a conexão
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-        print("Conexão com o banco de dados estabelecida com sucesso!")
-except Exception as e:
-    print(f"Erro ao conectar ao banco de dados: {str(e)}")
-    raise
-
-# Configuração da sessão
+def async_database_url(url: str) -> str:
+    """
+    URL equivalente com driver assíncrono: asyncpg no PostgreSQL e aiosqlite no SQLite.
+    """
+    parsed = make_url(url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    backend = parsed.get_backend_name()
+    if backend not in drivers:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {backend}")
+    return parsed.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+# Engine síncrono: workers, pipeline, transcrição ao vivo e eventos (LISTEN/NOTIFY).
+# O SQLite só aceita a conexão na thread que a criou, a menos que isso seja desativado.
+# Nenhuma conexão é aberta aqui: a primeira sai do pool quando for usada.
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+    **_engine_options(DATABASE_URL)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db() -> Generator:
+# Engine assíncrono das rotas da API: as consultas não ocupam threads, então
+# o número de requisições simultâneas não fica preso ao threadpool
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **_engine_options(DATABASE_URL))
+# Sem expirar no commit: os objetos continuam legíveis ao montar a resposta
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Fornece uma sessão do banco de dados.
+    Fornece uma sessão assíncrona do banco de dados, encerrada ao fim da requisição.
+    
+    Funções síncronas que recebem uma Session (ex.: save_segments) rodam
+    sobre ela com await db.run_sync(func, ...).
     
     Yields:
-        Session: Sessão do banco de dados
+        AsyncSession: Sessão do banco de dados
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+# Chave do pg_advisory_lock que serializa as mudanças de esquema
+SCHEMA_LOCK_KEY = 815_230_467
+
+@contextmanager
+def schema_lock() -> Iterator[None]:
+    """
+    Exclusão mútua entre processos (API, supervisor dos workers, create_db.py)
+    que aplicam mudanças de esquema ao subir.
+
+    No PostgreSQL usa pg_advisory_lock em uma conexão dedicada; no SQLite, um
+    flock em um arquivo ao lado do banco. Sem isso, dois processos veem a
+    mesma coluna ausente e o segundo ALTER TABLE falha com "already exists".
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                conn.commit()
+        return
+
+    database = make_url(DATABASE_URL).database
+    if fcntl is None or engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.schema-lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def migrate(metadata: MetaData) -> None:
+    """
+    Aplica as mudanças de esquema pendentes (sync_schema e estrutura de busca)
+    sob schema_lock. É o passo de migração executado na subida da API, do
+    supervisor dos workers e por create_db.py; processos concorrentes esperam
+    o primeiro terminar e então não encontram mais nada a fazer.
+    """
+    from app.core.search import ensure_search_index
+
+    with schema_lock():
+        sync_schema(metadata)
+        ensure_search_index(engine)
+
+def sync_schema(metadata: MetaData) -> None:
+    """
+    Cria as tabelas ausentes e adiciona colunas novas às tabelas existentes.
+    
+    O projeto não usa migrações; isto cobre a evolução aditiva do esquema
+    (colunas anuláveis ou com valor padrão e novos índices) em bancos já criados,
+    além da troca de colunas inteiras por ponto flutuante (ex.: tempos dos
+    segmentos), que preserva os valores. Use migrate(), que serializa as
+    chamadas concorrentes.
+    
+    Args:
+        metadata: Metadados dos modelos (Base.metadata)
+    """
+    metadata.create_all(bind=engine)
+    
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                if column.name not in existing:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                elif (isinstance(existing[column.name], Integer) and isinstance(column.type, Float)
+                        and engine.dialect.name == "postgresql"):
+                    # No SQLite a afinidade INTEGER já guarda valores fracionários como REAL
+                    conn.execute(text(
+                        f'ALTER TABLE {table.name} ALTER COLUMN "{column.name}" TYPE {column_type} '
+                        f'USING "{column.name}"::{column_type}'
+                    ))
+            
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
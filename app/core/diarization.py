@@ -1,58 +1,180 @@
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple, Union
 import numpy as np
+import torch
 from pyannote.audio import Pipeline
+import inspect
 import os
+import threading
+
+from app.core.config import AUDIO_SAMPLE_RATE, DIARIZATION_MODEL, SPEAKER_EMBEDDING_MODEL, SPEAKER_EMBEDDING_MAX_SECONDS
+from app.core.speaker_assignment import assign_speakers, split_by_speaker
 
 class SpeakerDiarizer:
-    def __init__(self, auth_token: str = None):
+    def __init__(self, auth_token: str = None, model_name: str = DIARIZATION_MODEL):
         """
         Inicializar pipeline de diarização de interlocutores.
         
         Args:
             auth_token: Token de autenticação Hugging Face para pyannote.audio
+            model_name: Pipeline pré-treinado do pyannote a carregar
+
+        As threads de CPU vêm do pool do torch do processo (TORCH_NUM_THREADS,
+        ver app.core.model_registry.configure_torch_threads).
         """
+        self.model_name = model_name
         self.auth_token = auth_token or os.getenv("HUGGINGFACE_TOKEN")
         if not self.auth_token:
             raise ValueError("O token de autenticação Hugging Face é necessário")
         
         self.pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization",
+            model_name,
             use_auth_token=self.auth_token
         )
+        self._embedding = None
+        self._embedding_lock = threading.Lock()
+        
+        # Pipelines 3.x devolvem o embedding médio de cada interlocutor que já
+        # calculam para o agrupamento; nos demais, ele é calculado com embed()
+        self._pipeline_embeddings = "return_embeddings" in inspect.signature(self.pipeline.apply).parameters
+        pipeline_embedding = getattr(self.pipeline, "embedding", None)
+        self.embedding_model = (
+            pipeline_embedding if self._pipeline_embeddings and isinstance(pipeline_embedding, str)
+            else SPEAKER_EMBEDDING_MODEL
+        )
     
-    def diarize_audio(self, audio_path: str) -> List[Dict[str, Any]]:
+    def diarize_audio(self, audio: Union[str, np.ndarray],
+                      progress: Optional[Callable[..., None]] = None,
+                      return_embeddings: bool = False
+                      ) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], Dict[str, np.ndarray]]]:
         """
         Executar a diarização do locutor em um arquivo de áudio.
         
         Args:
-            audio_path: Caminho para o arquivo de áudio
+            audio: Caminho para o arquivo de áudio, ou vetor float32 mono em
+                16 kHz (como retornado por load_audio), evitando nova leitura do arquivo
+            progress: Callback opcional progress(fração, step=etapa) chamado a
+                cada lote processado pelas etapas do pipeline do pyannote
+            return_embeddings: Também retorna o embedding de voz (norma 1, no
+                espaço de self.embedding_model) de cada interlocutor
             
         Returns:
-            Lista de segmentos de diarização com rótulos de interlocutores
+            Lista de segmentos de diarização com rótulos de interlocutores e,
+            com return_embeddings, o dicionário rótulo -> embedding
         """
         try:
+            waveform = audio if isinstance(audio, np.ndarray) else None
+            if waveform is not None:
+                # pyannote aceita a forma de onda já carregada no formato (canal, tempo)
+                audio = {
+                    "waveform": torch.from_numpy(waveform).unsqueeze(0),
+                    "sample_rate": AUDIO_SAMPLE_RATE
+                }
+            
+            hook = None
+            if progress:
+                def hook(step_name, step_artifact, file=None, total=None, completed=None):
+                    if total:
+                        progress(completed / total, step=step_name)
+            
             # Executar separação de locutores
-            diarization = self.pipeline(audio_path)
+            centroids = None
+            if return_embeddings and self._pipeline_embeddings:
+                diarization, centroids = self.pipeline(audio, hook=hook, return_embeddings=True)
+            else:
+                diarization = self.pipeline(audio, hook=hook)
             
             # Converter para lista de segmentos
             segments = []
             for segment, _, speaker in diarization.itertracks(yield_label=True):
                 segments.append({
-                    'start_time': int(segment.start),
-                    'end_time': int(segment.end),
+                    'start_time': round(segment.start, 3),
+                    'end_time': round(segment.end, 3),
                     'speaker': speaker
                 })
             
-            return segments
+            if not return_embeddings:
+                return segments
+            
+            if centroids is not None:
+                embeddings = {
+                    label: centroid / (np.linalg.norm(centroid) or 1.0)
+                    for label, centroid in zip(diarization.labels(), centroids)
+                    # Interlocutores com pouca fala ficam sem embedding (NaN)
+                    if not np.isnan(centroid).any()
+                }
+            elif waveform is not None:
+                embeddings = self.speaker_embeddings(waveform, diarization)
+            else:
+                embeddings = {}
+            return segments, embeddings
         except Exception as e:
             raise Exception(f"Error performing diarization: {str(e)}")
     
+    def speaker_embeddings(self, waveform: np.ndarray, diarization) -> Dict[str, np.ndarray]:
+        """
+        Calcula um embedding por interlocutor a partir dos seus turnos mais longos,
+        limitados a SPEAKER_EMBEDDING_MAX_SECONDS de fala.
+        
+        Args:
+            waveform: Vetor float32 mono em 16 kHz
+            diarization: Anotação do pyannote com os turnos de cada interlocutor
+            
+        Returns:
+            Dicionário rótulo -> embedding normalizado
+        """
+        embeddings = {}
+        for label in diarization.labels():
+            turns = sorted(diarization.label_timeline(label), key=lambda turn: turn.duration, reverse=True)
+            pieces, total = [], 0.0
+            for turn in turns:
+                if total >= SPEAKER_EMBEDDING_MAX_SECONDS:
+                    break
+                duration = min(turn.duration, SPEAKER_EMBEDDING_MAX_SECONDS - total)
+                start = int(turn.start * AUDIO_SAMPLE_RATE)
+                pieces.append(waveform[start:start + int(duration * AUDIO_SAMPLE_RATE)])
+                total += duration
+            if pieces:
+                embeddings[label] = self.embed(np.concatenate(pieces).astype(np.float32))
+        return embeddings
+    
+    def embed(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Calcula o embedding de voz de um trecho de áudio.
+        
+        O modelo de embeddings (SPEAKER_EMBEDDING_MODEL) é carregado no primeiro uso.
+        
+        Args:
+            audio: Vetor float32 mono em 16 kHz com a fala de um único interlocutor
+            
+        Returns:
+            Embedding normalizado (norma 1), pronto para similaridade de cosseno
+        """
+        try:
+            with self._embedding_lock:
+                if self._embedding is None:
+                    from pyannote.audio.pipelines.speaker_verification import PretrainedSpeakerEmbedding
+                    self._embedding = PretrainedSpeakerEmbedding(
+                        SPEAKER_EMBEDDING_MODEL,
+                        use_auth_token=self.auth_token
+                    )
+                
+                embedding = self._embedding(torch.from_numpy(np.ascontiguousarray(audio))[None, None])[0]
+            
+            return embedding / (np.linalg.norm(embedding) or 1.0)
+        except Exception as e:
+            raise Exception(f"Error computing speaker embedding: {str(e)}")
+    
     def assign_speakers_to_segments(self, 
                                   transcription_segments: List[Dict[str, Any]], 
                                   diarization_segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Assign speaker labels to transcription segments based on diarization results.
         
+        Each word (or each segment, when it has no word timestamps) gets the
+        speaker with the largest overlap, found through a sorted interval
+        index instead of scanning every diarization segment. Segments are
+        split wherever the speaker changes between words.
+        
         Args:
             transcription_segments: List of transcription segments
             diarization_segments: List of diarization segments with speaker labels
@@ -65,30 +187,24 @@ class SpeakerDiarizer:
             transcription_segments.sort(key=lambda x: x['start_time'])
             diarization_segments.sort(key=lambda x: x['start_time'])
             
-            # Atribuir interlocutores a segmentos de transcrição
-            for trans_segment in transcription_segments:
-                # Encontre segmentos de diarização sobrepostos
-                overlapping_speakers = []
-                for diar_segment in diarization_segments:
-                    if (diar_segment['start_time'] <= trans_segment['end_time'] and 
-                        diar_segment['end_time'] >= trans_segment['start_time']):
-                        # Calcular a duração da sobreposição
-                        overlap_start = max(trans_segment['start_time'], diar_segment['start_time'])
-                        overlap_end = min(trans_segment['end_time'], diar_segment['end_time'])
-                        overlap_duration = overlap_end - overlap_start
-                        
-                        overlapping_speakers.append({
-                            'speaker': diar_segment['speaker'],
-                            'duration': overlap_duration
-                        })
-                
-                # Atribuir interlocutor com sobreposição máxima
-                if overlapping_speakers:
-                    max_overlap = max(overlapping_speakers, key=lambda x: x['duration'])
-                    trans_segment['speaker'] = max_overlap['speaker']
-                else:
-                    trans_segment['speaker'] = "unknown"
+            return split_by_speaker(transcription_segments, diarization_segments)
+        except Exception as e:
+            raise Exception(f"Error assigning speakers: {str(e)}")
+    
+    def assign_speakers_to_words(self,
+                                 words: List[Dict[str, Any]],
+                                 diarization_segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Assign speaker labels to individual words (Whisper word timestamps).
+        
+        Args:
+            words: List of words with 'start' and 'end' in seconds
+            diarization_segments: List of diarization segments with speaker labels
             
-            return transcription_segments
+        Returns:
+            List of words with assigned speaker labels
+        """
+        try:
+            return assign_speakers(words, diarization_segments, start_key='start', end_key='end')
         except Exception as e:
-            raise Exception(f"Error assigning speakers: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error assigning speakers: {str(e)}")
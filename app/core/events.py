@@ -0,0 +1,251 @@
+"""
+Eventos de progresso das transcrições.
+
+O pipeline publica um evento por etapa (início, progresso e fim) e os
+clientes os recebem por SSE ou WebSocket em /transcripts/{id}/events, sem
+consultar o banco repetidamente.
+
+O backend é escolhido por EVENTS_BACKEND:
+- "memory": pub/sub dentro do processo; só alcança assinantes do mesmo
+  processo (desenvolvimento, testes ou pipeline rodando junto da API)
+- "postgres": LISTEN/NOTIFY, entregando os eventos dos workers à API
+- "auto" (padrão): "postgres" quando o banco é PostgreSQL, senão "memory"
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import EVENTS_BACKEND, EVENTS_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Canal do LISTEN/NOTIFY no PostgreSQL
+EVENTS_CHANNEL = "transcription_events"
+
+# Status que encerram o acompanhamento de uma transcrição
+TERMINAL_STATUSES = {"completed", "failed"}
+
+# O payload do NOTIFY é limitado a 8000 bytes
+NOTIFY_MAX_BYTES = 7900
+# Tamanho máximo de um campo de texto (ex.: error) em um evento grande
+DETAIL_MAX_CHARS = 1000
+# Campos mantidos quando mesmo truncado o evento não cabe no NOTIFY
+EVENT_CORE_FIELDS = ("transcription_id", "stage", "status", "timestamp", "progress")
+
+class Subscription:
+    """
+    Fila de eventos de uma transcrição para um assinante em um event loop asyncio.
+
+    Se o cliente não consumir a tempo, os eventos mais antigos são descartados:
+    cada evento traz o estado da etapa, então perder intermediários é aceitável.
+    """
+
+    def __init__(self, broker: "MemoryBroker", transcription_id: int, loop: asyncio.AbstractEventLoop):
+        self.transcription_id = transcription_id
+        self._broker = broker
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """
+        Entrega um evento; pode ser chamado de qualquer thread.
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # Event loop já encerrado
+            self.close()
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Aguarda o próximo evento; retorna None se o tempo acabar.
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._broker.unsubscribe(self)
+
+class MemoryBroker:
+    """
+    Pub/sub de eventos dentro do processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def publish(self, transcription_id: int, event: Dict[str, Any]) -> None:
+        self._dispatch(transcription_id, event)
+
+    def _dispatch(self, transcription_id: int, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(transcription_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscribe(self, transcription_id: int) -> Subscription:
+        """
+        Assina os eventos de uma transcrição; deve ser chamado dentro do event loop.
+        """
+        subscription = Subscription(self, transcription_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[transcription_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.transcription_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.transcription_id]
+
+    def close(self) -> None:
+        pass
+
+def _notify_payload(transcription_id: int, event: Dict[str, Any]) -> str:
+    """
+    Serializa um evento para o NOTIFY, truncando os campos de texto longos
+    (ex.: stderr do ffmpeg em error) e, se ainda não couber, descartando os
+    detalhes. Um NOTIFY grande demais falharia e o evento se perderia.
+    """
+    payload = json.dumps({"transcription_id": transcription_id, "event": event})
+    if len(payload.encode("utf-8")) <= NOTIFY_MAX_BYTES:
+        return payload
+    event = {
+        key: value[:DETAIL_MAX_CHARS] + "…" if isinstance(value, str) and len(value) > DETAIL_MAX_CHARS else value
+        for key, value in event.items()
+    }
+    payload = json.dumps({"transcription_id": transcription_id, "event": event})
+    if len(payload.encode("utf-8")) <= NOTIFY_MAX_BYTES:
+        return payload
+    event = {key: event[key] for key in EVENT_CORE_FIELDS if key in event}
+    return json.dumps({"transcription_id": transcription_id, "event": event})
+
+class PostgresBroker(MemoryBroker):
+    """
+    Eventos entre processos por LISTEN/NOTIFY.
+
+    publish() envia um NOTIFY; cada processo com assinantes mantém uma conexão
+    dedicada em LISTEN, iniciada no primeiro subscribe, e repassa os eventos
+    recebidos aos seus assinantes locais.
+    """
+
+    def __init__(self, engine):
+        super().__init__()
+        self._engine = engine
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def publish(self, transcription_id: int, event: Dict[str, Any]) -> None:
+        payload = _notify_payload(transcription_id, event)
+        with self._engine.connect() as conn:
+            conn.exec_driver_sql("SELECT pg_notify(%s, %s)", (EVENTS_CHANNEL, payload))
+            conn.commit()
+
+    def subscribe(self, transcription_id: int) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="events-listener", daemon=True)
+                self._listener.start()
+        return super().subscribe(transcription_id)
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            try:
+                raw = self._engine.raw_connection()
+                try:
+                    connection = raw.driver_connection
+                    connection.autocommit = True
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"LISTEN {EVENTS_CHANNEL}")
+                    while not self._stop.is_set():
+                        if select.select([connection], [], [], 5) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            notify = connection.notifies.pop(0)
+                            message = json.loads(notify.payload)
+                            self._dispatch(message["transcription_id"], message["event"])
+                finally:
+                    raw.invalidate()
+            except Exception:
+                logger.exception("Conexão de eventos perdida; reconectando")
+                self._stop.wait(1)
+
+    def close(self) -> None:
+        self._stop.set()
+
+_broker: Optional[MemoryBroker] = None
+_broker_lock = threading.Lock()
+
+def get_broker() -> MemoryBroker:
+    """
+    Retorna o broker de eventos do processo, criando-o no primeiro uso.
+    """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            from app.core.database import engine
+
+            backend = EVENTS_BACKEND
+            if backend == "auto":
+                backend = "postgres" if engine.dialect.name == "postgresql" else "memory"
+            if backend == "postgres":
+                _broker = PostgresBroker(engine)
+            elif backend == "memory":
+                _broker = MemoryBroker()
+            else:
+                raise ValueError(f"EVENTS_BACKEND desconhecido: {backend}")
+        return _broker
+
+def publish_event(transcription_id: int, stage: str, status: str,
+                  progress: Optional[float] = None, **detail: Any) -> None:
+    """
+    Publica um evento de progresso. Falhas são apenas registradas: o
+    acompanhamento nunca interrompe o processamento.
+
+    Args:
+        transcription_id: ID da transcrição
+        stage: Etapa (upload, audio_prep, transcription, diarization, persistence, job...)
+        status: started, progress, completed, failed ou queued
+        progress: Fração concluída da etapa, entre 0 e 1
+        detail: Campos adicionais (ex.: seconds, step)
+    """
+    event = {"transcription_id": transcription_id, "stage": stage, "status": status, "timestamp": time.time()}
+    if progress is not None:
+        event["progress"] = round(progress, 4)
+    event.update(detail)
+    try:
+        get_broker().publish(transcription_id, event)
+    except Exception as e:
+        logger.warning("Falha ao publicar evento da transcrição %s: %s", transcription_id, e)
+
+def progress_reporter(transcription_id: int, stage: str, min_interval: float = 0.5):
+    """
+    Cria um callback progress(fraction, **detail) que publica no máximo um
+    evento a cada min_interval segundos (o de conclusão sempre é publicado).
+    """
+    last = [0.0]
+
+    def report(fraction: float, **detail: Any) -> None:
+        now = time.monotonic()
+        if fraction < 1 and now - last[0] < min_interval:
+            return
+        last[0] = now
+        publish_event(transcription_id, stage, "progress", progress=fraction, **detail)
+
+    return report
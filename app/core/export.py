@@ -0,0 +1,67 @@
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+# Tamanho aproximado de cada bloco enviado ao cliente
+EXPORT_CHUNK_CHARS = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+}
+
+def format_timestamp(seconds: float, decimal_marker: str = ",") -> str:
+    """
+    Formata segundos como HH:MM:SS,mmm (SRT) ou HH:MM:SS.mmm (WebVTT).
+    """
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_marker}{milliseconds:03d}"
+
+def _ndjson(segments: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for segment in segments:
+        yield json.dumps(segment, ensure_ascii=False) + "\n"
+
+def _srt(segments: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for index, segment in enumerate(segments, start=1):
+        yield (
+            f"{index}\n"
+            f"{format_timestamp(segment['start_time'])} --> {format_timestamp(segment['end_time'])}\n"
+            f"{segment['speaker']}: {segment['text'].strip()}\n\n"
+        )
+
+def _vtt(segments: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    yield "WEBVTT\n\n"
+    for segment in segments:
+        text = segment['text'].strip().replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        yield (
+            f"{format_timestamp(segment['start_time'], '.')} --> {format_timestamp(segment['end_time'], '.')}\n"
+            f"<v {segment['speaker']}>{text}\n\n"
+        )
+
+_FORMATTERS = {"ndjson": _ndjson, "srt": _srt, "vtt": _vtt}
+
+def export_segments(segments: Iterable[Dict[str, Any]], export_format: str) -> Iterator[bytes]:
+    """
+    Gera a exportação dos segmentos incrementalmente, em blocos de texto UTF-8.
+
+    Args:
+        segments: Segmentos em ordem de início (pode ser um cursor do banco)
+        export_format: "ndjson", "srt" ou "vtt"
+
+    Yields:
+        Blocos de aproximadamente EXPORT_CHUNK_CHARS caracteres
+    """
+    buffer = []
+    size = 0
+    for piece in _FORMATTERS[export_format](segments):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_CHARS:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
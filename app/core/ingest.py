@@ -0,0 +1,231 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+
+from app.core.audio_utils import prepare_audio, start_audio_decoder, wav_duration
+from app.core.config import MAX_UPLOAD_BYTES, MAX_MEDIA_SECONDS, KEEP_UPLOADED_VIDEO
+from app.core.storage import store
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Campos de formulário comuns (ex.: model_size) são pequenos
+MAX_FORM_FIELD_BYTES = 1024
+
+class UploadRejected(Exception):
+    """
+    Upload recusado durante a ingestão (tamanho, duração ou formato).
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class MediaIngest:
+    """
+    Recebe o vídeo em blocos e, enquanto os bytes chegam, calcula o hash,
+    alimenta o ffmpeg que prepara o áudio e aplica os limites de tamanho e de
+    duração.
+
+    Os bytes também vão para um arquivo temporário, usado apenas se o
+    contêiner não puder ser decodificado em fluxo (ex.: MP4 com o índice no
+    final). Ele é descartado ao final, a menos que KEEP_UPLOADED_VIDEO esteja ativo.
+
+    A ingestão termina em etapas: finish() (hash), decode() (áudio e duração)
+    e save() (armazenamento); abort() descarta os temporários em qualquer ponto.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = MAX_UPLOAD_BYTES, max_seconds: float = MAX_MEDIA_SECONDS):
+        self.filename = filename
+        self.suffix = os.path.splitext(filename or "")[1].lower()
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.size = 0
+        self.content_hash: Optional[str] = None
+        self.duration = 0.0
+        self.audio_path: Optional[str] = None
+        self.video_path: Optional[str] = None
+
+        self._hasher = hashlib.sha256()
+        self._spool_path = store.temp_path(self.suffix)
+        self._spool = open(self._spool_path, "wb")
+        self._audio_tmp = store.temp_path(".wav")
+        self._stderr = tempfile.TemporaryFile()
+        self._decoder = start_audio_decoder(self._audio_tmp, self._stderr)
+        self._decoder_alive = True
+
+    def write(self, data: bytes) -> None:
+        """
+        Processa um bloco do vídeo.
+        """
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise UploadRejected(413, f"Arquivo excede o limite de {self.max_bytes} bytes")
+
+        self._hasher.update(data)
+        self._spool.write(data)
+
+        if self._decoder_alive:
+            try:
+                self._decoder.stdin.write(data)
+            except (BrokenPipeError, OSError):
+                # Contêiner não decodificável em fluxo; será tratado em finish()
+                self._decoder_alive = False
+
+        if self.max_seconds and wav_duration(self._audio_tmp) > self.max_seconds:
+            raise UploadRejected(413, f"Mídia excede a duração máxima de {self.max_seconds:.0f} segundos")
+
+    def finish(self) -> None:
+        """
+        Encerra o recebimento e calcula o hash do conteúdo, sem esperar o
+        áudio. Com o hash já é possível consultar o cache antes de decode().
+        """
+        self._spool.close()
+        self.content_hash = self._hasher.hexdigest()
+
+    def decode(self) -> None:
+        """
+        Finaliza o áudio (a partir do arquivo completo, se a decodificação em
+        fluxo falhou) e confere a duração.
+        """
+        try:
+            self._decoder.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self._decoder.wait()
+
+        if returncode != 0:
+            self._stderr.seek(0)
+            logger.info(
+                "Decodificação em fluxo falhou (%s); preparando o áudio a partir do arquivo completo",
+                self._stderr.read().decode("utf-8", errors="replace").strip()
+            )
+            if os.path.exists(self._audio_tmp):
+                os.remove(self._audio_tmp)
+            try:
+                self._audio_tmp = os.path.join(store.temp_dir(), prepare_audio(self._spool_path, store.temp_dir()))
+            except Exception as e:
+                raise UploadRejected(415, f"Não foi possível extrair o áudio do arquivo: {e}")
+        self._stderr.close()
+
+        self.duration = wav_duration(self._audio_tmp)
+        if self.max_seconds and self.duration > self.max_seconds:
+            raise UploadRejected(413, f"Mídia excede a duração máxima de {self.max_seconds:.0f} segundos")
+
+    def save(self) -> None:
+        """
+        Move o áudio (e o vídeo, com KEEP_UPLOADED_VIDEO) para o armazenamento.
+        """
+        self.audio_path = store.put(self._audio_tmp, self.content_hash, ".wav")
+        if KEEP_UPLOADED_VIDEO:
+            self.video_path = store.put(self._spool_path, self.content_hash, self.suffix)
+        else:
+            os.remove(self._spool_path)
+            self.video_path = store.path_for(self.content_hash, self.suffix)
+
+    def abort(self) -> None:
+        """
+        Interrompe a ingestão e remove os arquivos temporários.
+        """
+        if not self._spool.closed:
+            self._spool.close()
+        if self._decoder.poll() is None:
+            self._decoder.kill()
+            self._decoder.wait()
+        if not self._stderr.closed:
+            self._stderr.close()
+        for path in (self._spool_path, self._audio_tmp):
+            if os.path.exists(path):
+                os.remove(path)
+
+class MultipartIngest:
+    """
+    Analisa um corpo multipart/form-data em fluxo, enviando a parte do arquivo
+    para um MediaIngest e guardando os demais campos (ex.: model_size).
+    """
+
+    def __init__(self, content_type: str, file_field: str = "file"):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadRejected(400, "Cabeçalho multipart sem boundary")
+
+        self.file_field = file_field
+        self.fields: Dict[str, str] = {}
+        self.media: Optional[MediaIngest] = None
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._current_name: Optional[str] = None
+        self._current_value = b""
+        self._is_file = False
+
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def write(self, data: bytes) -> None:
+        self._parser.write(data)
+
+    def finish(self) -> None:
+        self._parser.finalize()
+        if self.media is None:
+            raise UploadRejected(400, f"Campo '{self.file_field}' ausente")
+        self.media.finish()
+
+    def abort(self) -> None:
+        if self.media is not None:
+            self.media.abort()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._current_name = None
+        self._current_value = b""
+        self._is_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._current_name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+        if self._current_name == self.file_field and filename is not None:
+            if self.media is not None:
+                raise UploadRejected(400, "Envie apenas um arquivo por requisição")
+            self._is_file = True
+            self.media = MediaIngest(filename.decode("utf-8", errors="replace"))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._is_file:
+            self.media.write(data[start:end])
+        else:
+            self._current_value += data[start:end]
+            if len(self._current_value) > MAX_FORM_FIELD_BYTES:
+                raise UploadRejected(400, f"Campo '{self._current_name}' muito grande")
+
+    def _on_part_end(self) -> None:
+        if not self._is_file and self._current_name:
+            self.fields[self._current_name] = self._current_value.decode("utf-8", errors="replace")
@@ -0,0 +1,305 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import (
+    JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_RETRY_MAX_SECONDS, JOB_STALE_SECONDS, MAX_RUNNING_JOBS,
+    SCHEDULER_CANDIDATES, WHISPER_MODEL_SIZE, WHISPER_WORD_TIMESTAMPS
+)
+from app.core.scheduler import (
+    DEFAULT_TENANT, PRIORITY_CLASSES, default_priority, estimate_cost, estimate_memory, host_overcommitted,
+    order_candidates
+)
+from app.models.schema import Transcription, TranscriptionJob
+
+def enqueue_job(db: Session, transcription: Transcription, video_path: str,
+                checkpoints: Optional[dict] = None, media_seconds: Optional[float] = None,
+                priority: Optional[str] = None, tenant_id: str = DEFAULT_TENANT) -> TranscriptionJob:
+    """
+    Coloca uma transcrição na fila persistente de processamento.
+
+    Args:
+        db: Sessão do banco de dados
+        transcription: Registro da transcrição a processar
+        video_path: Caminho para o vídeo enviado
+        checkpoints: Etapas já concluídas a reaproveitar (ex.: em um reprocessamento)
+        media_seconds: Duração da mídia, base das estimativas de custo e memória
+        priority: Classe de prioridade (padrão conforme a duração; ver app.core.scheduler)
+        tenant_id: Inquilino dono do job, para o fair share
+
+    Returns:
+        Job criado (ainda não confirmado; o chamador faz o commit)
+    """
+    model_size = transcription.model_size or WHISPER_MODEL_SIZE
+    backend = transcription.whisper_backend or "reference"
+    job = TranscriptionJob(
+        transcription_id=transcription.id,
+        video_path=video_path,
+        status="queued",
+        max_attempts=JOB_MAX_ATTEMPTS,
+        available_at=datetime.utcnow(),
+        checkpoints=checkpoints,
+        tenant_id=tenant_id,
+        priority=priority or default_priority(media_seconds),
+        media_seconds=media_seconds,
+        cost_seconds=estimate_cost(media_seconds, model_size, backend) if media_seconds is not None else None,
+        memory_bytes=estimate_memory(media_seconds) if media_seconds is not None else None
+    )
+    db.add(job)
+    return job
+
+# Chave do pg_advisory_xact_lock que serializa as reservas sob MAX_RUNNING_JOBS
+CLAIM_LOCK_KEY = 815_230_468
+
+def claim_job(db: Session, worker_id: str) -> Optional[TranscriptionJob]:
+    """
+    Reserva o próximo job disponível para um worker.
+
+    Os candidatos (os mais antigos e os das classes mais urgentes) são
+    ordenados por app.core.scheduler.order_candidates, que aplica as
+    prioridades, o fair share entre inquilinos e o orçamento do host. O
+    UPDATE condicional garante a exclusividade: se outro worker reservou o
+    job antes, tenta o seguinte. Depois da reserva o orçamento do host é
+    conferido de novo (ver host_overcommitted); se outro processo do host
+    reservou ao mesmo tempo e o estourou, o job volta para a fila.
+
+    Com MAX_RUNNING_JOBS, a contagem dos jobs em execução faz parte do próprio
+    UPDATE; no PostgreSQL as reservas são serializadas por um
+    pg_advisory_xact_lock (no SQLite a escrita já é serializada), então
+    workers concorrentes não ultrapassam o limite.
+
+    Args:
+        db: Sessão do banco de dados
+        worker_id: Identificador do worker que vai processar o job
+
+    Returns:
+        Job reservado, ou None se a fila estiver vazia ou no limite de concorrência
+    """
+    # Verificação rápida; o limite é garantido no UPDATE da reserva
+    if MAX_RUNNING_JOBS > 0:
+        running = db.query(func.count(TranscriptionJob.id)).filter(TranscriptionJob.status == "running").scalar()
+        if running >= MAX_RUNNING_JOBS:
+            db.rollback()
+            return None
+
+    now = datetime.utcnow()
+    available = db.query(TranscriptionJob).filter(
+        TranscriptionJob.status == "queued", TranscriptionJob.available_at <= now
+    )
+    urgency = case(
+        {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}, value=TranscriptionJob.priority, else_=1
+    )
+    candidates = {
+        job.id: job
+        for query in (
+            available.order_by(TranscriptionJob.available_at, TranscriptionJob.id),
+            available.order_by(urgency, TranscriptionJob.available_at, TranscriptionJob.id),
+        )
+        for job in query.limit(SCHEDULER_CANDIDATES).all()
+    }
+    if not candidates:
+        db.rollback()
+        return None
+    running = db.query(TranscriptionJob).filter(TranscriptionJob.status == "running").all()
+
+    conditions = [TranscriptionJob.status == "queued"]
+    serialize = False
+    if MAX_RUNNING_JOBS > 0:
+        running_jobs = aliased(TranscriptionJob)
+        running_count = (
+            select(func.count(running_jobs.id)).where(running_jobs.status == "running").scalar_subquery()
+        )
+        conditions.append(running_count < MAX_RUNNING_JOBS)
+        serialize = db.get_bind().dialect.name == "postgresql"
+
+    for candidate in order_candidates(candidates.values(), running, worker_id, now):
+        if serialize:
+            # Liberado no commit; o UPDATE seguinte já vê as reservas confirmadas
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CLAIM_LOCK_KEY})
+        result = db.execute(
+            update(TranscriptionJob)
+            .where(TranscriptionJob.id == candidate.id, *conditions)
+            .values(
+                status="running",
+                attempts=TranscriptionJob.attempts + 1,
+                locked_by=worker_id,
+                heartbeat_at=now,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            continue
+        db.refresh(candidate)
+        running = db.query(TranscriptionJob).filter(TranscriptionJob.status == "running").all()
+        if host_overcommitted(candidate, running, worker_id):
+            _release_claim(db, candidate, worker_id)
+            continue
+        return candidate
+    # Não deixa a transação aberta enquanto o worker espera a próxima consulta
+    db.rollback()
+    return None
+
+def _release_claim(db: Session, job: TranscriptionJob, worker_id: str) -> None:
+    """
+    Devolve à fila um job recém-reservado, sem contar a tentativa.
+    """
+    db.execute(
+        update(TranscriptionJob)
+        .where(TranscriptionJob.id == job.id, TranscriptionJob.locked_by == worker_id,
+               TranscriptionJob.status == "running")
+        .values(status="queued", attempts=TranscriptionJob.attempts - 1, locked_by=None, heartbeat_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def heartbeat(db: Session, job_id: int, worker_id: str) -> None:
+    """
+    Renova o heartbeat de um job em execução para que ele não seja considerado abandonado.
+    """
+    db.execute(
+        update(TranscriptionJob)
+        .where(TranscriptionJob.id == job_id, TranscriptionJob.locked_by == worker_id)
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    db.commit()
+
+def complete_job(db: Session, job: TranscriptionJob, metrics: Optional[dict] = None) -> None:
+    """
+    Marca um job como concluído, guardando as métricas do processamento.
+    """
+    job.status = "completed"
+    job.metrics = metrics
+    job.locked_by = None
+    job.last_error = None
+    db.commit()
+
+def fail_job(db: Session, job: TranscriptionJob, error: str) -> bool:
+    """
+    Registra a falha de um job, reagendando-o com backoff exponencial enquanto houver tentativas.
+
+    Args:
+        db: Sessão do banco de dados
+        job: Job que falhou
+        error: Mensagem de erro
+
+    Returns:
+        True se o job foi reagendado, False se as tentativas se esgotaram
+    """
+    job.last_error = error
+    job.locked_by = None
+
+    retry = job.attempts < job.max_attempts
+    if retry:
+        delay = min(JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), JOB_RETRY_MAX_SECONDS)
+        job.status = "queued"
+        job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+    else:
+        job.status = "failed"
+
+    db.commit()
+    return retry
+
+def requeue_stale_jobs(db: Session) -> int:
+    """
+    Devolve à fila os jobs cujo worker parou de enviar heartbeat
+    (worker morto ou host reiniciado durante o processamento). Jobs que já
+    esgotaram as tentativas são marcados como falhos, para que um vídeo que
+    derruba o worker não entre em ciclo infinito.
+
+    Returns:
+        Quantidade de jobs reagendados
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    stale_jobs = (
+        db.query(TranscriptionJob)
+        .filter(TranscriptionJob.status == "running", TranscriptionJob.heartbeat_at < cutoff)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    requeued = 0
+    for job in stale_jobs:
+        job.locked_by = None
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.available_at = datetime.utcnow()
+            requeued += 1
+        else:
+            job.status = "failed"
+            job.last_error = "Worker interrompido durante o processamento"
+            transcription = db.get(Transcription, job.transcription_id)
+            if transcription:
+                transcription.status = "failed"
+
+    db.commit()
+    return requeued
+
+def find_cached_transcription(db: Session, content_hash: str, model_size: str, language: str,
+                              diarization_model: str, whisper_backend: str = "reference",
+                              word_timestamps: bool = WHISPER_WORD_TIMESTAMPS) -> Optional[Transcription]:
+    """
+    Procura uma transcrição do mesmo conteúdo com as mesmas configurações.
+
+    Considera também jobs ainda em andamento, para que reenvios simultâneos do
+    mesmo vídeo não disparem processamentos duplicados.
+
+    Returns:
+        Transcrição existente (concluída de preferência), ou None
+    """
+    candidates = (
+        db.query(Transcription)
+        .filter(
+            Transcription.content_hash == content_hash,
+            Transcription.model_size == model_size,
+            # Transcrições anteriores aos backends usaram o reference
+            func.coalesce(Transcription.whisper_backend, "reference") == whisper_backend,
+            Transcription.language == language,
+            Transcription.diarization_model == diarization_model,
+            # Transcrições anteriores aos tempos por palavra não os têm
+            func.coalesce(Transcription.word_timestamps, False) == word_timestamps,
+            Transcription.status.in_(("completed", "processing", "queued"))
+        )
+        .order_by(Transcription.id.desc())
+        .all()
+    )
+    for transcription in candidates:
+        if transcription.status == "completed":
+            return transcription
+    return candidates[0] if candidates else None
+
+def pending_content_hashes(db: Session) -> List[str]:
+    """
+    Hashes de conteúdo dos jobs na fila ou em execução, cujos artefatos não podem ser descartados.
+    """
+    rows = (
+        db.query(Transcription.content_hash)
+        .join(TranscriptionJob, TranscriptionJob.transcription_id == Transcription.id)
+        .filter(TranscriptionJob.status.in_(("queued", "running")), Transcription.content_hash.isnot(None))
+        .distinct()
+        .all()
+    )
+    return [row.content_hash for row in rows]
+
+def protected_digests(db: Session) -> List[str]:
+    """
+    Hashes dos artefatos que o descarte por cota não pode remover: o conteúdo
+    e os checkpoints dos jobs na fila ou em execução e as transcrições JSON
+    registradas (transcript_filename). Os artefatos derivados são gravados
+    sob artifact_digest, então o hash vem do nome do arquivo.
+    """
+    digests = set(pending_content_hashes(db))
+    pending = db.query(TranscriptionJob.checkpoints).filter(
+        TranscriptionJob.status.in_(("queued", "running")), TranscriptionJob.checkpoints.isnot(None)
+    )
+    paths = [entry["path"] for (checkpoints,) in pending for entry in checkpoints.values()]
+    transcripts = db.query(Transcription.transcript_filename).filter(
+        Transcription.transcript_filename.isnot(None), Transcription.transcript_filename != ""
+    )
+    paths.extend(filename for (filename,) in transcripts)
+    digests.update(os.path.basename(path).split(".", 1)[0] for path in paths)
+    return list(digests)
@@ -0,0 +1,172 @@
+"""
+Métricas e rastreamento do processamento.
+
+- Cada job guarda em TranscriptionJob.metrics a duração de cada etapa, a
+  duração do áudio, o fator de tempo real (tempo total / duração do áudio) e o
+  pico de RSS do processo worker.
+- Com o pacote prometheus_client instalado, os mesmos valores alimentam
+  histogramas expostos em /metrics. API e workers são processos distintos:
+  defina PROMETHEUS_MULTIPROC_DIR (diretório compartilhado, limpo a cada
+  subida) para que o /metrics da API agregue os workers do mesmo host.
+- Com OTEL_TRACING_ENABLED=true e o opentelemetry-api instalado, cada job e
+  cada etapa viram spans; o exportador é o configurado no SDK do
+  OpenTelemetry (ex.: executando com opentelemetry-instrument).
+"""
+import contextlib
+import functools
+import os
+import resource
+import sys
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from app.core.config import OTEL_TRACING_ENABLED
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Histogram
+except ImportError:
+    prometheus_client = None
+
+_tracer = None
+if OTEL_TRACING_ENABLED:
+    try:
+        from opentelemetry import context as otel_context, trace
+        _tracer = trace.get_tracer("transcriber")
+    except ImportError:
+        pass
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+REAL_TIME_FACTOR_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+RSS_BUCKETS = tuple(2 ** exponent * 1024 ** 2 for exponent in range(8, 16))  # 256 MiB a 32 GiB
+
+if prometheus_client is not None:
+    STAGE_SECONDS = Histogram(
+        "transcriber_stage_seconds", "Duração de cada etapa do processamento", ["stage"],
+        buckets=DURATION_BUCKETS
+    )
+    JOB_SECONDS = Histogram(
+        "transcriber_job_seconds", "Duração total do processamento de um job", ["model_size", "backend"],
+        buckets=DURATION_BUCKETS
+    )
+    AUDIO_SECONDS = Histogram(
+        "transcriber_audio_seconds", "Duração do áudio processado por job",
+        buckets=(30, 60, 300, 600, 1800, 3600, 7200, 14400)
+    )
+    REAL_TIME_FACTOR = Histogram(
+        "transcriber_real_time_factor", "Tempo de processamento dividido pela duração do áudio",
+        ["model_size", "backend"], buckets=REAL_TIME_FACTOR_BUCKETS
+    )
+    PEAK_RSS_BYTES = Histogram(
+        "transcriber_job_peak_rss_bytes", "Pico de RSS do processo worker durante o job",
+        buckets=RSS_BUCKETS
+    )
+    QUEUE_WAIT_SECONDS = Histogram(
+        "transcriber_queue_wait_seconds", "Espera na fila até a reserva por um worker", ["priority"],
+        buckets=DURATION_BUCKETS
+    )
+    JOBS = Counter("transcriber_jobs", "Jobs finalizados por resultado", ["status"])
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if prometheus_client is not None:
+        STAGE_SECONDS.labels(stage).observe(seconds)
+
+def observe_queue_wait(priority: str, seconds: float) -> None:
+    if prometheus_client is not None:
+        QUEUE_WAIT_SECONDS.labels(priority).observe(seconds)
+
+def record_job(metrics: Dict[str, Any], model_size: str, backend: str) -> None:
+    """
+    Registra nos histogramas as métricas de um job concluído.
+    """
+    if prometheus_client is None:
+        return
+    JOB_SECONDS.labels(model_size, backend).observe(metrics["total_seconds"])
+    if metrics.get("audio_seconds"):
+        AUDIO_SECONDS.observe(metrics["audio_seconds"])
+        REAL_TIME_FACTOR.labels(model_size, backend).observe(metrics["real_time_factor"])
+    if metrics.get("peak_rss_bytes"):
+        PEAK_RSS_BYTES.observe(metrics["peak_rss_bytes"])
+
+def count_job(status: str) -> None:
+    """
+    Conta um job finalizado: completed, retried ou failed.
+    """
+    if prometheus_client is not None:
+        JOBS.labels(status).inc()
+
+def render_metrics() -> Optional[Tuple[bytes, str]]:
+    """
+    Gera o texto de exposição do Prometheus, ou None sem o prometheus_client.
+    """
+    if prometheus_client is None:
+        return None
+    registry = prometheus_client.REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+def process_exited(pid: int) -> None:
+    """
+    Descarta os arquivos de métricas de um processo encerrado (modo multiprocesso).
+    """
+    if prometheus_client is not None and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """
+    Abre um span do OpenTelemetry, se o rastreamento estiver ativo.
+    """
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+def in_current_context(func: Callable) -> Callable:
+    """
+    Faz func rodar, em outra thread, sob o span atual desta thread.
+    """
+    if _tracer is None:
+        return func
+    parent = otel_context.get_current()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = otel_context.attach(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            otel_context.detach(token)
+
+    return wrapper
+
+def reset_peak_rss() -> bool:
+    """
+    Zera o pico de RSS do processo (Linux), para medir o de um job isolado.
+    """
+    try:
+        # Escrever 5 em clear_refs zera o VmHWM sem afetar as páginas
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_bytes() -> int:
+    """
+    Pico de RSS do processo desde o último reset_peak_rss (ou desde o início).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está em bytes no macOS e em KiB nos demais
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,168 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Tuple
+
+import torch
+
+from app.core.config import (
+    WHISPER_MODEL_SIZE, WHISPER_ALLOWED_MODELS, WHISPER_BACKEND, WHISPER_ALLOWED_BACKENDS, DIARIZATION_MODEL,
+    MODEL_CACHE_MAX_BYTES, MODEL_CACHE_MAX_ENTRIES,
+    WHISPER_NUM_THREADS, TORCH_NUM_THREADS
+)
+
+logger = logging.getLogger(__name__)
+
+def estimate_model_bytes(obj: Any, _seen: set = None, _depth: int = 3) -> int:
+    """
+    Estima a memória ocupada pelos pesos de um modelo somando os parâmetros e
+    buffers dos módulos torch encontrados nos atributos do objeto. Objetos com
+    o atributo estimated_bytes (ex.: modelos quantizados ou do CTranslate2)
+    informam o próprio tamanho.
+
+    Args:
+        obj: Modelo, transcritor ou pipeline a medir
+
+    Returns:
+        Tamanho aproximado em bytes
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    declared = getattr(obj, "estimated_bytes", None)
+    if isinstance(declared, int):
+        return declared
+    if isinstance(obj, torch.nn.Module):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    if _depth == 0:
+        return 0
+    if isinstance(obj, dict):
+        children = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        children = obj
+    elif hasattr(obj, "__dict__"):
+        children = vars(obj).values()
+    else:
+        return 0
+    return sum(estimate_model_bytes(child, seen, _depth - 1) for child in children)
+
+def configure_torch_threads(num_threads: int = TORCH_NUM_THREADS) -> None:
+    """
+    Define o pool intra-op do torch do processo. O pool é global: chamado uma
+    vez, antes de carregar os modelos, e nunca por requisição, já que
+    transcrição e diarização rodam em threads paralelas e o dividem.
+    """
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+class ModelRegistry:
+    """
+    Cache LRU de modelos carregados sob demanda.
+
+    Os modelos só são carregados no primeiro uso e ficam em memória até que o
+    limite de bytes (MODEL_CACHE_MAX_BYTES) ou de entradas
+    (MODEL_CACHE_MAX_ENTRIES) obrigue a descartar o menos usado. Um modelo
+    descartado continua válido para quem ainda o estiver usando: o registro
+    só solta a sua referência, e os recursos do modelo (ex.: o pool de
+    processos do transcritor) são liberados quando a última referência some.
+    """
+
+    def __init__(self, max_bytes: int = MODEL_CACHE_MAX_BYTES, max_entries: int = MODEL_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading_locks = {}
+
+    def get_transcriber(self, model_size: str = WHISPER_MODEL_SIZE, backend: str = WHISPER_BACKEND):
+        """
+        Obtém o transcritor Whisper do tamanho e backend pedidos, carregando-o se necessário.
+        """
+        if model_size not in WHISPER_ALLOWED_MODELS:
+            raise ValueError(f"Modelo Whisper não permitido: {model_size}")
+        if backend not in WHISPER_ALLOWED_BACKENDS:
+            raise ValueError(f"Backend Whisper não permitido: {backend}")
+
+        from app.core.transcription import WhisperTranscriber
+        return self._get(
+            ("whisper", f"{model_size}@{backend}"),
+            lambda: WhisperTranscriber(model_size, num_threads=WHISPER_NUM_THREADS, backend=backend)
+        )
+
+    def get_diarizer(self, model_name: str = DIARIZATION_MODEL):
+        """
+        Obtém o pipeline de diarização, carregando-o se necessário.
+        """
+        from app.core.diarization import SpeakerDiarizer
+        return self._get(
+            ("diarization", model_name),
+            lambda: SpeakerDiarizer(model_name=model_name)
+        )
+
+    def warm(self, names: Iterable[str]) -> None:
+        """
+        Pré-carrega modelos, ex.: ["whisper:base", "whisper:small@int8", "diarization"].
+        """
+        for name in names:
+            kind, _, variant = name.partition(":")
+            if kind == "whisper":
+                model_size, _, backend = variant.partition("@")
+                self.get_transcriber(model_size or WHISPER_MODEL_SIZE, backend or WHISPER_BACKEND)
+            elif kind == "diarization":
+                self.get_diarizer(variant or DIARIZATION_MODEL)
+            else:
+                raise ValueError(f"Modelo desconhecido para pré-carregamento: {name}")
+
+    def loaded(self) -> dict:
+        """
+        Retorna os modelos em memória e o tamanho estimado de cada um.
+        """
+        with self._lock:
+            return {f"{kind}:{variant}": size for (kind, variant), (_, size) in self._entries.items()}
+
+    def _get(self, key: Tuple[str, str], loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        # Carrega fora do lock global para não bloquear quem usa outros modelos,
+        # mas garante uma única carga por chave
+        with loading_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+
+            logger.info("Carregando modelo %s:%s", *key)
+            model = loader()
+            size = estimate_model_bytes(model)
+
+            with self._lock:
+                self._entries[key] = (model, size)
+                self._evict(keep=key)
+            return model
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        # Chamado com self._lock adquirido
+        def over_budget() -> bool:
+            total = sum(size for _, size in self._entries.values())
+            return len(self._entries) > self.max_entries or total > self.max_bytes
+
+        for key in list(self._entries):
+            if not over_budget():
+                break
+            if key == keep:
+                continue
+            logger.info("Descartando modelo %s:%s do cache", *key)
+            del self._entries[key]
+
+# Registro compartilhado pelo processo
+registry = ModelRegistry()
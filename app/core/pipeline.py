@@ -0,0 +1,255 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.artifacts import JSON_SUFFIX, read_json, restore_audio, write_json
+from app.core.audio_utils import prepare_audio, load_audio
+from app.core.checkpoints import StageCheckpoints
+from app.core.config import (
+    VIDEOS_DIR, TRANSCRIPTS_DIR, AUDIO_SAMPLE_RATE, AUDIO_LOUDNESS_TARGET,
+    WHISPER_WORD_TIMESTAMPS
+)
+from app.core.events import publish_event, progress_reporter
+from app.core.metrics import in_current_context, observe_stage, peak_rss_bytes, record_job, span
+from app.core.segment_store import save_segments
+from app.core.speaker_index import identify_speakers, speech_seconds_by_label
+from app.core.storage import store, artifact_digest
+from app.core.diarization import SpeakerDiarizer
+from app.core.transcription import WhisperTranscriber
+from app.models.schema import Transcription, TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+def _run_stage(transcription_id: int, timings: dict, stage: str, func, *args, **kwargs):
+    """
+    Executa func(*args, **kwargs) registrando a duração em segundos em
+    timings[stage] e no histograma da etapa, e publicando os eventos de início
+    e fim da etapa.
+    """
+    publish_event(transcription_id, stage, "started")
+    start = time.perf_counter()
+    try:
+        with span(stage, transcription_id=transcription_id):
+            result = func(*args, **kwargs)
+    except Exception as e:
+        publish_event(transcription_id, stage, "failed", error=str(e))
+        raise
+    finally:
+        timings[stage] = time.perf_counter() - start
+        observe_stage(stage, timings[stage])
+    publish_event(transcription_id, stage, "completed", seconds=round(timings[stage], 3))
+    return result
+
+def _resume(checkpoints: StageCheckpoints, transcription_id: int, resumed: list, stage: str, key: str) -> Optional[str]:
+    """
+    Artefato do checkpoint válido de uma etapa, registrando-a como retomada.
+    """
+    path = checkpoints.load(stage, key)
+    if path is not None:
+        resumed.append(stage)
+        publish_event(transcription_id, stage, "completed", resumed=True)
+        logger.info("Transcrição %s: etapa %s retomada do checkpoint", transcription_id, stage)
+    return path
+
+def _model_key(transcriber: WhisperTranscriber) -> tuple:
+    # Mantém o digest das transcrições feitas antes dos backends alternativos
+    if transcriber.backend_name == "reference":
+        return (transcriber.model_size,)
+    return (transcriber.model_size, transcriber.backend_name)
+
+def process_transcription(
+    db: Session,
+    transcription_id: int,
+    video_path: str,
+    transcriber: WhisperTranscriber,
+    diarizer: SpeakerDiarizer,
+    job: Optional[TranscriptionJob] = None
+) -> Optional[dict]:
+    """
+    Processa a transcrição de um vídeo: prepara o áudio, transcreve, faz a
+    diarização e grava os segmentos. Executado pelos workers da fila de jobs.
+
+    Args:
+        db: Sessão do banco de dados do worker
+        transcription_id: ID da transcrição a processar
+        video_path: Caminho para o vídeo enviado
+        transcriber: Transcritor carregado no processo do worker
+        diarizer: Diarizador carregado no processo do worker
+        job: Job em execução, onde ficam os checkpoints das etapas; com eles,
+            uma nova tentativa retoma das etapas já concluídas
+
+    Returns:
+        Métricas do processamento (duração de cada etapa, duração do áudio,
+        fator de tempo real e pico de RSS), ou None se a transcrição não existe
+    """
+    timings = {}
+    resumed = []
+    started = time.perf_counter()
+
+    transcription = db.query(Transcription).filter(Transcription.id == transcription_id).first()
+    if not transcription:
+        return None
+
+    os.makedirs(VIDEOS_DIR, exist_ok=True)
+    os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+
+    transcription.status = "processing"
+    db.commit()
+    publish_event(transcription_id, "job", "processing")
+
+    checkpoints = StageCheckpoints(db, job)
+    content_hash = transcription.content_hash
+
+    # Extrai o áudio já em mono, 16 kHz e normalizado (passagem única). Com o
+    # hash do conteúdo o áudio fica no armazenamento e é reaproveitado.
+    audio_key = artifact_digest("audio", str(AUDIO_SAMPLE_RATE), str(AUDIO_LOUDNESS_TARGET))
+    audio_path = _resume(checkpoints, transcription_id, resumed, "audio_prep", audio_key)
+    if audio_path is None:
+        audio_path = restore_audio(content_hash) if content_hash else None
+        if audio_path is None:
+            output_dir = store.temp_dir() if content_hash else VIDEOS_DIR
+            audio_filename = _run_stage(transcription_id, timings, "audio_prep", prepare_audio, video_path, output_dir)
+            audio_path = os.path.join(output_dir, audio_filename)
+            if content_hash:
+                audio_path = store.put(audio_path, content_hash, ".wav")
+        checkpoints.record("audio_prep", audio_path, audio_key)
+    transcription.audio_filename = store.relative_path(audio_path) if content_hash else os.path.basename(audio_path)
+    db.commit()
+
+    # Decodifica uma única vez; Whisper e pyannote recebem o mesmo vetor
+    waveform = _run_stage(transcription_id, timings, "audio_load", load_audio, audio_path)
+    audio_seconds = len(waveform) / AUDIO_SAMPLE_RATE
+
+    # Os tempos por palavra mudam o artefato: entram no caminho e na chave do checkpoint
+    transcript_parts = (
+        *_model_key(transcriber), transcription.language or "", *(("words",) if WHISPER_WORD_TIMESTAMPS else ())
+    )
+    transcript_key = artifact_digest(*transcript_parts)
+    transcript_path = _resume(checkpoints, transcription_id, resumed, "transcription", transcript_key)
+    diarization_key = artifact_digest(diarizer.model_name, diarizer.embedding_model)
+    diarization_path = _resume(checkpoints, transcription_id, resumed, "diarization", diarization_key)
+
+    # Transcrição e diarização compartilham apenas o áudio, então rodam em paralelo
+    # (os spans das threads ficam sob o span do job). As etapas com checkpoint
+    # válido são lidas do artefato em vez de executadas.
+    errors = []
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline") as executor:
+        transcription_future = diarization_future = None
+        if transcript_path is None:
+            transcription_future = executor.submit(
+                in_current_context(_run_stage), transcription_id, timings, "transcription",
+                transcriber.transcribe_audio, waveform, progress=progress_reporter(transcription_id, "transcription")
+            )
+        if diarization_path is None:
+            diarization_future = executor.submit(
+                in_current_context(_run_stage), transcription_id, timings, "diarization", diarizer.diarize_audio,
+                waveform, progress=progress_reporter(transcription_id, "diarization"), return_embeddings=True
+            )
+
+        # Cada etapa concluída ganha o seu checkpoint mesmo que a outra falhe
+        if transcription_future is not None:
+            try:
+                transcription_result = transcription_future.result()
+            except Exception as e:
+                errors.append(e)
+            else:
+                if content_hash:
+                    transcript_path = store.path_for(artifact_digest(content_hash, *transcript_parts), JSON_SUFFIX)
+                    _run_stage(
+                        transcription_id, timings, "save_transcript", transcriber.save_transcription,
+                        transcription_result, os.path.dirname(transcript_path), os.path.basename(transcript_path)
+                    )
+                else:
+                    transcript_path = os.path.join(TRANSCRIPTS_DIR, _run_stage(
+                        transcription_id, timings, "save_transcript",
+                        transcriber.save_transcription, transcription_result, TRANSCRIPTS_DIR
+                    ))
+                checkpoints.record("transcription", transcript_path, transcript_key)
+        else:
+            transcription_result = read_json(transcript_path)
+        if transcript_path is not None:
+            transcription.transcript_filename = (
+                store.relative_path(transcript_path) if content_hash else os.path.basename(transcript_path)
+            )
+            transcription.word_timestamps = WHISPER_WORD_TIMESTAMPS
+            db.commit()
+
+        if diarization_future is not None:
+            try:
+                diarization_segments, speaker_embeddings = diarization_future.result()
+            except Exception as e:
+                errors.append(e)
+            else:
+                diarization_path = (
+                    store.path_for(artifact_digest(content_hash, diarization_key), f".diarization{JSON_SUFFIX}")
+                    if content_hash else os.path.join(TRANSCRIPTS_DIR, f"diarization_{transcription_id}{JSON_SUFFIX}")
+                )
+                write_json(diarization_path, {
+                    "segments": diarization_segments,
+                    "embeddings": {label: vector.tolist() for label, vector in speaker_embeddings.items()}
+                })
+                checkpoints.record("diarization", diarization_path, diarization_key)
+        else:
+            diarization = read_json(diarization_path)
+            diarization_segments = diarization["segments"]
+            speaker_embeddings = {
+                label: np.asarray(vector, dtype=np.float32) for label, vector in diarization["embeddings"].items()
+            }
+
+    if errors:
+        raise errors[0]
+
+    # Junta os resultados atribuindo interlocutores aos segmentos
+    transcription_segments = transcriber.process_segments(transcription_result)
+    final_segments = _run_stage(
+        transcription_id, timings, "speaker_assignment",
+        diarizer.assign_speakers_to_segments, transcription_segments, diarization_segments
+    )
+
+    # Troca os rótulos da diarização pelos nomes das identidades cadastradas reconhecidas
+    speaker_names = _run_stage(
+        transcription_id, timings, "speaker_identification", identify_speakers, db, transcription_id,
+        speaker_embeddings, diarizer.embedding_model, speech_seconds_by_label(diarization_segments)
+    )
+    for segment in final_segments:
+        segment['speaker'] = speaker_names.get(segment['speaker'], segment['speaker'])
+
+    # Salva os segmentos no banco de dados em lote, na mesma transação do status
+    publish_event(transcription_id, "persistence", "started", segments=len(final_segments))
+    persist_start = time.perf_counter()
+    save_segments(db, transcription_id, final_segments)
+
+    # Atualiza o status da transcrição
+    transcription.status = "completed"
+    db.commit()
+    timings["persistence"] = time.perf_counter() - persist_start
+    observe_stage("persistence", timings["persistence"])
+    total = time.perf_counter() - started
+    publish_event(transcription_id, "persistence", "completed", seconds=round(timings["persistence"], 3))
+    publish_event(transcription_id, "job", "completed", seconds=round(total, 3))
+
+    # O pico de RSS cobre o processo todo: com WORKER_JOB_CONCURRENCY > 1 inclui os jobs simultâneos
+    metrics = {
+        "stages": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "total_seconds": round(total, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "real_time_factor": round(total / audio_seconds, 4) if audio_seconds else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "resumed_stages": resumed,
+        "model_size": transcriber.model_size,
+        "backend": transcriber.backend_name,
+    }
+    record_job(metrics, transcriber.model_size, transcriber.backend_name)
+
+    logger.info(
+        "Transcrição %s concluída: %s, total=%.2fs, áudio=%.1fs, rtf=%s, pico_rss=%.0fMiB",
+        transcription_id,
+        ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()),
+        total, audio_seconds, metrics["real_time_factor"], metrics["peak_rss_bytes"] / 1024 ** 2
+    )
+    return metrics
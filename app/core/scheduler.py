@@ -0,0 +1,214 @@
+"""
+Escalonamento e controle de admissão dos jobs de transcrição.
+
+Cada job recebe no upload uma estimativa de custo a partir da duração da
+mídia, medida na ingestão: segundos de processamento (duração × fator de
+tempo real do modelo e do backend) e memória de pico (o áudio em float32 e as
+cópias feitas pelo Whisper e pelo pyannote).
+
+- Classes de prioridade: interactive (padrão para mídias de até
+  SCHEDULER_INTERACTIVE_MAX_SECONDS), standard e batch. Um job na fila sobe
+  uma classe a cada SCHEDULER_AGING_SECONDS de espera, então nenhuma classe
+  fica sem atendimento.
+- Dentro da mesma classe, vence o inquilino (X-Tenant-Id) com menos trabalho
+  em execução (fair share) e, entre os jobs dele, o mais antigo.
+- Um worker só reserva um job que caiba no orçamento de memória do seu host,
+  somado aos jobs já em execução nele, e deixa SCHEDULER_INTERACTIVE_SLOTS
+  slots do host livres para a classe interactive. Assim uma leva de vídeos
+  longos não ocupa todos os workers e a espera dos clipes curtos fica limitada.
+  Como vários processos do host reservam ao mesmo tempo, o orçamento é
+  conferido de novo depois da reserva (host_overcommitted) e a reserva que o
+  estoura é devolvida à fila.
+- Na API, um upload é recusado com Retry-After quando o inquilino passa de
+  SCHEDULER_TENANT_MAX_SECONDS de trabalho pendente (429) ou quando a fila à
+  frente dele levaria mais de SCHEDULER_MAX_WAIT_SECONDS para escoar (503).
+"""
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    AUDIO_SAMPLE_RATE, WORKER_PROCESSES, WORKER_JOB_CONCURRENCY,
+    SCHEDULER_INTERACTIVE_MAX_SECONDS, SCHEDULER_AGING_SECONDS, SCHEDULER_SLOTS, SCHEDULER_INTERACTIVE_SLOTS,
+    SCHEDULER_MEMORY_BUDGET_BYTES, SCHEDULER_AUDIO_MEMORY_FACTOR, SCHEDULER_REAL_TIME_FACTORS,
+    SCHEDULER_MAX_WAIT_SECONDS, SCHEDULER_TENANT_MAX_SECONDS
+)
+from app.models.schema import TranscriptionJob
+
+# Da mais para a menos urgente
+PRIORITY_CLASSES = ("interactive", "standard", "batch")
+DEFAULT_TENANT = "default"
+
+# Fator de tempo real em CPU por modelo e multiplicador por backend; ajustável
+# com SCHEDULER_REAL_TIME_FACTORS a partir das métricas dos jobs
+# (transcriber_real_time_factor)
+REAL_TIME_FACTORS = {"tiny": 0.08, "base": 0.15, "small": 0.4, "medium": 1.0, "large": 2.0}
+BACKEND_FACTORS = {"reference": 1.0, "int8": 0.6, "ctranslate2": 0.35}
+
+def _parse_overrides(value: str) -> Dict[str, float]:
+    overrides = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, factor = item.split("=", 1)
+            overrides[key.strip()] = float(factor)
+    return overrides
+
+_OVERRIDES = _parse_overrides(SCHEDULER_REAL_TIME_FACTORS)
+
+class AdmissionRejected(Exception):
+    """
+    Upload recusado pela admissão, com o tempo sugerido para tentar de novo.
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+def default_priority(media_seconds: Optional[float]) -> str:
+    if media_seconds is not None and media_seconds <= SCHEDULER_INTERACTIVE_MAX_SECONDS:
+        return "interactive"
+    return "standard"
+
+def priority_rank(priority: Optional[str]) -> int:
+    # Jobs anteriores ao escalonador contam como standard
+    return PRIORITY_CLASSES.index(priority) if priority in PRIORITY_CLASSES else 1
+
+def estimate_cost(media_seconds: float, model_size: str, backend: str) -> float:
+    """
+    Tempo de processamento estimado, em segundos.
+    """
+    factor = _OVERRIDES.get(f"{model_size}@{backend}")
+    if factor is None:
+        family = model_size.split(".")[0].split("-")[0]  # base.en, large-v3...
+        factor = _OVERRIDES.get(model_size, REAL_TIME_FACTORS.get(family, REAL_TIME_FACTORS["large"]))
+        factor *= BACKEND_FACTORS.get(backend, 1.0)
+    return media_seconds * factor
+
+def estimate_memory(media_seconds: float) -> int:
+    """
+    Memória de pico estimada de um job, além dos modelos já carregados no worker.
+    """
+    return int(media_seconds * AUDIO_SAMPLE_RATE * 4 * SCHEDULER_AUDIO_MEMORY_FACTOR)
+
+def worker_host(worker_id: str) -> str:
+    # worker_id = "<host>:<pid>:<processo>:<slot>" (app.worker)
+    return worker_id.split(":", 1)[0]
+
+def _host_usage(running: Iterable[TranscriptionJob], host: str):
+    memory = jobs = bulk_jobs = 0
+    for job in running:
+        if job.locked_by and worker_host(job.locked_by) == host:
+            memory += job.memory_bytes or 0
+            jobs += 1
+            bulk_jobs += job.priority != "interactive"
+    return memory, jobs, bulk_jobs
+
+def _reserved_slots() -> Tuple[int, int]:
+    host_slots = WORKER_PROCESSES * WORKER_JOB_CONCURRENCY
+    return host_slots, min(SCHEDULER_INTERACTIVE_SLOTS, host_slots - 1)
+
+def order_candidates(candidates: Iterable[TranscriptionJob], running: List[TranscriptionJob],
+                     worker_id: str, now: Optional[datetime] = None) -> List[TranscriptionJob]:
+    """
+    Ordena os jobs da fila que o worker pode reservar agora, do primeiro ao último.
+
+    Args:
+        candidates: Jobs na fila e disponíveis
+        running: Jobs em execução em todos os workers
+        worker_id: Worker que vai reservar
+        now: Horário de referência para o envelhecimento
+
+    Returns:
+        Candidatos admitidos pelo orçamento do host, em ordem de reserva
+    """
+    now = now or datetime.utcnow()
+    host = worker_host(worker_id)
+    tenant_load: Dict[str, float] = {}
+    for job in running:
+        tenant = job.tenant_id or DEFAULT_TENANT
+        tenant_load[tenant] = tenant_load.get(tenant, 0.0) + (job.cost_seconds or 0.0)
+    host_memory, host_jobs, host_bulk_jobs = _host_usage(running, host)
+
+    host_slots, reserved = _reserved_slots()
+    admitted = []
+    for job in candidates:
+        # Um job maior que o orçamento inteiro ainda roda, mas sozinho no host
+        if (SCHEDULER_MEMORY_BUDGET_BYTES > 0 and host_jobs > 0
+                and host_memory + (job.memory_bytes or 0) > SCHEDULER_MEMORY_BUDGET_BYTES):
+            continue
+        if job.priority != "interactive" and reserved > 0 and host_bulk_jobs >= host_slots - reserved:
+            continue
+        admitted.append(job)
+
+    def key(job: TranscriptionJob):
+        waited = (now - job.available_at).total_seconds()
+        aging = int(waited // SCHEDULER_AGING_SECONDS) if SCHEDULER_AGING_SECONDS > 0 else 0
+        return (
+            max(priority_rank(job.priority) - aging, 0),
+            tenant_load.get(job.tenant_id or DEFAULT_TENANT, 0.0),
+            job.available_at,
+            job.id
+        )
+
+    return sorted(admitted, key=key)
+
+def host_overcommitted(job: TranscriptionJob, running: List[TranscriptionJob], worker_id: str) -> bool:
+    """
+    Confere, depois da reserva, se o host passou do orçamento de memória ou
+    ocupou os slots reservados à classe interactive.
+
+    order_candidates decide com os jobs em execução lidos antes da reserva, e
+    outros processos do mesmo host podem reservar ao mesmo tempo. Aqui
+    `running` é lido depois da reserva e já inclui `job`; se o host estourou,
+    a reserva deve ser devolvida. Em uma disputa os dois lados podem devolver
+    e tentar de novo na próxima consulta à fila, mas nenhum estoura o orçamento.
+    """
+    memory, jobs, bulk_jobs = _host_usage(running, worker_host(worker_id))
+    if SCHEDULER_MEMORY_BUDGET_BYTES > 0 and jobs > 1 and memory > SCHEDULER_MEMORY_BUDGET_BYTES:
+        return True
+    host_slots, reserved = _reserved_slots()
+    return job.priority != "interactive" and reserved > 0 and bulk_jobs > host_slots - reserved
+
+def check_admission(db: Session, tenant_id: str, priority: str, cost_seconds: float = 0.0) -> None:
+    """
+    Verifica se um novo job pode entrar na fila.
+
+    Chamada antes de receber o upload (com custo zero, para recusar cedo
+    quando a fila já está saturada) e de novo com o custo estimado.
+
+    Raises:
+        AdmissionRejected: 429 se o inquilino passou do seu limite de trabalho
+            pendente; 503 se a espera estimada passou de SCHEDULER_MAX_WAIT_SECONDS
+    """
+    pending = ("queued", "running")
+    if SCHEDULER_TENANT_MAX_SECONDS > 0:
+        tenant_pending = db.query(func.coalesce(func.sum(TranscriptionJob.cost_seconds), 0.0)).filter(
+            TranscriptionJob.status.in_(pending),
+            func.coalesce(TranscriptionJob.tenant_id, DEFAULT_TENANT) == tenant_id
+        ).scalar()
+        excess = tenant_pending + cost_seconds - SCHEDULER_TENANT_MAX_SECONDS
+        if excess > 0:
+            raise AdmissionRejected(
+                429, "Limite de processamento pendente do inquilino atingido", excess / max(SCHEDULER_SLOTS, 1)
+            )
+
+    if SCHEDULER_MAX_WAIT_SECONDS > 0:
+        # Trabalho que roda antes deste job: o em execução e o da fila nas classes iguais ou mais urgentes
+        ahead_classes = [name for name in PRIORITY_CLASSES if priority_rank(name) <= priority_rank(priority)]
+        running = db.query(func.coalesce(func.sum(TranscriptionJob.cost_seconds), 0.0)).filter(
+            TranscriptionJob.status == "running"
+        ).scalar()
+        queued = db.query(func.coalesce(func.sum(TranscriptionJob.cost_seconds), 0.0)).filter(
+            TranscriptionJob.status == "queued",
+            func.coalesce(TranscriptionJob.priority, "standard").in_(ahead_classes)
+        ).scalar()
+        wait = (running + queued) / max(SCHEDULER_SLOTS, 1)
+        if wait > SCHEDULER_MAX_WAIT_SECONDS:
+            raise AdmissionRejected(
+                503, "Fila de processamento saturada", wait - SCHEDULER_MAX_WAIT_SECONDS
+            )
@@ -0,0 +1,175 @@
+"""
+Busca textual nos segmentos das transcrições.
+
+- PostgreSQL: coluna tsvector gerada a partir do texto (configuração
+  SEARCH_LANGUAGE, com radicalização em português por padrão) e índice GIN.
+  A coluna é calculada pelo banco em cada INSERT ou COPY.
+- SQLite: tabela virtual FTS5 de conteúdo externo, mantida por triggers. O
+  FTS5 não tem radicalizador de português; acentos e maiúsculas são ignorados.
+
+Nos dois casos o índice acompanha as gravações e remoções de segmentos feitas
+por save_segments/append_segments, sem etapa de reindexação.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import SEARCH_LANGUAGE, SEARCH_RANK_CANDIDATES
+from app.models.schema import TranscriptionSegment
+
+SEGMENTS_TABLE = TranscriptionSegment.__tablename__
+FTS_TABLE = f"{SEGMENTS_TABLE}_fts"
+
+# Interpolada nas consultas, então só aceita nomes de configuração simples
+if not re.fullmatch(r"[a-z_]+", SEARCH_LANGUAGE):
+    raise ValueError(f"SEARCH_LANGUAGE inválido: {SEARCH_LANGUAGE}")
+
+# Marcadores do trecho destacado
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+def ensure_search_index(engine: Engine) -> None:
+    """
+    Cria a estrutura de busca do banco, se ainda não existir.
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(
+                f"ALTER TABLE {SEGMENTS_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_LANGUAGE}', coalesce(text, ''))) STORED"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{SEGMENTS_TABLE}_search ON {SEGMENTS_TABLE} USING GIN (search_vector)"
+            ))
+        elif engine.dialect.name == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            ).first()
+            if exists:
+                return
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"text, content='{SEGMENTS_TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {SEGMENTS_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {SEGMENTS_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF text ON {SEGMENTS_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); "
+                f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END"
+            ))
+            # Indexa os segmentos gravados antes da criação da tabela
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def _fts5_query(query: str) -> str:
+    # Cada termo (ou "frase entre aspas") vira uma frase literal do FTS5, em AND;
+    # assim a pontuação do usuário nunca é lida como operador
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', query):
+        term = (phrase or word).replace('"', '""')
+        terms.append(f'"{term}"')
+    return " ".join(terms)
+
+def search_segments(db: Session, query: str, limit: int, offset: int = 0,
+                    transcription_id: Optional[int] = None, speaker: Optional[str] = None,
+                    candidates: int = SEARCH_RANK_CANDIDATES) -> List[Dict[str, Any]]:
+    """
+    Procura segmentos pelo texto, do mais relevante para o menos relevante.
+
+    Calcular a relevância exige ler cada segmento encontrado, o que fica caro
+    para termos presentes em boa parte da base. Por isso ela é calculada só
+    entre os `candidates` segmentos mais recentes que contêm os termos
+    (localizá-los usa apenas o índice).
+
+    Args:
+        db: Sessão do banco de dados
+        query: Termos da busca; "frases entre aspas" são buscadas literalmente
+        limit: Quantidade máxima de resultados
+        offset: Resultados a pular (paginação)
+        transcription_id: Restringe a uma transcrição
+        speaker: Restringe a um interlocutor
+        candidates: Segmentos considerados no ranking (0 = todos)
+
+    Returns:
+        Resultados com transcription_id, segment_id, start_time, end_time,
+        speaker, snippet (termos destacados com <mark>) e rank (maior é melhor)
+    """
+    params: Dict[str, Any] = {"query": query, "limit": limit, "offset": offset, "candidates": candidates}
+    filters = ""
+    if transcription_id is not None:
+        filters += " AND s.transcription_id = :transcription_id"
+        params["transcription_id"] = transcription_id
+    if speaker is not None:
+        filters += " AND s.speaker = :speaker"
+        params["speaker"] = speaker
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        if candidates > 0:
+            scope = f"""candidates AS (
+                SELECT s.id FROM {SEGMENTS_TABLE} s, q
+                WHERE s.search_vector @@ q.query{filters}
+                ORDER BY s.id DESC
+                LIMIT :candidates
+            ),"""
+            source = f"{SEGMENTS_TABLE} s JOIN candidates c ON c.id = s.id"
+        else:
+            scope = ""
+            source = f"{SEGMENTS_TABLE} s"
+        # O destaque (ts_headline relê o texto) é gerado apenas para a página retornada
+        statement = text(f"""
+            WITH q AS (SELECT websearch_to_tsquery('{SEARCH_LANGUAGE}', :query) AS query),
+            {scope}
+            hits AS (
+                SELECT s.id, ts_rank_cd(s.search_vector, q.query) AS rank
+                FROM {source}, q
+                WHERE s.search_vector @@ q.query{filters}
+                ORDER BY rank DESC, s.id
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT s.id AS segment_id, s.transcription_id, s.start_time, s.end_time, s.speaker, hits.rank,
+                   ts_headline('{SEARCH_LANGUAGE}', s.text, q.query,
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=30, MinWords=10') AS snippet
+            FROM hits JOIN {SEGMENTS_TABLE} s ON s.id = hits.id, q
+            ORDER BY hits.rank DESC, s.id
+        """)
+    elif dialect == "sqlite":
+        params["query"] = _fts5_query(query)
+        if not params["query"]:
+            return []
+        scope, bound = "", ""
+        if candidates > 0:
+            # O FTS5 percorre os resultados em ordem de rowid sem calcular o bm25;
+            # a busca ranqueada fica restrita a partir do menor rowid candidato
+            scope = f"""WITH candidates AS (
+                SELECT {FTS_TABLE}.rowid AS id
+                FROM {FTS_TABLE} JOIN {SEGMENTS_TABLE} s ON s.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH :query{filters}
+                ORDER BY {FTS_TABLE}.rowid DESC
+                LIMIT :candidates
+            )"""
+            bound = f" AND {FTS_TABLE}.rowid >= (SELECT min(id) FROM candidates)"
+        # bm25() é menor para os melhores resultados; o sinal é invertido no retorno
+        statement = text(f"""
+            {scope}
+            SELECT s.id AS segment_id, s.transcription_id, s.start_time, s.end_time, s.speaker,
+                   -bm25({FTS_TABLE}) AS rank,
+                   snippet({FTS_TABLE}, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet
+            FROM {FTS_TABLE} JOIN {SEGMENTS_TABLE} s ON s.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :query{filters}{bound}
+            ORDER BY bm25({FTS_TABLE}), s.id
+            LIMIT :limit OFFSET :offset
+        """)
+    else:
+        raise ValueError(f"Busca textual não suportada no banco {dialect}")
+
+    return [dict(row) for row in db.execute(statement, params).mappings()]
@@ -0,0 +1,284 @@
+import io
+import json
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import SEGMENT_BLOB_ENABLED
+from app.models.schema import TranscriptionSegment, TranscriptionSegmentBlob
+
+SEGMENT_COLUMNS = ("transcription_id", "start_time", "end_time", "speaker", "text", "words")
+
+def encode_words(words: Optional[List[Dict[str, Any]]], segment_start: float) -> Optional[str]:
+    """
+    Serializa as palavras de um segmento de forma compacta: JSON
+    [[início, fim, palavra], ...] com os tempos em milissegundos inteiros,
+    relativos ao início do segmento.
+
+    Returns:
+        Texto para a coluna TranscriptionSegment.words, ou None sem palavras
+    """
+    if not words:
+        return None
+    return json.dumps(
+        [
+            [round((word['start'] - segment_start) * 1000), round((word['end'] - segment_start) * 1000), word['word']]
+            for word in words
+        ],
+        ensure_ascii=False, separators=(",", ":")
+    )
+
+def decode_words(data: Optional[str], segment_start: float) -> Optional[List[Dict[str, Any]]]:
+    """
+    Reconstrói as palavras gravadas por encode_words, com tempos absolutos em segundos.
+    """
+    if not data:
+        return None
+    return [
+        {'word': word, 'start': round(segment_start + start / 1000, 3), 'end': round(segment_start + end / 1000, 3)}
+        for start, end, word in json.loads(data)
+    ]
+
+def encode_segments(segments: List[Dict[str, Any]]) -> bytes:
+    """
+    Serializa segmentos em formato colunar: vetores de início e fim, índices de
+    interlocutor, offsets do texto e o texto UTF-8 concatenado. As palavras,
+    quando houver, ficam em vetores próprios: quantidade por segmento, início
+    e fim em milissegundos relativos ao segmento e o texto concatenado.
+
+    Args:
+        segments: Segmentos com 'start_time', 'end_time', 'speaker', 'text' e,
+            opcionalmente, 'words'
+
+    Returns:
+        Conteúdo em bytes (arquivo .npz sem pickle)
+    """
+    speakers: Dict[str, int] = {}
+    speaker_ids = np.fromiter(
+        (speakers.setdefault(segment['speaker'] or "", len(speakers)) for segment in segments),
+        dtype=np.uint16, count=len(segments)
+    )
+    texts = [(segment['text'] or "").encode("utf-8") for segment in segments]
+    offsets = np.zeros(len(texts) + 1, dtype=np.uint64)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+    starts = np.fromiter((segment['start_time'] for segment in segments), dtype=np.float64, count=len(segments))
+
+    words = [segment.get('words') or [] for segment in segments]
+    word_counts = np.fromiter((len(segment_words) for segment_words in words), dtype=np.uint32, count=len(words))
+    flat_words = [word for segment_words in words for word in segment_words]
+    word_base = np.repeat(starts, word_counts)
+    word_texts = [word['word'].encode("utf-8") for word in flat_words]
+    word_offsets = np.zeros(len(word_texts) + 1, dtype=np.uint64)
+    np.cumsum([len(text) for text in word_texts], out=word_offsets[1:])
+
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        start=starts,
+        end=np.fromiter((segment['end_time'] for segment in segments), dtype=np.float64, count=len(segments)),
+        speaker=speaker_ids,
+        speakers=np.frombuffer("\n".join(speakers).encode("utf-8"), dtype=np.uint8),
+        offsets=offsets,
+        text=np.frombuffer(b"".join(texts), dtype=np.uint8),
+        word_count=word_counts,
+        word_start=np.round((np.fromiter((word['start'] for word in flat_words), dtype=np.float64,
+                                         count=len(flat_words)) - word_base) * 1000).astype(np.int32),
+        word_end=np.round((np.fromiter((word['end'] for word in flat_words), dtype=np.float64,
+                                       count=len(flat_words)) - word_base) * 1000).astype(np.int32),
+        word_offsets=word_offsets,
+        word_text=np.frombuffer(b"".join(word_texts), dtype=np.uint8),
+    )
+    return buffer.getvalue()
+
+def decode_segments(data: bytes) -> List[Dict[str, Any]]:
+    """
+    Reconstrói os segmentos gravados por encode_segments.
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        starts = arrays["start"].tolist()
+        ends = arrays["end"].tolist()
+        speaker_ids = arrays["speaker"].tolist()
+        speakers = arrays["speakers"].tobytes().decode("utf-8").split("\n")
+        offsets = arrays["offsets"].tolist()
+        text = arrays["text"].tobytes()
+        # Blobs gravados antes das palavras não têm os vetores word_*
+        has_words = "word_count" in arrays.files
+        if has_words:
+            word_bounds = np.concatenate(([0], np.cumsum(arrays["word_count"], dtype=np.int64))).tolist()
+            word_base = np.repeat(arrays["start"], arrays["word_count"])
+            word_starts = np.round(word_base + arrays["word_start"] / 1000, 3).tolist()
+            word_ends = np.round(word_base + arrays["word_end"] / 1000, 3).tolist()
+            word_offsets = arrays["word_offsets"].tolist()
+            word_text = arrays["word_text"].tobytes()
+
+    segments = []
+    for i in range(len(starts)):
+        segment = {
+            'start_time': starts[i],
+            'end_time': ends[i],
+            'speaker': speakers[speaker_ids[i]],
+            'text': text[offsets[i]:offsets[i + 1]].decode("utf-8")
+        }
+        if has_words and word_bounds[i + 1] > word_bounds[i]:
+            segment['words'] = [
+                {
+                    'word': word_text[word_offsets[j]:word_offsets[j + 1]].decode("utf-8"),
+                    'start': word_starts[j],
+                    'end': word_ends[j]
+                }
+                for j in range(word_bounds[i], word_bounds[i + 1])
+            ]
+        segments.append(segment)
+    return segments
+
+def _csv_field(value: Any) -> str:
+    # No COPY em CSV só o campo vazio sem aspas é NULL; textos vão sempre
+    # entre aspas para que '' continue sendo uma string vazia
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+def _copy_buffer(rows: List[Dict[str, Any]]) -> io.StringIO:
+    """
+    Monta o conteúdo CSV do COPY dos segmentos, distinguindo NULL de texto vazio.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_csv_field(row[column]) for column in SEGMENT_COLUMNS))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+def _copy_rows(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # COPY ... FROM STDIN pelo psycopg2, na mesma transação da sessão
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {TranscriptionSegment.__tablename__} ({', '.join(SEGMENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            _copy_buffer(rows)
+        )
+    finally:
+        cursor.close()
+
+def append_segments(db: Session, transcription_id: int, segments: List[Dict[str, Any]]) -> None:
+    """
+    Acrescenta segmentos a uma transcrição em lote, sem apagar os existentes
+    (ex.: segmentos finalizados de uma sessão ao vivo). Não faz commit.
+    """
+    rows = [
+        {
+            'transcription_id': transcription_id,
+            'start_time': segment['start_time'],
+            'end_time': segment['end_time'],
+            'speaker': segment['speaker'],
+            'text': segment['text'],
+            'words': encode_words(segment.get('words'), segment['start_time'])
+        }
+        for segment in segments
+    ]
+    if not rows:
+        return
+
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(TranscriptionSegment), rows)
+
+def save_segments(db: Session, transcription_id: int, segments: List[Dict[str, Any]],
+                  store_blob: bool = SEGMENT_BLOB_ENABLED) -> None:
+    """
+    Grava os segmentos de uma transcrição em lote, substituindo os anteriores.
+
+    No PostgreSQL com psycopg2 usa COPY; nos demais bancos, um único INSERT
+    executemany. Não faz commit: o chamador confirma junto com o status.
+
+    Args:
+        db: Sessão do banco de dados
+        transcription_id: ID da transcrição
+        segments: Segmentos com 'start_time', 'end_time', 'speaker', 'text' e,
+            opcionalmente, 'words' (palavras com 'word', 'start' e 'end')
+        store_blob: Também grava o blob colunar da transcrição
+    """
+    # Uma nova tentativa do job não deve duplicar os segmentos
+    db.execute(delete(TranscriptionSegment).where(TranscriptionSegment.transcription_id == transcription_id))
+    db.execute(delete(TranscriptionSegmentBlob).where(TranscriptionSegmentBlob.transcription_id == transcription_id))
+
+    append_segments(db, transcription_id, segments)
+
+    if store_blob:
+        db.execute(insert(TranscriptionSegmentBlob).values(
+            transcription_id=transcription_id,
+            segment_count=len(segments),
+            data=encode_segments(segments)
+        ))
+
+def rename_speaker(db: Session, transcription_id: int, previous: str, name: str,
+                   store_blob: bool = SEGMENT_BLOB_ENABLED) -> None:
+    """
+    Troca o interlocutor dos segmentos de uma transcrição com um único UPDATE,
+    mantendo os ids (cursores e ETags da listagem) e o índice de busca. Não faz commit.
+
+    O blob colunar é atualizado só com store_blob; sem ele, um blob antigo é
+    removido para que a leitura use as linhas já renomeadas.
+    """
+    db.execute(
+        update(TranscriptionSegment)
+        .where(TranscriptionSegment.transcription_id == transcription_id, TranscriptionSegment.speaker == previous)
+        .values(speaker=name)
+    )
+
+    blob = TranscriptionSegmentBlob.transcription_id == transcription_id
+    if not store_blob:
+        db.execute(delete(TranscriptionSegmentBlob).where(blob))
+        return
+    data: Optional[bytes] = db.execute(select(TranscriptionSegmentBlob.data).where(blob)).scalar()
+    if data is None:
+        return
+    # Basta trocar o nome no dicionário de interlocutores do blob
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        fields = {field: arrays[field] for field in arrays.files}
+    speakers = fields["speakers"].tobytes().decode("utf-8").split("\n")
+    fields["speakers"] = np.frombuffer(
+        "\n".join(name if speaker == previous else speaker for speaker in speakers).encode("utf-8"), dtype=np.uint8
+    )
+    buffer = io.BytesIO()
+    np.savez(buffer, **fields)
+    db.execute(update(TranscriptionSegmentBlob).where(blob).values(data=buffer.getvalue()))
+
+def load_segments(db: Session, transcription_id: int) -> List[Dict[str, Any]]:
+    """
+    Lê os segmentos de uma transcrição em ordem de início, sem montar objetos ORM.
+
+    Usa o blob colunar quando existir; caso contrário, as linhas da tabela de
+    segmentos. Segmentos com palavras trazem também 'words'.
+    """
+    data: Optional[bytes] = db.execute(
+        select(TranscriptionSegmentBlob.data).where(TranscriptionSegmentBlob.transcription_id == transcription_id)
+    ).scalar()
+    if data is not None:
+        return decode_segments(data)
+
+    result = db.execute(
+        select(
+            TranscriptionSegment.start_time,
+            TranscriptionSegment.end_time,
+            TranscriptionSegment.speaker,
+            TranscriptionSegment.text,
+            TranscriptionSegment.words
+        )
+        .where(TranscriptionSegment.transcription_id == transcription_id)
+        .order_by(TranscriptionSegment.start_time, TranscriptionSegment.id)
+    )
+    segments = []
+    for row in result.mappings():
+        segment = dict(row)
+        words = decode_words(segment.pop('words'), segment['start_time'])
+        if words:
+            segment['words'] = words
+        segments.append(segment)
+    return segments
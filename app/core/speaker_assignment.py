@@ -0,0 +1,219 @@
+from typing import List, Dict, Any
+
+import numpy as np
+
+# Segmentos de transcrição processados por bloco, limitando a memória dos pares candidatos
+BLOCK_SIZE = 4096
+
+def _elementary_pieces(d_start: np.ndarray, d_end: np.ndarray):
+    """
+    Divide os intervalos nas fronteiras de todos os intervalos (intervalos
+    elementares, disjuntos entre si), devolvendo início, fim e intervalo de
+    origem de cada pedaço, ordenados pelo início.
+
+    Um intervalo de comprimento zero vira um único pedaço degenerado.
+    """
+    bounds = np.unique(np.concatenate((d_start, d_end)))
+    first_bound = np.searchsorted(bounds, d_start)
+    last_bound = np.searchsorted(bounds, d_end)
+    spans = np.maximum(last_bound - first_bound, 1)
+
+    piece_turn = np.repeat(np.arange(len(d_start)), spans)
+    piece_bound = first_bound[piece_turn] + np.arange(len(piece_turn)) - np.repeat(np.cumsum(spans) - spans, spans)
+    piece_start = bounds[piece_bound]
+    piece_end = np.where(
+        last_bound[piece_turn] > first_bound[piece_turn],
+        bounds[np.minimum(piece_bound + 1, len(bounds) - 1)],
+        piece_start
+    )
+    order = np.argsort(piece_start, kind="stable")
+    return piece_start[order], piece_end[order], piece_turn[order]
+
+def max_overlap_indices(starts: np.ndarray, ends: np.ndarray,
+                        diar_starts: np.ndarray, diar_ends: np.ndarray) -> np.ndarray:
+    """
+    Para cada intervalo [starts[i], ends[i]], encontra o intervalo de diarização
+    com maior sobreposição.
+
+    Os intervalos de diarização são divididos em intervalos elementares (entre
+    fronteiras consecutivas de todos eles), ordenados por início e indexados
+    pelo máximo acumulado dos fins. Como os pedaços são disjuntos, esse máximo
+    acompanha o início de cada um, então as duas buscas binárias de cada
+    consulta delimitam só os pedaços que a intersectam, mesmo com um turno
+    longo (ex.: um interlocutor cobrindo o arquivo inteiro). Os pedaços apenas
+    localizam os candidatos; a sobreposição é calculada com o intervalo
+    original. Custo O((P + N) log(P + N) + K), com P o número de pedaços
+    (M vezes a quantidade de turnos simultâneos) e K o de pares candidatos,
+    em vez de O(N·M).
+
+    Mantém a semântica da versão original: intervalos que apenas se tocam contam
+    (sobreposição zero) e, em empate, vence o intervalo de diarização que começa
+    primeiro.
+
+    Args:
+        starts, ends: Intervalos a rotular
+        diar_starts, diar_ends: Intervalos da diarização
+
+    Returns:
+        Índice (nas arrays de diarização originais) do intervalo escolhido, ou -1
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    result = np.full(len(starts), -1, dtype=np.int64)
+    if len(starts) == 0 or len(diar_starts) == 0:
+        return result
+
+    order = np.argsort(np.asarray(diar_starts, dtype=np.float64), kind="stable")
+    d_start = np.asarray(diar_starts, dtype=np.float64)[order]
+    d_end = np.asarray(diar_ends, dtype=np.float64)[order]
+    piece_start, piece_end, piece_turn = _elementary_pieces(d_start, d_end)
+    reach = np.maximum.accumulate(piece_end)
+
+    for first in range(0, len(starts), BLOCK_SIZE):
+        t_start = starts[first:first + BLOCK_SIZE]
+        t_end = ends[first:first + BLOCK_SIZE]
+
+        # Candidatos: pedaços que começam até o fim do segmento, a partir do
+        # primeiro ponto em que algum pedaço alcança o início do segmento
+        hi = np.searchsorted(piece_start, t_end, side="right")
+        lo = np.searchsorted(reach, t_start, side="left")
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+
+        segment = np.repeat(np.arange(len(t_start)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        piece = lo[segment] + offsets
+
+        valid = piece_end[piece] >= t_start[segment]
+        segment, candidate = segment[valid], piece_turn[piece[valid]]
+        if len(segment) == 0:
+            continue
+        # Um turno pode aparecer em vários pedaços; a sobreposição é a do turno inteiro
+        overlap = np.minimum(t_end[segment], d_end[candidate]) - np.maximum(t_start[segment], d_start[candidate])
+
+        # Maior sobreposição por segmento; em empate, o candidato de menor índice
+        ranking = np.lexsort((candidate, -overlap, segment))
+        segment, candidate = segment[ranking], candidate[ranking]
+        best = np.flatnonzero(np.concatenate(([True], segment[1:] != segment[:-1])))
+        result[first + segment[best]] = order[candidate[best]]
+
+    return result
+
+def assign_speakers(items: List[Dict[str, Any]], diarization_segments: List[Dict[str, Any]],
+                    start_key: str = "start_time", end_key: str = "end_time") -> List[Dict[str, Any]]:
+    """
+    Atribui a cada item (segmento ou palavra) o interlocutor de maior sobreposição.
+
+    Args:
+        items: Dicionários com início e fim; recebem a chave 'speaker'
+        diarization_segments: Segmentos de diarização com 'start_time', 'end_time' e 'speaker'
+        start_key, end_key: Chaves de início e fim nos itens
+
+    Returns:
+        A mesma lista de itens, rotulados ("unknown" quando não há sobreposição)
+    """
+    if not items:
+        return items
+
+    best = max_overlap_indices(
+        np.fromiter((item[start_key] for item in items), dtype=np.float64, count=len(items)),
+        np.fromiter((item[end_key] for item in items), dtype=np.float64, count=len(items)),
+        np.fromiter((segment['start_time'] for segment in diarization_segments), dtype=np.float64,
+                    count=len(diarization_segments)),
+        np.fromiter((segment['end_time'] for segment in diarization_segments), dtype=np.float64,
+                    count=len(diarization_segments))
+    )
+    speakers = [segment['speaker'] for segment in diarization_segments]
+    for item, index in zip(items, best.tolist()):
+        item['speaker'] = speakers[index] if index >= 0 else "unknown"
+    return items
+
+def split_by_speaker(segments: List[Dict[str, Any]],
+                     diarization_segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Atribui interlocutores palavra a palavra e divide cada segmento onde o
+    interlocutor muda.
+
+    As palavras de todos os segmentos passam de uma vez por
+    max_overlap_indices e as fronteiras dos trechos saem de comparações entre
+    vetores, então o custo cresce com o número de palavras como o da
+    atribuição por segmento. Palavras sem sobreposição (ex.: em pausas da
+    diarização) ficam com o interlocutor do segmento; segmentos sem palavras
+    (transcrições antigas ou em lote) são rotulados inteiros.
+
+    Args:
+        segments: Segmentos com 'start_time', 'end_time', 'text' e,
+            opcionalmente, 'words' (com 'word', 'start' e 'end')
+        diarization_segments: Segmentos de diarização com 'start_time', 'end_time' e 'speaker'
+
+    Returns:
+        Segmentos rotulados, com os divididos substituídos pelos seus trechos
+    """
+    if not segments:
+        return segments
+
+    diar_starts = np.fromiter((segment['start_time'] for segment in diarization_segments), dtype=np.float64,
+                              count=len(diarization_segments))
+    diar_ends = np.fromiter((segment['end_time'] for segment in diarization_segments), dtype=np.float64,
+                            count=len(diarization_segments))
+    labels: Dict[str, int] = {}
+    diar_speakers = np.fromiter(
+        (labels.setdefault(segment['speaker'], len(labels)) for segment in diarization_segments),
+        dtype=np.int64, count=len(diarization_segments)
+    )
+    names = list(labels) + ["unknown"]  # o índice -1 cai em "unknown"
+
+    def speaker_ids(best: np.ndarray) -> np.ndarray:
+        return np.where(best >= 0, diar_speakers[np.maximum(best, 0)] if len(diar_speakers) else -1, -1)
+
+    segment_speakers = speaker_ids(max_overlap_indices(
+        np.fromiter((segment['start_time'] for segment in segments), dtype=np.float64, count=len(segments)),
+        np.fromiter((segment['end_time'] for segment in segments), dtype=np.float64, count=len(segments)),
+        diar_starts, diar_ends
+    ))
+
+    words = [word for segment in segments for word in segment.get('words') or ()]
+    counts = np.fromiter((len(segment.get('words') or ()) for segment in segments), dtype=np.int64,
+                         count=len(segments))
+    owner = np.repeat(np.arange(len(segments)), counts)
+    word_speakers = speaker_ids(max_overlap_indices(
+        np.fromiter((word['start'] for word in words), dtype=np.float64, count=len(words)),
+        np.fromiter((word['end'] for word in words), dtype=np.float64, count=len(words)),
+        diar_starts, diar_ends
+    ))
+    word_speakers = np.where(word_speakers >= 0, word_speakers, segment_speakers[owner])
+
+    # Um trecho começa em cada palavra cujo segmento ou interlocutor difere da anterior
+    breaks = np.ones(len(words), dtype=bool)
+    breaks[1:] = (owner[1:] != owner[:-1]) | (word_speakers[1:] != word_speakers[:-1])
+    run_starts = np.flatnonzero(breaks)
+    run_ends = np.append(run_starts[1:], len(words)).tolist()
+    run_owners = owner[run_starts].tolist()
+    run_speakers = word_speakers[run_starts].tolist()
+    run_starts = run_starts.tolist()
+    segment_speakers = segment_speakers.tolist()
+
+    result = []
+    run = 0
+    for index, segment in enumerate(segments):
+        first_run = run
+        while run < len(run_starts) and run_owners[run] == index:
+            run += 1
+        if run - first_run <= 1:
+            speaker = run_speakers[first_run] if run > first_run else segment_speakers[index]
+            segment['speaker'] = names[speaker]
+            result.append(segment)
+            continue
+        for piece in range(first_run, run):
+            piece_words = words[run_starts[piece]:run_ends[piece]]
+            result.append({
+                # As bordas externas mantêm os tempos do segmento; as internas, os das palavras
+                'start_time': segment['start_time'] if piece == first_run else piece_words[0]['start'],
+                'end_time': segment['end_time'] if piece == run - 1 else piece_words[-1]['end'],
+                'text': "".join(word['word'] for word in piece_words).strip(),
+                'speaker': names[run_speakers[piece]],
+                'words': piece_words
+            })
+    return result
@@ -0,0 +1,229 @@
+"""
+Identificação de interlocutores entre gravações.
+
+Cada transcrição guarda o embedding de voz de cada interlocutor da diarização
+(SpeakerEmbedding). Os embeddings cadastrados (enrolled) formam um índice de
+vizinhos mais próximos por similaridade de cosseno; os interlocutores de uma
+nova gravação são procurados nele e recebem o nome da identidade quando a
+similaridade passa de SPEAKER_MATCH_THRESHOLD.
+
+O índice é escolhido por SPEAKER_INDEX_BACKEND:
+- "numpy": busca exata por força bruta (produto de matrizes), suficiente para
+  dezenas de milhares de embeddings
+- "faiss": grafo HNSW do faiss, para bases maiores (pacote opcional faiss-cpu)
+"""
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import SPEAKER_INDEX_BACKEND, SPEAKER_MATCH_THRESHOLD, SPEAKER_SEARCH_K
+from app.models.schema import Speaker, SpeakerEmbedding
+
+logger = logging.getLogger(__name__)
+
+def encode_vector(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def decode_vector(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float32)
+
+class NumpyIndex:
+    """
+    Índice exato de vetores normalizados; o produto interno é a similaridade de cosseno.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=np.int64)])
+        self._vectors = np.vstack([self._vectors, np.asarray(vectors, dtype=np.float32)])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna as similaridades e os IDs dos k vizinhos de cada consulta, em
+        ordem decrescente (posições sem vizinho têm ID -1).
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+
+        scores = queries @ self._vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), self._ids[np.take_along_axis(top, order, axis=1)]
+
+class FaissIndex:
+    """
+    Índice aproximado HNSW do faiss, com a mesma interface do NumpyIndex.
+    """
+
+    def __init__(self, dim: int):
+        try:
+            import faiss
+        except ImportError as e:
+            raise ImportError("SPEAKER_INDEX_BACKEND=faiss requer o pacote faiss-cpu") from e
+
+        self.dim = dim
+        self._index = faiss.IndexIDMap(faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT))
+
+    def __len__(self) -> int:
+        return self._index.ntotal
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self._index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self._index.search(np.ascontiguousarray(queries, dtype=np.float32), min(k, len(self)))
+
+INDEX_BACKENDS = {"numpy": NumpyIndex, "faiss": FaissIndex}
+
+class SpeakerDirectory:
+    """
+    Índice em memória dos embeddings cadastrados, por modelo de embeddings.
+
+    É reconstruído quando os embeddings cadastrados mudam no banco (contagem
+    ou maior ID), o que também capta cadastros feitos por outros processos.
+    """
+
+    def __init__(self, backend: str = SPEAKER_INDEX_BACKEND):
+        if backend not in INDEX_BACKENDS:
+            raise ValueError(f"SPEAKER_INDEX_BACKEND desconhecido: {backend}")
+        self.backend = backend
+        self._lock = threading.Lock()
+        # modelo -> (estado no banco, índice, ID do embedding -> ID da identidade)
+        self._indexes: Dict[str, Tuple[tuple, Optional[object], Dict[int, int]]] = {}
+
+    def _index_for(self, db: Session, model: str) -> Tuple[Optional[object], Dict[int, int]]:
+        enrolled = (SpeakerEmbedding.enrolled.is_(True), SpeakerEmbedding.model == model)
+        state = tuple(db.execute(
+            select(func.count(SpeakerEmbedding.id), func.max(SpeakerEmbedding.id)).where(*enrolled)
+        ).one())
+
+        with self._lock:
+            cached = self._indexes.get(model)
+            if cached is not None and cached[0] == state:
+                return cached[1], cached[2]
+
+            rows = db.execute(
+                select(SpeakerEmbedding.id, SpeakerEmbedding.speaker_id, SpeakerEmbedding.dim, SpeakerEmbedding.vector)
+                .where(*enrolled, SpeakerEmbedding.speaker_id.isnot(None))
+            ).all()
+            index, owners = None, {}
+            if rows:
+                index = INDEX_BACKENDS[self.backend](rows[0].dim)
+                index.add(
+                    np.array([row.id for row in rows], dtype=np.int64),
+                    np.vstack([decode_vector(row.vector) for row in rows])
+                )
+                owners = {row.id: row.speaker_id for row in rows}
+            logger.info("Índice de interlocutores (%s) reconstruído com %s embeddings", model, len(rows))
+            self._indexes[model] = (state, index, owners)
+            return index, owners
+
+    def identify(self, db: Session, embeddings: Dict[str, np.ndarray], model: str,
+                 threshold: float = SPEAKER_MATCH_THRESHOLD) -> Dict[str, Tuple[int, float]]:
+        """
+        Associa os interlocutores de uma gravação às identidades cadastradas.
+
+        Cada identidade é atribuída a no máximo um rótulo: os pares (rótulo,
+        identidade) são escolhidos em ordem decrescente de similaridade.
+
+        Args:
+            db: Sessão do banco de dados
+            embeddings: Rótulo da diarização -> embedding normalizado
+            model: Modelo que gerou os embeddings
+            threshold: Similaridade mínima de cosseno
+
+        Returns:
+            Rótulo -> (ID da identidade, similaridade), só para os reconhecidos
+        """
+        index, owners = self._index_for(db, model)
+        if index is None or not embeddings:
+            return {}
+
+        labels = list(embeddings)
+        scores, ids = index.search(np.vstack([embeddings[label] for label in labels]), SPEAKER_SEARCH_K)
+
+        # Melhor similaridade de cada rótulo com cada identidade
+        best: Dict[Tuple[str, int], float] = {}
+        for label, row_scores, row_ids in zip(labels, scores, ids):
+            for score, embedding_id in zip(row_scores.tolist(), row_ids.tolist()):
+                if embedding_id < 0 or score < threshold:
+                    continue
+                key = (label, owners[embedding_id])
+                best[key] = max(best.get(key, score), score)
+
+        matches: Dict[str, Tuple[int, float]] = {}
+        taken = set()
+        for (label, speaker_id), score in sorted(best.items(), key=lambda item: item[1], reverse=True):
+            if label in matches or speaker_id in taken:
+                continue
+            matches[label] = (speaker_id, score)
+            taken.add(speaker_id)
+        return matches
+
+directory = SpeakerDirectory()
+
+def identify_speakers(db: Session, transcription_id: int, embeddings: Dict[str, np.ndarray], model: str,
+                      speech_seconds: Optional[Dict[str, float]] = None) -> Dict[str, str]:
+    """
+    Grava os embeddings dos interlocutores de uma transcrição e os procura
+    entre as identidades cadastradas. Não faz commit.
+
+    Args:
+        db: Sessão do banco de dados
+        transcription_id: ID da transcrição
+        embeddings: Rótulo da diarização -> embedding normalizado
+        model: Modelo que gerou os embeddings
+        speech_seconds: Tempo de fala de cada rótulo
+
+    Returns:
+        Rótulo -> nome da identidade, só para os interlocutores reconhecidos
+    """
+    # Uma nova tentativa do job substitui os embeddings anteriores (os cadastrados ficam)
+    db.execute(delete(SpeakerEmbedding).where(
+        SpeakerEmbedding.transcription_id == transcription_id,
+        SpeakerEmbedding.enrolled.is_(False)
+    ))
+
+    matches = directory.identify(db, embeddings, model)
+    names = {}
+    if matches:
+        names = dict(db.execute(
+            select(Speaker.id, Speaker.name).where(Speaker.id.in_([speaker_id for speaker_id, _ in matches.values()]))
+        ).all())
+
+    for label, vector in embeddings.items():
+        speaker_id, score = matches.get(label, (None, None))
+        db.add(SpeakerEmbedding(
+            transcription_id=transcription_id,
+            label=label,
+            speaker_id=speaker_id,
+            score=score,
+            model=model,
+            dim=len(vector),
+            speech_seconds=(speech_seconds or {}).get(label),
+            vector=encode_vector(vector)
+        ))
+    return {label: names[speaker_id] for label, (speaker_id, _) in matches.items()}
+
+def speech_seconds_by_label(diarization_segments: List[Dict]) -> Dict[str, float]:
+    """
+    Soma a duração dos turnos de cada rótulo da diarização.
+    """
+    totals: Dict[str, float] = {}
+    for segment in diarization_segments:
+        totals[segment['speaker']] = totals.get(segment['speaker'], 0.0) + segment['end_time'] - segment['start_time']
+    return totals
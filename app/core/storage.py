@@ -0,0 +1,186 @@
+import contextlib
+import hashlib
+import os
+import time
+import uuid
+from typing import Iterable, Iterator, Optional, Tuple
+
+from app.core.config import STORE_DIR, STORE_MAX_MEDIA_BYTES, STORE_MAX_BYTES, STORE_TEMP_MAX_AGE_SECONDS
+
+# Extensões tratadas como mídia (grandes, descartáveis) na política de espaço
+MEDIA_SUFFIXES = {".wav", ".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4a", ".mp3", ".flac", ".ogg", ".opus"}
+
+class ContentStore:
+    """
+    Armazenamento endereçado por conteúdo.
+
+    Cada artefato é gravado em <raiz>/<aa>/<bb>/<hash><sufixo>, de modo que
+    conteúdos idênticos ocupam um único arquivo e o caminho pode ser
+    reconstruído a partir do hash. O horário de modificação é renovado a cada
+    reuso e serve de critério LRU para o descarte de mídia.
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def path_for(self, digest: str, suffix: str = "") -> str:
+        """
+        Retorna o caminho de um artefato a partir do seu hash.
+        """
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}{suffix}")
+
+    def relative_path(self, path: str) -> str:
+        """
+        Caminho relativo à raiz do armazenamento, usado nos registros do banco.
+        """
+        return os.path.relpath(path, self.root)
+
+    def temp_dir(self) -> str:
+        """
+        Diretório temporário dentro do armazenamento (mesmo sistema de arquivos, para os.replace).
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return tmp_dir
+
+    def temp_path(self, suffix: str = "") -> str:
+        """
+        Cria um caminho temporário único dentro do armazenamento.
+        """
+        return os.path.join(self.temp_dir(), f"{uuid.uuid4()}{suffix}")
+
+    def put(self, tmp_path: str, digest: str, suffix: str = "") -> str:
+        """
+        Move um arquivo temporário para o seu endereço; se o conteúdo já existir, descarta a cópia.
+
+        Returns:
+            Caminho definitivo do artefato
+        """
+        path = self.path_for(digest, suffix)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            self.touch(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return path
+
+    def get(self, digest: str, suffix: str = "") -> Optional[str]:
+        """
+        Retorna o caminho do artefato se ele existir, renovando seu uso.
+        """
+        path = self.path_for(digest, suffix)
+        if not os.path.exists(path):
+            return None
+        self.touch(path)
+        return path
+
+    def touch(self, path: str) -> None:
+        os.utime(path, None)
+
+    def artifacts(self, suffix: Optional[str] = None) -> Iterator[Tuple[str, os.stat_result]]:
+        """
+        Percorre os artefatos do armazenamento (fora do diretório temporário).
+
+        Args:
+            suffix: Restringe aos arquivos terminados com este sufixo
+        """
+        for directory, _, names in os.walk(self.root):
+            if os.path.basename(directory) == "tmp":
+                continue
+            for name in names:
+                if suffix is not None and not name.endswith(suffix):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    yield path, os.stat(path)
+                except FileNotFoundError:
+                    continue  # removido por outro processo durante a varredura
+
+    def evict_media(self, max_bytes: int = STORE_MAX_MEDIA_BYTES, protected_digests: Iterable[str] = ()) -> int:
+        """
+        Remove mídia (vídeos e áudios) menos usada até o total caber em max_bytes.
+
+        Transcrições JSON são pequenas e nunca são descartadas aqui.
+
+        Args:
+            max_bytes: Espaço máximo para mídia
+            protected_digests: Hashes cujos artefatos não podem ser removidos (jobs pendentes)
+
+        Returns:
+            Bytes liberados
+        """
+        return self._evict(max_bytes, protected_digests, media_only=True)
+
+    def evict(self, max_bytes: int = STORE_MAX_BYTES, protected_digests: Iterable[str] = ()) -> int:
+        """
+        Remove os artefatos menos usados, de qualquer tipo, até o armazenamento
+        inteiro caber em max_bytes (0 = sem limite). Checkpoints de jobs
+        concluídos descartados são refeitos se um reprocessamento precisar deles.
+
+        Args:
+            max_bytes: Espaço máximo do armazenamento
+            protected_digests: Hashes dos artefatos que não podem ser removidos,
+                inclusive os derivados (ver app.core.jobs.protected_digests)
+
+        Returns:
+            Bytes liberados
+        """
+        if max_bytes <= 0:
+            return 0
+        return self._evict(max_bytes, protected_digests, media_only=False)
+
+    def _evict(self, max_bytes: int, protected_digests: Iterable[str], media_only: bool) -> int:
+        protected = set(protected_digests)
+        files = []
+        for path, stat in self.artifacts():
+            name = os.path.basename(path)
+            if media_only and os.path.splitext(name)[1].lower() not in MEDIA_SUFFIXES:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path, name.split(".", 1)[0] in protected))
+
+        total = sum(size for _, size, _, _ in files)
+        freed = 0
+        for _, size, path, is_protected in sorted(files):
+            if total <= max_bytes:
+                break
+            if is_protected:
+                continue
+            # Outro processo pode estar descartando o mesmo arquivo
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                freed += size
+            total -= size
+        return freed
+
+    def clean_temp(self, max_age_seconds: float = STORE_TEMP_MAX_AGE_SECONDS) -> int:
+        """
+        Remove arquivos temporários abandonados (ex.: uploads interrompidos por
+        uma queda do processo) sem modificação há mais de max_age_seconds.
+
+        Returns:
+            Bytes liberados
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        if not os.path.isdir(tmp_dir):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        freed = 0
+        for entry in os.scandir(tmp_dir):
+            try:
+                stat = entry.stat()
+                if entry.is_file() and stat.st_mtime < cutoff:
+                    os.remove(entry.path)
+                    freed += stat.st_size
+            except FileNotFoundError:
+                continue
+        return freed
+
+# Armazenamento compartilhado pelo processo
+store = ContentStore()
+
+def artifact_digest(*parts: str) -> str:
+    """
+    Hash estável de um artefato derivado (ex.: transcrição de um conteúdo com um modelo).
+    """
+    return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,408 @@
+"""
+Transcrição ao vivo de áudio recebido em blocos.
+
+A cada STREAMING_STEP_SECONDS de áudio novo o Whisper transcreve de novo a
+janela deslizante e a política LocalAgreement-2 confirma as palavras em que
+duas passagens consecutivas concordam. As palavras confirmadas formam
+segmentos finalizados (em pontuação final, pausa longa ou duração máxima),
+que recebem um interlocutor por agrupamento online de embeddings de voz e
+são gravados em TranscriptionSegment assim que se estabilizam. A janela é
+cortada no fim do último segmento finalizado, mantendo-a curta.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.audio_utils import start_stream_decoder, wav_header
+from app.core.config import (
+    AUDIO_SAMPLE_RATE, TRANSCRIPTION_LANGUAGE, TRANSCRIPTS_DIR,
+    STREAMING_STEP_SECONDS, STREAMING_BUFFER_SECONDS, STREAMING_MAX_SEGMENT_SECONDS,
+    STREAMING_SPEAKER_THRESHOLD, STREAMING_MIN_EMBED_SECONDS
+)
+from app.core.database import SessionLocal
+from app.core.events import publish_event
+from app.core.segment_store import append_segments
+from app.core.storage import store
+from app.models.schema import Transcription
+
+logger = logging.getLogger(__name__)
+
+# Formatos aceitos pelo endpoint de transcrição ao vivo
+STREAM_FORMATS = ("pcm_s16le", "pcm_f32le", "opus")
+
+# Rótulo do diarizador online, parte da chave do cache de resultados
+ONLINE_DIARIZATION_MODEL = "online"
+
+# O Whisper processa no máximo 30 s por passagem; acima disto a janela é cortada mesmo sem segmento finalizado
+MAX_WINDOW_SECONDS = 25.0
+
+# Pausa entre palavras que encerra um segmento
+SEGMENT_GAP_SECONDS = 1.0
+
+_SENTENCE_END = re.compile(r"[.!?…]['\")\]]*$")
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+class LocalAgreement:
+    """
+    Política LocalAgreement-2: uma palavra é confirmada quando duas hipóteses
+    consecutivas da janela concordam até ela.
+    """
+
+    def __init__(self, tail_words: int = 5):
+        self.committed_end = 0.0
+        self._tail: List[Dict[str, Any]] = []
+        self._tail_words = tail_words
+        self._previous: List[Dict[str, Any]] = []
+
+    def insert(self, words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Recebe a hipótese atual (tempos absolutos) e retorna as palavras recém-confirmadas.
+        """
+        new = [word for word in words if word['start'] > self.committed_end - 0.1]
+
+        # O início da hipótese pode repetir as últimas palavras já confirmadas
+        tail = [_normalize_word(word['word']) for word in self._tail]
+        for size in range(min(len(tail), len(new)), 0, -1):
+            if tail[-size:] == [_normalize_word(word['word']) for word in new[:size]]:
+                new = new[size:]
+                break
+
+        confirmed = []
+        for current, previous in zip(new, self._previous):
+            if _normalize_word(current['word']) != _normalize_word(previous['word']):
+                break
+            confirmed.append(current)
+
+        self._previous = new[len(confirmed):]
+        self._commit(confirmed)
+        return confirmed
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """
+        Palavras da última hipótese ainda não confirmadas.
+        """
+        return self._previous
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Confirma o restante da última hipótese (fim do fluxo).
+        """
+        words, self._previous = self._previous, []
+        self._commit(words)
+        return words
+
+    def _commit(self, words: List[Dict[str, Any]]) -> None:
+        if words:
+            self.committed_end = words[-1]['end']
+            self._tail = (self._tail + words)[-self._tail_words:]
+
+class OnlineSpeakerClustering:
+    """
+    Agrupamento incremental de embeddings de voz: cada embedding vai para o
+    centróide mais similar (cosseno) acima do limiar ou abre um novo interlocutor.
+    """
+
+    def __init__(self, threshold: float = STREAMING_SPEAKER_THRESHOLD):
+        self.threshold = threshold
+        self._centroids: List[np.ndarray] = []
+        self._counts: List[int] = []
+
+    def assign(self, embedding: np.ndarray) -> str:
+        if self._centroids:
+            similarities = np.stack(self._centroids) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                count = self._counts[best]
+                centroid = (self._centroids[best] * count + embedding) / (count + 1)
+                self._centroids[best] = centroid / (np.linalg.norm(centroid) or 1.0)
+                self._counts[best] = count + 1
+                return f"SPEAKER_{best:02d}"
+
+        self._centroids.append(embedding)
+        self._counts.append(1)
+        return f"SPEAKER_{len(self._centroids) - 1:02d}"
+
+class StreamingSession:
+    """
+    Sessão de transcrição ao vivo ligada a um registro Transcription.
+
+    Os métodos são bloqueantes e devem ser chamados em sequência (o endpoint
+    os executa no threadpool).
+    """
+
+    def __init__(self, transcriber, diarizer=None, input_format: str = "pcm_s16le",
+                 sample_rate: int = AUDIO_SAMPLE_RATE):
+        """
+        Args:
+            transcriber: WhisperTranscriber carregado
+            diarizer: SpeakerDiarizer para os embeddings de voz (None: interlocutor "unknown")
+            input_format: Um de STREAM_FORMATS
+            sample_rate: Taxa do PCM recebido
+        """
+        if input_format not in STREAM_FORMATS:
+            raise ValueError(f"Formato inválido. Opções: {', '.join(STREAM_FORMATS)}")
+
+        self.transcriber = transcriber
+        self.diarizer = diarizer
+        self.input_format = input_format
+        self.agreement = LocalAgreement()
+        self.clustering = OnlineSpeakerClustering()
+        self.transcription_id: Optional[int] = None
+        self.segment_count = 0
+
+        self._window = np.zeros(0, dtype=np.float32)
+        self._window_offset = 0.0  # segundos de áudio antes da janela
+        self._unprocessed = 0  # amostras recebidas desde a última passagem
+        self._words: List[Dict[str, Any]] = []  # confirmadas, ainda não finalizadas
+        self._prompt = ""
+        self._last_speaker = "unknown"
+        self._remainder = b""
+
+        self._lock = threading.Lock()
+        self._decoder = None
+        self._reader = None
+        if input_format == "opus" or sample_rate != AUDIO_SAMPLE_RATE:
+            self._decoder = start_stream_decoder(input_format, sample_rate)
+            self._reader = threading.Thread(target=self._read_decoder, name="stream-decoder", daemon=True)
+            self._reader.start()
+
+        self._db = SessionLocal()
+        self._recording_path = store.temp_path(".wav")
+        self._recording = open(self._recording_path, "wb")
+        self._recording.write(wav_header(0))
+        self._recorded = 0
+
+    def start(self, filename: str) -> int:
+        """
+        Cria o registro da transcrição ao vivo.
+
+        Returns:
+            ID da transcrição
+        """
+        transcription = Transcription(
+            video_filename=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}",
+            audio_filename="",
+            transcript_filename="",
+            status="streaming",
+            model_size=self.transcriber.model_size,
+            whisper_backend=self.transcriber.backend_name,
+            language=TRANSCRIPTION_LANGUAGE,
+            diarization_model=ONLINE_DIARIZATION_MODEL
+        )
+        self._db.add(transcription)
+        self._db.commit()
+        self.transcription_id = transcription.id
+        publish_event(self.transcription_id, "job", "streaming")
+        return self.transcription_id
+
+    def feed(self, data: bytes) -> None:
+        """
+        Recebe um bloco de áudio no formato da sessão.
+        """
+        if self._decoder is not None:
+            self._decoder.stdin.write(data)
+            self._decoder.stdin.flush()
+            return
+
+        data = self._remainder + data
+        sample_size = 2 if self.input_format == "pcm_s16le" else 4
+        usable = len(data) - len(data) % sample_size
+        self._remainder = data[usable:]
+        if self.input_format == "pcm_s16le":
+            samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(data[:usable], dtype="<f4")
+        self._append(samples)
+
+    def _read_decoder(self) -> None:
+        pending = b""
+        while True:
+            data = self._decoder.stdout.read1(65536)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 4
+            pending = data[usable:]
+            if usable:
+                self._append(np.frombuffer(data[:usable], dtype="<f4"))
+
+    def _append(self, samples: np.ndarray) -> None:
+        with self._lock:
+            self._window = np.concatenate([self._window, samples])
+            self._unprocessed += len(samples)
+            self._recording.write(samples.astype("<f4").tobytes())
+            self._recorded += len(samples)
+
+    def ready(self) -> bool:
+        """
+        Indica se já chegou áudio novo suficiente para uma passagem do Whisper.
+        """
+        with self._lock:
+            return self._unprocessed >= STREAMING_STEP_SECONDS * AUDIO_SAMPLE_RATE
+
+    def process(self) -> List[Dict[str, Any]]:
+        """
+        Transcreve a janela atual e retorna os eventos gerados: segmentos
+        finalizados e a legenda parcial.
+        """
+        with self._lock:
+            window = self._window
+            offset = self._window_offset
+            self._unprocessed = 0
+        if len(window) == 0:
+            return []
+
+        words = [
+            dict(word, start=word['start'] + offset, end=word['end'] + offset)
+            for word in self.transcriber.transcribe_window(window, self._prompt)
+        ]
+        self._words.extend(self.agreement.insert(words))
+
+        events = self._finalize(force=False)
+
+        # Limita a janela: sem segmento finalizado a cortar, força a finalização
+        if len(self._window) / AUDIO_SAMPLE_RATE > MAX_WINDOW_SECONDS:
+            events += self._finalize(force=True)
+            if len(self._window) / AUDIO_SAMPLE_RATE > MAX_WINDOW_SECONDS:
+                self._trim(self._window_offset + len(self._window) / AUDIO_SAMPLE_RATE - STREAMING_BUFFER_SECONDS)
+
+        partial = self._words + self.agreement.pending()
+        if partial:
+            events.append({
+                "type": "partial",
+                "start": partial[0]['start'],
+                "end": partial[-1]['end'],
+                "text": "".join(word['word'] for word in partial).strip()
+            })
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Encerra a sessão: processa o áudio restante, finaliza todos os
+        segmentos e grava o áudio e a transcrição completos.
+        """
+        events: List[Dict[str, Any]] = []
+        try:
+            if self._decoder is not None:
+                self._decoder.stdin.close()
+                self._decoder.wait()
+                self._reader.join()
+
+            if self._unprocessed:
+                events += [event for event in self.process() if event["type"] == "final"]
+            self._words.extend(self.agreement.flush())
+            events += self._finalize(force=True)
+            self._complete()
+        finally:
+            self.close()
+        return events
+
+    def close(self) -> None:
+        """
+        Libera o decodificador, o arquivo de gravação e a sessão do banco.
+        """
+        if self._decoder is not None and self._decoder.poll() is None:
+            self._decoder.kill()
+            self._decoder.wait()
+        if not self._recording.closed:
+            self._recording.close()
+        if os.path.exists(self._recording_path):
+            os.remove(self._recording_path)
+        self._db.close()
+
+    def _finalize(self, force: bool) -> List[Dict[str, Any]]:
+        # Divide as palavras confirmadas em segmentos completos
+        segments = []
+        current: List[Dict[str, Any]] = []
+        for index, word in enumerate(self._words):
+            current.append(word)
+            following = self._words[index + 1] if index + 1 < len(self._words) else None
+            if (_SENTENCE_END.search(word['word'].strip())
+                    or (following is not None and following['start'] - word['end'] > SEGMENT_GAP_SECONDS)
+                    or word['end'] - current[0]['start'] >= STREAMING_MAX_SEGMENT_SECONDS):
+                segments.append(current)
+                current = []
+        if force and current:
+            segments.append(current)
+            current = []
+        if not segments:
+            return []
+
+        self._words = current
+        finalized = [self._build_segment(words) for words in segments]
+
+        append_segments(self._db, self.transcription_id, finalized)
+        self._db.commit()
+        self.segment_count += len(finalized)
+        publish_event(self.transcription_id, "streaming", "progress", segments=self.segment_count)
+
+        self._prompt = (self._prompt + " " + " ".join(segment['text'] for segment in finalized))[-200:]
+        self._trim(finalized[-1]['end_time'])
+        return [{"type": "final", "segment": segment} for segment in finalized]
+
+    def _build_segment(self, words: List[Dict[str, Any]]) -> Dict[str, Any]:
+        start, end = words[0]['start'], words[-1]['end']
+        speaker = self._last_speaker
+        if self.diarizer is not None and end - start >= STREAMING_MIN_EMBED_SECONDS:
+            with self._lock:
+                first = max(0, int((start - self._window_offset) * AUDIO_SAMPLE_RATE))
+                audio = self._window[first:int((end - self._window_offset) * AUDIO_SAMPLE_RATE)]
+            try:
+                speaker = self.clustering.assign(self.diarizer.embed(audio))
+            except Exception:
+                logger.exception("Falha no embedding de voz da sessão %s", self.transcription_id)
+        self._last_speaker = speaker
+
+        return {
+            'start_time': start,
+            'end_time': end,
+            'speaker': speaker,
+            'text': "".join(word['word'] for word in words).strip()
+        }
+
+    def _trim(self, until: float) -> None:
+        # Descarta o áudio da janela anterior a `until` (segundos absolutos)
+        with self._lock:
+            cut = int((until - self._window_offset) * AUDIO_SAMPLE_RATE)
+            if cut <= 0:
+                return
+            self._window = self._window[cut:]
+            self._window_offset += cut / AUDIO_SAMPLE_RATE
+
+    def _complete(self) -> None:
+        transcription = self._db.get(Transcription, self.transcription_id)
+
+        # Grava a sessão completa no armazenamento, no mesmo formato de prepare_audio
+        self._recording.seek(0)
+        self._recording.write(wav_header(self._recorded))
+        self._recording.close()
+        digest = hashlib.sha256()
+        with open(self._recording_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+        audio_path = store.put(self._recording_path, content_hash, ".wav")
+
+        segments = [
+            {'start': segment.start_time, 'end': segment.end_time, 'speaker': segment.speaker, 'text': segment.text}
+            for segment in sorted(transcription.segments, key=lambda s: s.start_time)
+        ]
+        transcript = {
+            'text': " ".join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': TRANSCRIPTION_LANGUAGE
+        }
+        transcription.transcript_filename = self.transcriber.save_transcription(transcript, TRANSCRIPTS_DIR)
+        transcription.audio_filename = store.relative_path(audio_path)
+        transcription.content_hash = content_hash
+        transcription.status = "completed"
+        self._db.commit()
+        publish_event(self.transcription_id, "job", "completed", segments=self.segment_count)
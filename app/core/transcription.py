@@ -1,63 +1,477 @@
 import os
-import json
+import multiprocessing
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Union
 
+import numpy as np
+import torch
 import whisper
 
+from app.core.artifacts import JSON_SUFFIX, write_json
+from app.core.audio_utils import detect_speech_regions, join_speech, plan_chunks, speech_offsets, to_source_time
+from app.core.config import (
+    AUDIO_SAMPLE_RATE, LONGFORM_MIN_SECONDS, LONGFORM_CHUNK_SECONDS, LONGFORM_OVERLAP_SECONDS, LONGFORM_WORKERS,
+    WHISPER_BATCH_SIZE, WHISPER_BATCH_MAX_WAIT_SECONDS, TRANSCRIPTION_LANGUAGE, WHISPER_BACKEND,
+    WHISPER_WORD_TIMESTAMPS
+)
+from app.core.scheduler import estimate_cost
+from app.core.whisper_backends import create_backend
+
+TRANSCRIBE_OPTIONS = {
+    "language": TRANSCRIPTION_LANGUAGE,  # Portuguese by default
+    "task": "transcribe",
+    "verbose": False,
+    # transcribe_batch does not produce words, so with word timestamps
+    # transcribe_audio does not batch
+    "word_timestamps": WHISPER_WORD_TIMESTAMPS
+}
+
+# Model loaded once per long-form pool process
+_chunk_backend = None
+
+def _init_chunk_worker(model_size: str, num_threads: Optional[int], backend: str = WHISPER_BACKEND) -> None:
+    global _chunk_backend
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    _chunk_backend = create_backend(backend, model_size, num_threads)
+
+def _transcribe_chunk(chunk: np.ndarray) -> Dict[str, Any]:
+    return _chunk_backend.transcribe(chunk, **TRANSCRIBE_OPTIONS)
+
+def _map_segment(segment: Dict[str, Any], to_source: Callable[[float], float]) -> Dict[str, Any]:
+    mapped = dict(segment, start=to_source(segment['start']), end=to_source(segment['end']))
+    if 'words' in segment:
+        mapped['words'] = [
+            dict(word, start=to_source(word['start']), end=to_source(word['end'])) for word in segment['words']
+        ]
+    return mapped
+
+def stitch_chunk_results(chunks: List[tuple], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk Whisper results into a single result with global timestamps.
+    
+    Chunk timestamps are mapped back through the chunk's speech pieces (the
+    silence between them was removed, see join_speech). Each chunk owns the
+    segments that start between its seam and the next chunk's seam, so the
+    overlap of a forced cut is kept only once. A segment repeating the
+    previous text across the seam is dropped as well.
+    
+    Args:
+        chunks: (start, end, seam, pieces) tuples from plan_chunks, in seconds
+        results: Whisper results for each chunk, in the same order
+        
+    Returns:
+        Whisper-style result dictionary
+    """
+    segments = []
+    for index, ((_, _, seam, pieces), result) in enumerate(zip(chunks, results)):
+        next_seam = chunks[index + 1][2] if index + 1 < len(chunks) else float("inf")
+        offsets = speech_offsets(pieces)
+        to_source = lambda seconds: to_source_time(seconds, pieces, offsets)
+        for segment in result.get('segments', []):
+            segment = _map_segment(segment, to_source)
+            if not seam <= segment['start'] < next_seam:
+                continue
+            if segments and segment['text'].strip() == segments[-1]['text'].strip() \
+                    and segment['start'] < segments[-1]['end']:
+                continue
+            segments.append(segment)
+    
+    for index, segment in enumerate(segments):
+        segment['id'] = index
+    
+    return {
+        'text': "".join(segment['text'] for segment in segments),
+        'segments': segments,
+        'language': results[0].get('language', TRANSCRIBE_OPTIONS['language']) if results else TRANSCRIBE_OPTIONS['language']
+    }
+
+# Same thresholds whisper.transcribe uses to discard silent windows
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+def _segments_from_tokens(tokens: List[int], tokenizer, duration: float) -> List[Dict[str, Any]]:
+    """
+    Split a decoded token sequence into timed segments using its timestamp tokens.
+    """
+    segments = []
+    start = None
+    text_tokens = []
+    
+    def flush(end: float) -> None:
+        text = tokenizer.decode(text_tokens)
+        if text.strip():
+            segments.append({
+                'id': len(segments),
+                'start': start or 0.0,
+                'end': min(max(end, start or 0.0), duration),
+                'text': text,
+                'tokens': list(text_tokens)
+            })
+    
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            timestamp = (token - tokenizer.timestamp_begin) * 0.02
+            if start is not None and text_tokens:
+                flush(timestamp)
+                text_tokens = []
+                start = None
+            else:
+                start = timestamp
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+    
+    if text_tokens:
+        flush(duration)
+    return segments
+
+class _MicroBatcher:
+    """
+    Collects short clips submitted from concurrent jobs and runs them through
+    the model as one batch once WHISPER_BATCH_SIZE clips are waiting or the
+    oldest one has waited WHISPER_BATCH_MAX_WAIT_SECONDS.
+    """
+    
+    def __init__(self, transcriber: "WhisperTranscriber", batch_size: int, max_wait: float):
+        # Weak reference, so the thread does not keep an evicted transcriber
+        # alive; its finalizer stops the thread
+        self._transcriber = weakref.ref(transcriber)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        weakref.finalize(transcriber, self._queue.put, None)
+        self._thread = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, audio: np.ndarray) -> Future:
+        future = Future()
+        self._queue.put((audio, future))
+        return future
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            
+            try:
+                results = self._transcribe([audio for audio, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+    
+    def _transcribe(self, audios: List[np.ndarray]) -> List[Dict[str, Any]]:
+        # The strong reference lives only for the call
+        transcriber = self._transcriber()
+        if transcriber is None:
+            raise RuntimeError("Transcriber was released")
+        return transcriber.transcribe_batch(audios)
+
+@contextmanager
+def _estimated_progress(progress: Optional[Callable[[float], None]], expected_seconds: float,
+                        interval: float = 1.0):
+    """
+    Report a coarse completed fraction while a single model call runs.
+
+    Whisper has no progress callback, so the fraction is the elapsed time over
+    the expected processing time, capped at 0.95 until the call returns.
+    """
+    if progress is None or expected_seconds <= 0:
+        yield
+        return
+    started = time.monotonic()
+    stop = threading.Event()
+
+    def tick() -> None:
+        while not stop.wait(interval):
+            progress(min((time.monotonic() - started) / expected_seconds, 0.95))
+
+    ticker = threading.Thread(target=tick, name="transcription-progress", daemon=True)
+    ticker.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        ticker.join()
+    progress(1.0)
+
 class WhisperTranscriber:
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", num_threads: Optional[int] = None,
+                 backend: str = WHISPER_BACKEND):
         """
         Initialize Whisper transcriber with specified model size.
         
         Args:
             model_size: Size of the Whisper model to use (tiny, base, small, medium, large)
+            num_threads: CPU threads for backends with their own thread pool
+                (ctranslate2) and for the long-form pool processes; torch
+                models share the process-wide pool (TORCH_NUM_THREADS)
+            backend: Inference backend (reference, int8 or ctranslate2, see
+                app.core.whisper_backends)
         """
-        self.model = whisper.load_model(model_size)
+        self.backend = create_backend(backend, model_size, num_threads)
+        self.model_size = model_size
+        self.backend_name = backend
+        self.num_threads = num_threads
+        self._chunk_pool = None
+        self._batcher = None
+        # Whisper installs kv-cache hooks on the shared model while decoding,
+        # so concurrent jobs must not run it at the same time
+        self._model_lock = threading.Lock()
     
-    def transcribe_audio(self, audio_path: str) -> Dict[str, Any]:
+    def transcribe_audio(self, audio: Union[str, np.ndarray],
+                         progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
         """
-        Transcribe audio file using Whisper.
+        Transcribe audio using Whisper.
+        
+        Waveforms longer than LONGFORM_MIN_SECONDS go through
+        transcribe_long_audio, which skips silence and parallelizes chunks.
+        With WHISPER_BATCH_SIZE > 1 and a backend that supports it, waveforms
+        of up to 30 seconds are batched with clips from other concurrent jobs,
+        unless word timestamps are enabled (batched results have no words).
         
         Args:
-            audio_path: Path to the audio file
+            audio: Path to the audio file, or a float32 mono waveform at 16 kHz
+                (as returned by load_audio) to skip Whisper's own ffmpeg decode
+            progress: Optional callback receiving the completed fraction: once
+                per chunk for long audio, otherwise an estimate from the
+                expected real-time factor (see _estimated_progress)
             
         Returns:
             Dictionary containing transcription results
         """
         try:
-            # Transcribe audio
-            result = self.model.transcribe(
-                audio_path,
-                language="pt",  # Portuguese language
-                task="transcribe",
-                verbose=False
-            )
+            if (isinstance(audio, np.ndarray) and LONGFORM_MIN_SECONDS > 0
+                    and len(audio) >= LONGFORM_MIN_SECONDS * AUDIO_SAMPLE_RATE):
+                return self.transcribe_long_audio(audio, progress)
+            
+            expected_seconds = 0.0
+            if isinstance(audio, np.ndarray):
+                expected_seconds = estimate_cost(len(audio) / AUDIO_SAMPLE_RATE, self.model_size, self.backend_name)
             
-            return result
+            with _estimated_progress(progress, expected_seconds):
+                if (isinstance(audio, np.ndarray) and WHISPER_BATCH_SIZE > 1 and self.backend.supports_batch
+                        and not TRANSCRIBE_OPTIONS['word_timestamps'] and len(audio) <= whisper.audio.N_SAMPLES):
+                    return self._get_batcher().submit(audio).result()
+                
+                # Transcribe audio
+                with self._model_lock:
+                    return self.backend.transcribe(audio, **TRANSCRIBE_OPTIONS)
         except Exception as e:
             raise Exception(f"Error transcribing audio: {str(e)}")
     
-    def save_transcription(self, transcription: Dict[str, Any], output_dir: str) -> str:
+    def transcribe_long_audio(self, audio: np.ndarray,
+                              progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
         """
-        Save transcription results to a JSON file.
+        Transcribe long audio in chunks split at silences.
+        
+        Only the speech regions found by the VAD are sent to the model: each
+        chunk concatenates its regions with a short pause between them, and
+        timestamps are mapped back when stitching. With
+        LONGFORM_WORKERS > 1 the chunks run in parallel on a process pool,
+        each process holding its own copy of the model; the thread budget is
+        split between them.
+        
+        Args:
+            audio: Float32 mono waveform at 16 kHz
+            progress: Optional callback receiving the fraction of speech
+                already transcribed after each chunk
+            
+        Returns:
+            Whisper-style result with global timestamps
+        """
+        chunks = plan_chunks(detect_speech_regions(audio), LONGFORM_CHUNK_SECONDS, LONGFORM_OVERLAP_SECONDS)
+        if not chunks:
+            return {'text': "", 'segments': [], 'language': TRANSCRIBE_OPTIONS['language']}
+        
+        def speech_seconds(pieces: List[tuple]) -> float:
+            return sum(end - start for start, end in pieces)
+        
+        total_seconds = sum(speech_seconds(pieces) for _, _, _, pieces in chunks)
+        done_seconds = 0.0
+        
+        def chunk_done(pieces: List[tuple]) -> None:
+            nonlocal done_seconds
+            done_seconds += speech_seconds(pieces)
+            if progress and total_seconds > 0:
+                progress(done_seconds / total_seconds)
+        
+        results = []
+        if LONGFORM_WORKERS <= 1:
+            with self._model_lock:
+                for _, _, _, pieces in chunks:
+                    results.append(self.backend.transcribe(join_speech(audio, pieces), **TRANSCRIBE_OPTIONS))
+                    chunk_done(pieces)
+        else:
+            pool = self._get_chunk_pool()
+            futures = [pool.submit(_transcribe_chunk, join_speech(audio, pieces)) for _, _, _, pieces in chunks]
+            for future, (_, _, _, pieces) in zip(futures, chunks):
+                results.append(future.result())
+                chunk_done(pieces)
+        
+        return stitch_chunk_results(chunks, results)
+    
+    def transcribe_window(self, audio: np.ndarray, prompt: str = "") -> List[Dict[str, Any]]:
+        """
+        Transcribe a short live-audio window with word timestamps.
+        
+        Used by the streaming session, which re-transcribes its sliding window
+        at every step and keeps the words that consecutive passes agree on.
+        
+        Args:
+            audio: Float32 mono waveform at 16 kHz (at most about 30 seconds)
+            prompt: Text already finalized before the window, for context
+            
+        Returns:
+            Words with 'word', 'start' and 'end' relative to the window
+        """
+        try:
+            with self._model_lock:
+                result = self.backend.transcribe(
+                    audio,
+                    **dict(TRANSCRIBE_OPTIONS, word_timestamps=True),
+                    condition_on_previous_text=False,
+                    initial_prompt=prompt or None
+                )
+            
+            return [word for segment in result.get('segments', []) for word in segment.get('words', [])]
+        except Exception as e:
+            raise Exception(f"Error transcribing audio: {str(e)}")
+    
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Transcribe several short clips (up to 30 seconds each) in one batch.
+        
+        The log-mel windows of all clips go through the encoder and the
+        decoder together, then each result is split into timed segments.
+        Decoding is greedy at temperature 0, without the per-window
+        temperature fallback of model.transcribe. Only for backends with
+        supports_batch (a torch Whisper model).
+        
+        Args:
+            audios: Float32 mono waveforms at 16 kHz
+            
+        Returns:
+            Whisper-style result for each clip, in the same order
+        """
+        model = self.backend.model
+        n_mels = model.dims.n_mels
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)), n_mels)
+            for audio in audios
+        ]).to(model.device)
+        
+        options = whisper.DecodingOptions(
+            language=TRANSCRIBE_OPTIONS['language'],
+            task=TRANSCRIBE_OPTIONS['task'],
+            fp16=model.device.type == "cuda"
+        )
+        with self._model_lock:
+            decoded = whisper.decode(model, mels, options)
+        
+        tokenizer = whisper.tokenizer.get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=options.language,
+            task=options.task
+        )
+        
+        results = []
+        for audio, result in zip(audios, decoded):
+            silent = result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+            segments = [] if silent else _segments_from_tokens(result.tokens, tokenizer, len(audio) / AUDIO_SAMPLE_RATE)
+            for segment in segments:
+                segment.update(
+                    temperature=result.temperature,
+                    avg_logprob=result.avg_logprob,
+                    compression_ratio=result.compression_ratio,
+                    no_speech_prob=result.no_speech_prob
+                )
+            results.append({
+                'text': "".join(segment['text'] for segment in segments),
+                'segments': segments,
+                'language': result.language
+            })
+        return results
+    
+    def _get_batcher(self) -> _MicroBatcher:
+        if self._batcher is None:
+            with self._model_lock:
+                if self._batcher is None:
+                    self._batcher = _MicroBatcher(self, WHISPER_BATCH_SIZE, WHISPER_BATCH_MAX_WAIT_SECONDS)
+        return self._batcher
+    
+    def _get_chunk_pool(self) -> ProcessPoolExecutor:
+        # Created on first use and kept for the lifetime of the transcriber
+        if self._chunk_pool is None:
+            threads_per_worker = max(1, (self.num_threads or os.cpu_count() or 1) // LONGFORM_WORKERS)
+            self._chunk_pool = ProcessPoolExecutor(
+                max_workers=LONGFORM_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(self.model_size, threads_per_worker, self.backend_name)
+            )
+            # Shut down once the last reference goes, e.g. after eviction from
+            # the model registry while a job still held the transcriber
+            weakref.finalize(self, self._chunk_pool.shutdown, wait=False)
+        return self._chunk_pool
+    
+    def close(self) -> None:
+        """
+        Shut down the long-form process pool, if any. Only for owners that
+        know no other thread uses the transcriber (e.g. benchmarks); otherwise
+        the pool is shut down when the transcriber is garbage collected.
+        """
+        if self._chunk_pool is not None:
+            self._chunk_pool.shutdown(wait=False)
+            self._chunk_pool = None
+    
+    def save_transcription(self, transcription: Dict[str, Any], output_dir: str,
+                           filename: Optional[str] = None) -> str:
+        """
+        Save transcription results to a compact JSON file, compressed
+        according to the file name's extension (see app.core.artifacts).
         
         Args:
             transcription: Transcription results from Whisper
             output_dir: Directory to save the transcription file
+            filename: File name to use (defaults to a timestamped name)
             
         Returns:
             Path to the saved transcription file
         """
         try:
             # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"transcription_{timestamp}.json"
+            if filename is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"transcription_{timestamp}{JSON_SUFFIX}"
             output_path = os.path.join(output_dir, filename)
             
             # Save transcription to file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(transcription, f, ensure_ascii=False, indent=2)
+            write_json(output_path, transcription)
             
             return filename
         except Exception as e:
@@ -67,6 +481,10 @@ class WhisperTranscriber:
         """
         Process transcription segments for database storage.
         
+        Times are kept in seconds with millisecond precision. Segments
+        transcribed with word timestamps keep their words ('word', 'start',
+        'end'), which speaker assignment uses to split them.
+        
         Args:
             transcription: Transcription results from Whisper
             
@@ -77,11 +495,17 @@ class WhisperTranscriber:
         
         for segment in transcription.get('segments', []):
             processed_segment = {
-                'start_time': int(segment['start']),
-                'end_time': int(segment['end']),
+                'start_time': round(segment['start'], 3),
+                'end_time': round(segment['end'], 3),
                 'text': segment['text'].strip(),
                 'speaker': None  # Will be filled by diarization
             }
+            words = [
+                {'word': word['word'], 'start': round(word['start'], 3), 'end': round(word['end'], 3)}
+                for word in segment.get('words') or []
+            ]
+            if words:
+                processed_segment['words'] = words
             processed_segments.append(processed_segment)
         
         return processed_segments 
\ No newline at end of file
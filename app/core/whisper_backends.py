@@ -0,0 +1,150 @@
+"""
+Inference backends behind WhisperTranscriber.
+
+- "reference": openai-whisper as is (fp32 on CPU, fp16 on GPU)
+- "int8": the same openai-whisper model with its Linear layers dynamically
+  quantized to int8 by torch (CPU only); no extra dependency
+- "ctranslate2": faster-whisper on CTranslate2, with the compute type from
+  FASTER_WHISPER_COMPUTE_TYPE; requires the optional faster-whisper package
+
+Every backend returns results in the format of whisper.transcribe, so the
+rest of the pipeline does not depend on the one in use.
+"""
+import os
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import torch
+import whisper
+
+from app.core.config import FASTER_WHISPER_COMPUTE_TYPE, FASTER_WHISPER_DEVICE
+
+class ReferenceBackend:
+    """
+    Plain openai-whisper model.
+    """
+    name = "reference"
+    # Exposes a torch Whisper model usable by whisper.decode for micro-batching
+    supports_batch = True
+
+    def __init__(self, model_size: str, num_threads: Optional[int] = None):
+        self.model = self._load(model_size)
+
+    def _load(self, model_size: str):
+        return whisper.load_model(model_size)
+
+    def transcribe(self, audio: Union[str, np.ndarray], **options: Any) -> Dict[str, Any]:
+        return self.model.transcribe(audio, **options)
+
+def _state_bytes(model: torch.nn.Module) -> int:
+    # Quantized weights live in packed params, which model.parameters() skips
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+class Int8Backend(ReferenceBackend):
+    """
+    openai-whisper with int8 weights in every Linear layer (attention
+    projections and MLPs, which hold most of the parameters); activations are
+    quantized on the fly. Embeddings, convolutions and layer norms stay fp32.
+    """
+    name = "int8"
+
+    def __init__(self, model_size: str, num_threads: Optional[int] = None):
+        super().__init__(model_size, num_threads)
+        self.estimated_bytes = _state_bytes(self.model)
+
+    def _load(self, model_size: str):
+        model = whisper.load_model(model_size, device="cpu")
+        # whisper.model.Linear only casts the weight to the input dtype, which
+        # is a no-op in fp32; quantize_dynamic swaps exact nn.Linear types only
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def transcribe(self, audio: Union[str, np.ndarray], **options: Any) -> Dict[str, Any]:
+        options.setdefault("fp16", False)
+        return self.model.transcribe(audio, **options)
+
+class CTranslate2Backend:
+    """
+    faster-whisper (CTranslate2) model, converted from the same checkpoints.
+    """
+    name = "ctranslate2"
+    # No torch model to run through whisper.decode
+    supports_batch = False
+
+    def __init__(self, model_size: str, num_threads: Optional[int] = None):
+        try:
+            from faster_whisper import WhisperModel
+            from faster_whisper.utils import download_model
+        except ImportError as e:
+            raise ImportError("The ctranslate2 backend requires the faster-whisper package") from e
+
+        model_path = download_model(model_size)
+        self.model = WhisperModel(
+            model_path,
+            device=FASTER_WHISPER_DEVICE,
+            compute_type=FASTER_WHISPER_COMPUTE_TYPE,
+            cpu_threads=num_threads or 0
+        )
+        # Not a torch module: use the converted weights on disk as the estimate
+        self.estimated_bytes = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(model_path) for name in names
+        )
+
+    def transcribe(self, audio: Union[str, np.ndarray], **options: Any) -> Dict[str, Any]:
+        # Options specific to openai-whisper
+        options.pop("verbose", None)
+        options.pop("fp16", None)
+
+        segments, info = self.model.transcribe(audio, **options)
+        results = []
+        for index, segment in enumerate(segments):
+            result = {
+                'id': index,
+                'seek': segment.seek,
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text,
+                'tokens': list(segment.tokens),
+                'temperature': getattr(segment, 'temperature', 0.0),
+                'avg_logprob': segment.avg_logprob,
+                'compression_ratio': segment.compression_ratio,
+                'no_speech_prob': segment.no_speech_prob
+            }
+            if segment.words is not None:
+                result['words'] = [
+                    {'word': word.word, 'start': word.start, 'end': word.end, 'probability': word.probability}
+                    for word in segment.words
+                ]
+            results.append(result)
+
+        return {
+            'text': "".join(segment['text'] for segment in results),
+            'segments': results,
+            'language': info.language
+        }
+
+BACKENDS = {backend.name: backend for backend in (ReferenceBackend, Int8Backend, CTranslate2Backend)}
+
+def create_backend(name: str, model_size: str, num_threads: Optional[int] = None):
+    """
+    Load a Whisper model with the named backend.
+
+    Args:
+        name: One of BACKENDS
+        model_size: Whisper model size (tiny, base, small, medium, large)
+        num_threads: CPU threads for backends that take them at load time
+
+    Returns:
+        Backend instance exposing transcribe(audio, **options)
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown Whisper backend: {name}")
+    return BACKENDS[name](model_size, num_threads)
@@ -8,13 +8,16 @@ from dotenv import load_dotenv
 
 from app.models.schema import Base
 from app.api.transcribe import router as transcribe_router
-from app.core.database import engine
+from app.api.speakers import router as speakers_router
+from app.api.search import router as search_router
+from app.api.metrics import router as metrics_router
+from app.core.database import async_engine, engine, migrate
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
 # Cria as tabelas do banco de dados
-Base.metadata.create_all(bind=engine)
+migrate(Base.metadata)
 
 # Aplicação FastAPI
 app = FastAPI(
@@ -34,6 +37,14 @@ app.add_middleware(
 
 # Inclui os roteadores
 app.include_router(transcribe_router, prefix="/api", tags=["transcription"])
+app.include_router(speakers_router, prefix="/api", tags=["speakers"])
+app.include_router(search_router, prefix="/api", tags=["search"])
+app.include_router(metrics_router, tags=["metrics"])
+
+@app.on_event("shutdown")
+async def close_database():
+    await async_engine.dispose()
+    engine.dispose()
 
 @app.get("/")
 async def root():
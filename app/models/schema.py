@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Text, Index, LargeBinary, Float, Boolean, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from pydantic import BaseModel
+from typing import Dict, List, Optional
 
 Base = declarative_base()
 
@@ -15,19 +16,104 @@ class Transcription(Base):
     transcript_filename = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="pending")
+    model_size = Column(String)  # tamanho do modelo Whisper usado
+    whisper_backend = Column(String)  # backend de inferência do Whisper (reference, int8, ctranslate2)
+    content_hash = Column(String)  # SHA-256 do vídeo enviado
+    language = Column(String)
+    diarization_model = Column(String)
+    word_timestamps = Column(Boolean)  # segmentos com tempos por palavra (WHISPER_WORD_TIMESTAMPS)
     segments = relationship("TranscriptionSegment", back_populates="transcription")
 
+    __table_args__ = (
+        # Chave do cache de resultados
+        Index("ix_transcriptions_cache_key", "content_hash", "model_size", "language", "diarization_model"),
+        # Paginação por cursor da listagem, com e sem filtro de status
+        Index("ix_transcriptions_created_at_id", "created_at", "id"),
+        Index("ix_transcriptions_status_created_at_id", "status", "created_at", "id"),
+    )
+
 class TranscriptionSegment(Base):
     __tablename__ = "transcription_segments"
 
     id = Column(Integer, primary_key=True, index=True)
     transcription_id = Column(Integer, ForeignKey("transcriptions.id"))
-    start_time = Column(Integer)  # em segundos
-    end_time = Column(Integer)    # em segundos
+    start_time = Column(Float)  # em segundos
+    end_time = Column(Float)    # em segundos
     speaker = Column(String)
     text = Column(Text)
+    words = Column(Text)  # palavras com tempos em ms (app.core.segment_store.encode_words)
     transcription = relationship("Transcription", back_populates="segments")
 
+    __table_args__ = (
+        # Leitura por janela de tempo e exportação em ordem
+        Index("ix_transcription_segments_transcription_id_start_time", "transcription_id", "start_time"),
+    )
+
+class TranscriptionSegmentBlob(Base):
+    __tablename__ = "transcription_segment_blobs"
+
+    # Todos os segmentos de uma transcrição em formato colunar (ver app.core.segment_store)
+    transcription_id = Column(Integer, ForeignKey("transcriptions.id"), primary_key=True)
+    segment_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Speaker(Base):
+    __tablename__ = "speakers"
+
+    # Identidade cadastrada, reconhecida em novas gravações pela voz
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SpeakerEmbedding(Base):
+    __tablename__ = "speaker_embeddings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    transcription_id = Column(Integer, ForeignKey("transcriptions.id"), index=True)
+    label = Column(String)  # rótulo da diarização na transcrição (ex.: SPEAKER_00)
+    speaker_id = Column(Integer, ForeignKey("speakers.id"), index=True)  # identidade reconhecida ou cadastrada
+    enrolled = Column(Boolean, default=False, nullable=False)  # faz parte do índice de identidades
+    score = Column(Float)  # similaridade de cosseno com a identidade reconhecida
+    model = Column(String, nullable=False)  # modelo de embeddings (só vetores do mesmo modelo são comparáveis)
+    dim = Column(Integer, nullable=False)
+    speech_seconds = Column(Float)
+    vector = Column(LargeBinary, nullable=False)  # float32, norma 1
+    created_at = Column(DateTime, default=datetime.utcnow)
+    speaker = relationship("Speaker")
+
+    __table_args__ = (
+        Index("ix_speaker_embeddings_enrolled_model", "enrolled", "model"),
+    )
+
+class TranscriptionJob(Base):
+    __tablename__ = "transcription_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    transcription_id = Column(Integer, ForeignKey("transcriptions.id"), nullable=False, index=True)
+    video_path = Column(String, nullable=False)
+    status = Column(String, default="queued", nullable=False)  # queued, running, completed, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # adiado em caso de retry
+    locked_by = Column(String)
+    heartbeat_at = Column(DateTime)
+    last_error = Column(Text)
+    metrics = Column(JSON)  # duração das etapas, fator de tempo real e pico de RSS do processamento
+    checkpoints = Column(JSON)  # artefatos das etapas concluídas (app.core.checkpoints)
+    tenant_id = Column(String)  # inquilino do upload (cabeçalho X-Tenant-Id)
+    priority = Column(String)  # interactive, standard ou batch (app.core.scheduler)
+    media_seconds = Column(Float)  # duração medida na ingestão
+    cost_seconds = Column(Float)  # estimativa de tempo de processamento
+    memory_bytes = Column(BigInteger)  # estimativa de memória de pico
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_transcription_jobs_status_available_at", "status", "available_at"),
+        Index("ix_transcription_jobs_status_tenant_id", "status", "tenant_id"),
+    )
+
 # Modelos Pydantic para API
 class TranscriptionCreate(BaseModel):
     video_filename: str
@@ -39,17 +125,68 @@ class TranscriptionResponse(BaseModel):
     transcript_filename: str
     created_at: datetime
     status: str
+    model_size: Optional[str] = None
+    whisper_backend: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class TranscriptionMetricsResponse(BaseModel):
+    transcription_id: int
+    job_id: int
+    attempts: int
+    stages: Dict[str, float]
+    total_seconds: float
+    audio_seconds: Optional[float] = None
+    real_time_factor: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    model_size: Optional[str] = None
+    backend: Optional[str] = None
+    resumed_stages: List[str] = []
+
+class WordTimestamp(BaseModel):
+    word: str
+    start: float
+    end: float
+
 class TranscriptionSegmentResponse(BaseModel):
     id: int
     transcription_id: int
-    start_time: int
-    end_time: int
+    start_time: float
+    end_time: float
     speaker: str
     text: str
+    words: Optional[List[WordTimestamp]] = None  # apenas com ?words=true
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class SpeakerEnroll(BaseModel):
+    name: str
+    transcription_id: int
+    label: str  # rótulo da diarização (ex.: SPEAKER_00)
+
+class SpeakerResponse(BaseModel):
+    id: int
+    name: str
+    created_at: datetime
+    embeddings: int = 0
+
+    class Config:
+        from_attributes = True
+
+class TranscriptionSpeakerResponse(BaseModel):
+    label: str
+    speaker_id: Optional[int] = None
+    name: Optional[str] = None
+    score: Optional[float] = None
+    speech_seconds: Optional[float] = None
+
+class SearchHit(BaseModel):
+    transcription_id: int
+    segment_id: int
+    start_time: float
+    end_time: float
+    speaker: Optional[str] = None
+    snippet: str  # texto do segmento com os termos encontrados entre <mark> e </mark>
+    rank: float
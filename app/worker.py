@@ -0,0 +1,200 @@
+"""
+Pool de workers de transcrição.
+
+Cada processo mantém seu próprio registro de modelos (pré-carregando
+WARM_MODELS) e consome jobs da fila persistente (tabela transcription_jobs). Uso:
+
+    python -m app.worker
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from app.core.artifacts import collect_garbage
+from app.core.config import (
+    WORKER_PROCESSES, WORKER_POLL_SECONDS, WORKER_JOB_CONCURRENCY, JOB_HEARTBEAT_SECONDS,
+    WHISPER_MODEL_SIZE, WHISPER_BACKEND, WARM_MODELS
+)
+from app.core.database import SessionLocal, engine, migrate
+from app.core.events import publish_event
+from app.core.metrics import count_job, observe_queue_wait, process_exited, reset_peak_rss, span
+from app.core.jobs import (
+    claim_job, complete_job, fail_job, heartbeat, requeue_stale_jobs, protected_digests
+)
+from app.models.schema import Base, Transcription
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s %(processName)s %(levelname)s %(message)s"
+
+def _heartbeat_loop(job_id: int, worker_id: str, stop: threading.Event) -> None:
+    """
+    Mantém o heartbeat do job enquanto ele é processado, com sessão própria.
+    """
+    db = SessionLocal()
+    try:
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                heartbeat(db, job_id, worker_id)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Falha ao renovar heartbeat do job %s: %s", job_id, e)
+    finally:
+        db.close()
+
+def run_job(db, job, worker_id: str) -> None:
+    """
+    Processa um job reservado, registrando sucesso ou falha na fila.
+    """
+    from app.core.model_registry import registry
+    from app.core.pipeline import process_transcription
+
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat_loop, args=(job.id, worker_id, stop), daemon=True)
+    beat.start()
+    try:
+        transcription = db.get(Transcription, job.transcription_id)
+        model_size = (transcription.model_size if transcription else None) or WHISPER_MODEL_SIZE
+        backend = (transcription.whisper_backend if transcription else None) or WHISPER_BACKEND
+        transcriber = registry.get_transcriber(model_size, backend)
+        diarizer = registry.get_diarizer()
+        # Com um job por processo o pico de RSS medido é o deste job
+        if WORKER_JOB_CONCURRENCY == 1:
+            reset_peak_rss()
+        with span("transcription_job", job_id=job.id, transcription_id=job.transcription_id, attempt=job.attempts):
+            metrics = process_transcription(
+                db, job.transcription_id, job.video_path, transcriber, diarizer, job=job
+            )
+        complete_job(db, job, metrics)
+        count_job("completed")
+    except Exception as e:
+        db.rollback()
+        logger.exception("Job %s falhou (tentativa %s/%s)", job.id, job.attempts, job.max_attempts)
+        retry = fail_job(db, job, str(e))
+        count_job("retried" if retry else "failed")
+        transcription = db.get(Transcription, job.transcription_id)
+        if transcription:
+            transcription.status = "queued" if retry else "failed"
+            db.commit()
+        publish_event(job.transcription_id, "job", "queued" if retry else "failed", error=str(e))
+    finally:
+        stop.set()
+        beat.join()
+
+    # Arquiva o áudio consumido e mantém o armazenamento dentro das cotas,
+    # preservando os artefatos dos jobs pendentes e as transcrições registradas
+    try:
+        freed = collect_garbage(protected_digests(db))
+        if freed:
+            logger.info("%.1f MB liberados no armazenamento", freed / 1024 ** 2)
+    except Exception:
+        db.rollback()
+        logger.exception("Erro na manutenção do armazenamento")
+
+def _job_loop(worker_id: str, shutdown: multiprocessing.Event) -> None:
+    """
+    Reserva e processa jobs em sequência até o encerramento, com sessão própria.
+    """
+    db = SessionLocal()
+    try:
+        while not shutdown.is_set():
+            try:
+                job = claim_job(db, worker_id)
+            except Exception:
+                db.rollback()
+                logger.exception("Erro ao buscar job na fila")
+                job = None
+
+            if job is None:
+                shutdown.wait(WORKER_POLL_SECONDS)
+                continue
+
+            observe_queue_wait(job.priority or "standard", (job.heartbeat_at - job.available_at).total_seconds())
+            logger.info("Worker %s processando job %s", worker_id, job.id)
+            run_job(db, job, worker_id)
+    finally:
+        db.close()
+
+def worker_loop(worker_index: int, shutdown: multiprocessing.Event) -> None:
+    """
+    Laço principal de um processo worker.
+
+    Com WORKER_JOB_CONCURRENCY > 1 o processo atende vários jobs em threads que
+    compartilham os mesmos modelos, o que permite agrupar clipes curtos de jobs
+    diferentes em um único lote do Whisper (WHISPER_BATCH_SIZE).
+    """
+    # O supervisor trata os sinais; o worker termina o job atual e sai
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    from app.core.model_registry import configure_torch_threads, registry
+
+    configure_torch_threads()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_index}"
+    registry.warm(WARM_MODELS)
+    logger.info("Worker %s pronto com modelos %s", worker_id, registry.loaded())
+
+    threads = [
+        threading.Thread(target=_job_loop, args=(f"{worker_id}:{slot}", shutdown), name=f"job-{slot}")
+        for slot in range(WORKER_JOB_CONCURRENCY)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def main() -> None:
+    """
+    Inicia o supervisor: recupera jobs órfãos, sobe os workers e os reinicia se morrerem.
+    """
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    migrate(Base.metadata)
+
+    # "spawn" evita herdar o estado do torch/conexões do processo pai
+    context = multiprocessing.get_context("spawn")
+    shutdown = context.Event()
+
+    def _stop(signum, frame):
+        logger.info("Encerrando workers após os jobs em andamento...")
+        shutdown.set()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    def _start(index: int):
+        process = context.Process(target=worker_loop, args=(index, shutdown), name=f"worker-{index}")
+        process.start()
+        return process
+
+    engine.dispose()  # as conexões não devem atravessar o fork/spawn
+    workers = {index: _start(index) for index in range(WORKER_PROCESSES)}
+
+    db = SessionLocal()
+    try:
+        while not shutdown.is_set():
+            try:
+                requeued = requeue_stale_jobs(db)
+                if requeued:
+                    logger.warning("%s job(s) órfão(s) devolvido(s) à fila", requeued)
+            except Exception:
+                db.rollback()
+                logger.exception("Erro ao recuperar jobs órfãos")
+
+            for index, process in list(workers.items()):
+                if not process.is_alive():
+                    logger.error("Worker %s terminou com código %s; reiniciando", index, process.exitcode)
+                    process_exited(process.pid)
+                    workers[index] = _start(index)
+
+            shutdown.wait(JOB_HEARTBEAT_SECONDS)
+    finally:
+        db.close()
+        for process in workers.values():
+            process.join()
+
+if __name__ == "__main__":
+    main()
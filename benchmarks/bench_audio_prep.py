@@ -0,0 +1,98 @@
+"""
+Compara a preparação de áudio em passagem única (prepare_audio) com a cadeia
+antiga extract_audio_from_video -> convert_to_mono -> normalize_audio.
+
+Cada variante roda em um processo filho para que o pico de RSS medido inclua
+apenas o trabalho dela (e os subprocessos ffmpeg que ela dispara).
+
+Uso:
+    python -m benchmarks.bench_audio_prep caminho/para/video.mp4 [--repeat 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+VARIANTS = ("legacy", "single_pass")
+
+def _run_variant(variant: str, video_path: str, output_dir: str) -> None:
+    from app.core.audio_utils import (
+        prepare_audio, extract_audio_from_video, convert_to_mono, normalize_audio
+    )
+
+    if variant == "legacy":
+        audio_filename = extract_audio_from_video(video_path, output_dir)
+        mono_path = convert_to_mono(os.path.join(output_dir, audio_filename))
+        normalize_audio(mono_path)
+    else:
+        prepare_audio(video_path, output_dir)
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def measure(variant: str, video_path: str) -> dict:
+    """
+    Executa uma variante em um processo filho e coleta tempo, pico de RSS e bytes gravados.
+    """
+    output_dir = tempfile.mkdtemp(prefix=f"bench_{variant}_")
+    try:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_audio_prep", "--child", variant, video_path, output_dir]
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.perf_counter() - start
+        if process.returncode != 0:
+            raise RuntimeError(f"Variante '{variant}' falhou com código {process.returncode}")
+
+        return {
+            "variant": variant,
+            "wall_time_s": round(elapsed, 3),
+            # ru_maxrss está em KiB no Linux
+            "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+            "bytes_written": _directory_size(output_dir),
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video_path", nargs="?")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    parser.add_argument("--child", nargs=3, metavar=("VARIANT", "VIDEO", "OUTPUT_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_variant(*args.child)
+        return
+
+    if not args.video_path:
+        parser.error("informe o caminho do vídeo")
+
+    results = []
+    for variant in VARIANTS:
+        runs = [measure(variant, args.video_path) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["wall_time_s"])
+        results.append({**best, "runs": runs})
+        print(
+            f"{variant:12s} tempo={best['wall_time_s']:8.2f}s "
+            f"rss={best['peak_rss_mb']:8.1f}MB "
+            f"gravado={best['bytes_written'] / 1024 ** 2:8.1f}MB"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
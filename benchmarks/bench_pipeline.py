@@ -0,0 +1,468 @@
+"""
+Benchmark de ponta a ponta do pipeline com mídia sintética (benchmarks.fixtures).
+
+Para cada duração de --durations é gerada (ou reaproveitada) uma conversa com
+--speakers interlocutores, e são medidos:
+
+- pipeline: process_transcription completo, uma execução por processo filho
+  com banco SQLite e armazenamento temporários. Reporta os percentis do tempo
+  total, o tempo de cada etapa, o fator de tempo real, a vazão (segundos de
+  áudio por segundo), o pico de RSS e os bytes gravados em disco.
+- funções: as etapas de app.core isoladamente (leitura do áudio, VAD e
+  divisão em blocos, atribuição de interlocutores, gravação e leitura dos
+  segmentos, exportação), repetidas --function-repeat vezes, com percentis de
+  latência e o pico de memória alocada (tracemalloc).
+
+Por padrão os modelos são simulados: o transcritor devolve o roteiro da
+fixture e o diarizador os turnos dela, instantaneamente, então o resultado
+mede o custo do pipeline em si. --transcriber tiny (ou outro tamanho do
+Whisper) e --diarizer pyannote usam os modelos reais.
+
+Sem o ffmpeg a etapa audio_prep é pulada (o WAV da fixture já está no formato
+final) e o vídeo não é gerado.
+
+O JSON de --output inclui o commit e a máquina; --baseline compara a
+execução atual com um JSON anterior.
+
+Uso:
+    python -m benchmarks.bench_pipeline [--durations 30,300,1800,7200] [--speakers 3]
+        [--transcriber stub|tiny|base] [--diarizer stub|pyannote] [--repeat 3]
+        [--output resultados.json] [--baseline anterior.json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fixtures import load_script, write_fixture
+
+STUB = "stub"
+STUB_EMBEDDING_DIM = 192
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _percentiles(values: List[float], digits: int = 3) -> Dict[str, float]:
+    return {
+        "p50": round(float(np.percentile(values, 50)), digits),
+        "p95": round(float(np.percentile(values, 95)), digits),
+        "p99": round(float(np.percentile(values, 99)), digits),
+        "max": round(float(np.max(values)), digits),
+    }
+
+def _stub_transcriber(script: Dict[str, Any]):
+    from app.core.config import AUDIO_SAMPLE_RATE
+    from app.core.transcription import WhisperTranscriber
+    from app.core.whisper_backends import BACKENDS
+
+    class ScriptedBackend:
+        """
+        Devolve o roteiro da fixture no formato do whisper.transcribe.
+        """
+        name = STUB
+        supports_batch = False
+
+        def __init__(self, model_size: str, num_threads: Optional[int] = None):
+            self.model = None
+
+        def transcribe(self, audio, **options):
+            duration = len(audio) / AUDIO_SAMPLE_RATE
+            segments = [segment for segment in script["segments"] if segment["start"] < duration]
+            return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "pt"}
+
+    BACKENDS[STUB] = ScriptedBackend
+    return WhisperTranscriber(STUB, backend=STUB)
+
+def _stub_diarizer(script: Dict[str, Any]):
+    from app.core.config import AUDIO_SAMPLE_RATE
+    from app.core.diarization import SpeakerDiarizer
+
+    class ScriptedDiarizer(SpeakerDiarizer):
+        """
+        Devolve os turnos da fixture e um embedding aleatório fixo por interlocutor.
+        """
+        model_name = embedding_model = f"bench/{STUB}"
+
+        def __init__(self):
+            pass
+
+        def diarize_audio(self, audio, progress=None, return_embeddings=False):
+            duration = len(audio) / AUDIO_SAMPLE_RATE
+            turns = [dict(turn) for turn in script["turns"] if turn["start_time"] < duration]
+            if not return_embeddings:
+                return turns
+            rng = np.random.default_rng(0)
+            embeddings = {}
+            for label in sorted({turn["speaker"] for turn in turns}):
+                vector = rng.normal(size=STUB_EMBEDDING_DIM).astype(np.float32)
+                embeddings[label] = vector / np.linalg.norm(vector)
+            return turns, embeddings
+
+    return ScriptedDiarizer()
+
+def _run_child(params_path: str) -> None:
+    """
+    Processa uma fixture com o pipeline real, no processo filho.
+    """
+    from app.core.config import FFMPEG_BINARY, WHISPER_NUM_THREADS
+    from app.core.database import SessionLocal, migrate
+    from app.core.metrics import reset_peak_rss
+    from app.core.model_registry import configure_torch_threads
+    from app.core.pipeline import process_transcription
+    from app.core.storage import store
+    from app.models.schema import Base, Transcription, TranscriptionSegment
+
+    with open(params_path, encoding="utf-8") as f:
+        params = json.load(f)
+    fixture = params["fixture"]
+    script = load_script(fixture["script_path"])
+
+    migrate(Base.metadata)
+
+    media_path = fixture["video_path"] or fixture["audio_path"]
+    content_hash = _sha256(media_path)
+    if not shutil.which(FFMPEG_BINARY):
+        # O WAV da fixture já está no formato de prepare_audio
+        tmp_path = store.temp_path(".wav")
+        shutil.copyfile(fixture["audio_path"], tmp_path)
+        store.put(tmp_path, content_hash, ".wav")
+
+    configure_torch_threads()
+    start = time.perf_counter()
+    if params["transcriber"] == STUB:
+        transcriber = _stub_transcriber(script)
+    else:
+        from app.core.transcription import WhisperTranscriber
+        transcriber = WhisperTranscriber(params["transcriber"], WHISPER_NUM_THREADS, backend=params["backend"])
+    if params["diarizer"] == STUB:
+        diarizer = _stub_diarizer(script)
+    else:
+        from app.core.diarization import SpeakerDiarizer
+        diarizer = SpeakerDiarizer()
+    load_seconds = time.perf_counter() - start
+
+    db = SessionLocal()
+    transcription = Transcription(
+        video_filename=os.path.basename(media_path), audio_filename="", transcript_filename="",
+        status="queued", content_hash=content_hash, model_size=transcriber.model_size,
+        whisper_backend=transcriber.backend_name
+    )
+    db.add(transcription)
+    db.commit()
+
+    bytes_before = _directory_size(params["work_dir"])
+    reset_peak_rss()
+    start = time.perf_counter()
+    metrics = process_transcription(db, transcription.id, media_path, transcriber, diarizer)
+    wall_seconds = time.perf_counter() - start
+    db.expire_all()
+    segments = db.query(TranscriptionSegment).filter(TranscriptionSegment.transcription_id == transcription.id).count()
+    db.close()
+    transcriber.close()
+
+    with open(params["output"], "w", encoding="utf-8") as f:
+        json.dump({
+            **metrics,
+            "load_seconds": load_seconds,
+            "wall_seconds": wall_seconds,
+            "segments": segments,
+            "bytes_written": _directory_size(params["work_dir"]) - bytes_before,
+        }, f)
+
+def run_pipeline(fixture: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Executa o pipeline em um processo filho com banco e armazenamento próprios.
+    """
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        params_path = os.path.join(work_dir, "params.json")
+        output_path = os.path.join(work_dir, "result.json")
+        with open(params_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "fixture": fixture, "transcriber": args.transcriber, "diarizer": args.diarizer,
+                "backend": args.backend, "work_dir": work_dir, "output": output_path,
+            }, f)
+
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+            STORE_DIR=os.path.join(work_dir, "store"),
+            VIDEOS_DIR=os.path.join(work_dir, "videos"),
+            TRANSCRIPTS_DIR=os.path.join(work_dir, "transcripts"),
+            EVENTS_BACKEND="memory",
+        )
+        if args.transcriber == STUB:
+            # O roteiro cobre o áudio inteiro; a divisão em blocos só faz sentido com o modelo real
+            env["LONGFORM_MIN_SECONDS"] = "0"
+
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", params_path],
+            env=env, stdout=subprocess.DEVNULL
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        returncode = os.waitstatus_to_exitcode(status)
+        if returncode != 0:
+            raise RuntimeError(f"Pipeline falhou com código {returncode} para {fixture['name']}")
+
+        with open(output_path, encoding="utf-8") as f:
+            result = json.load(f)
+        # ru_maxrss está em KiB no Linux
+        result["process_peak_rss_bytes"] = usage.ru_maxrss * 1024
+        result["process_seconds"] = elapsed
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def summarize_pipeline(fixture: Dict[str, Any], runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = [run["total_seconds"] for run in runs]
+    stages = sorted({stage for run in runs for stage in run["stages"]})
+    return {
+        "fixture": fixture["name"],
+        "audio_seconds": fixture["duration"],
+        "runs": len(runs),
+        "total_seconds": _percentiles(totals),
+        "stage_seconds_p50": {
+            stage: round(float(np.median([run["stages"][stage] for run in runs if stage in run["stages"]])), 3)
+            for stage in stages
+        },
+        "real_time_factor_p50": round(float(np.median([run["real_time_factor"] for run in runs])), 4),
+        "throughput_audio_s_per_s": round(fixture["duration"] / float(np.median(totals)), 2),
+        "load_seconds_p50": round(float(np.median([run["load_seconds"] for run in runs])), 3),
+        "peak_rss_bytes": max(run["peak_rss_bytes"] for run in runs),
+        "process_peak_rss_bytes": max(run["process_peak_rss_bytes"] for run in runs),
+        "bytes_written": int(np.median([run["bytes_written"] for run in runs])),
+        "segments": runs[0]["segments"],
+    }
+
+def function_cases(fixture: Dict[str, Any], work_dir: str) -> Dict[str, Callable[[], Any]]:
+    """
+    Etapas de app.core isoladas, sobre os dados da fixture.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.audio_utils import detect_speech_regions, load_audio, plan_chunks, prepare_audio
+    from app.core.config import FFMPEG_BINARY, LONGFORM_CHUNK_SECONDS, LONGFORM_OVERLAP_SECONDS
+    from app.core.export import export_segments
+    from app.core.search import ensure_search_index
+    from app.core.segment_store import decode_segments, encode_segments, load_segments, save_segments
+    from app.core.speaker_assignment import assign_speakers, split_by_speaker
+    from app.models.schema import Base, Transcription
+
+    script = load_script(fixture["script_path"])
+    waveform = load_audio(fixture["audio_path"])
+    regions = detect_speech_regions(waveform)
+    turns = script["turns"]
+    segments = [
+        {'start_time': s['start'], 'end_time': s['end'], 'text': s['text'].strip(), 'speaker': None, 'words': s['words']}
+        for s in script["segments"]
+    ]
+    labelled = assign_speakers([dict(segment) for segment in segments], turns)
+    blob = encode_segments(labelled)
+
+    engine = create_engine(f"sqlite:///{os.path.join(work_dir, 'functions.db')}")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        transcription = Transcription(
+            video_filename="bench.wav", audio_filename="bench.wav", transcript_filename="bench.json", status="completed"
+        )
+        db.add(transcription)
+        db.commit()
+        transcription_id = transcription.id
+
+    def save():
+        with Session() as db:
+            save_segments(db, transcription_id, labelled)
+            db.commit()
+
+    def load():
+        with Session() as db:
+            return load_segments(db, transcription_id)
+
+    cases = {
+        "load_audio": lambda: load_audio(fixture["audio_path"]),
+        "detect_speech_regions": lambda: detect_speech_regions(waveform),
+        "plan_chunks": lambda: plan_chunks(regions, LONGFORM_CHUNK_SECONDS, LONGFORM_OVERLAP_SECONDS),
+        "assign_speakers": lambda: assign_speakers([dict(segment) for segment in segments], turns),
+        "split_by_speaker": lambda: split_by_speaker([dict(segment) for segment in segments], turns),
+        "encode_segments": lambda: encode_segments(labelled),
+        "decode_segments": lambda: decode_segments(blob),
+        "save_segments": save,
+        "load_segments": load,
+        "export_srt": lambda: sum(len(chunk) for chunk in export_segments(labelled, "srt")),
+    }
+    if shutil.which(FFMPEG_BINARY):
+        media_path = fixture["video_path"] or fixture["audio_path"]
+        prepare_dir = os.path.join(work_dir, "prepare")
+
+        def prepare():
+            os.makedirs(prepare_dir, exist_ok=True)
+            prepare_audio(media_path, prepare_dir)
+            shutil.rmtree(prepare_dir)
+
+        cases = {"prepare_audio": prepare, **cases}
+    return cases
+
+def measure_function(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Percentis de latência (ms) e pico de alocação de uma função.
+    """
+    func()  # aquecimento
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Execução separada: o tracemalloc deixa as alocações bem mais lentas
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"latency_ms": _percentiles(latencies, 2), "peak_alloc_bytes": peak}
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """
+    Imprime a razão atual/anterior das medianas (< 1 é mais rápido).
+    """
+    def medians(data):
+        values = {}
+        for entry in data.get("pipeline", []):
+            values[("pipeline", entry["fixture"], "total")] = entry["total_seconds"]["p50"]
+            for stage, seconds in entry["stage_seconds_p50"].items():
+                values[("pipeline", entry["fixture"], stage)] = seconds
+        for entry in data.get("functions", []):
+            values[("função", entry["fixture"], entry["name"])] = entry["latency_ms"]["p50"]
+        return values
+
+    current, previous = medians(results), medians(baseline)
+    print(f"\ncomparação com {baseline.get('meta', {}).get('commit') or 'a referência'}:")
+    for key in sorted(current.keys() & previous.keys()):
+        if previous[key] > 0:
+            print(f"{key[0]:8s} {key[1]:28s} {key[2]:24s} {previous[key]:10.3f} -> {current[key]:10.3f} "
+                  f"({current[key] / previous[key]:5.2f}x)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", default="30,300,1800,7200", help="Durações das fixtures, em segundos")
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "transcriber_bench_fixtures"),
+                        help="Pasta das fixtures, reaproveitadas entre execuções")
+    parser.add_argument("--transcriber", default=STUB, help="'stub' ou um tamanho do Whisper (ex.: tiny)")
+    parser.add_argument("--backend", default="reference", help="Backend do Whisper com --transcriber real")
+    parser.add_argument("--diarizer", default=STUB, choices=(STUB, "pyannote"))
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções do pipeline por fixture")
+    parser.add_argument("--function-repeat", type=int, default=10, help="Execuções de cada função por fixture")
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--skip-functions", action="store_true")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args.child)
+        return
+
+    durations = [float(value) for value in args.durations.split(",") if value.strip()]
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key != "child"},
+        },
+        "fixtures": [],
+        "pipeline": [],
+        "functions": [],
+    }
+
+    for duration in durations:
+        start = time.perf_counter()
+        fixture = write_fixture(args.fixtures_dir, duration, args.speakers, args.seed, video=not args.skip_pipeline)
+        results["fixtures"].append(fixture)
+        print(f"\n{fixture['name']} ({duration:.0f}s, fixture em {time.perf_counter() - start:.1f}s)")
+
+        if not args.skip_pipeline:
+            runs = [run_pipeline(fixture, args) for _ in range(args.repeat)]
+            summary = summarize_pipeline(fixture, runs)
+            results["pipeline"].append(summary)
+            print(
+                f"  pipeline    p50={summary['total_seconds']['p50']:8.2f}s p95={summary['total_seconds']['p95']:8.2f}s "
+                f"rtf={summary['real_time_factor_p50']:.4f} vazão={summary['throughput_audio_s_per_s']:.1f}x "
+                f"rss={summary['peak_rss_bytes'] / 1024 ** 2:.0f}MB gravado={summary['bytes_written'] / 1024 ** 2:.1f}MB"
+            )
+            for stage, seconds in summary["stage_seconds_p50"].items():
+                print(f"    {stage:24s} {seconds:8.3f}s")
+
+        if not args.skip_functions:
+            work_dir = tempfile.mkdtemp(prefix="bench_functions_")
+            try:
+                for name, func in function_cases(fixture, work_dir).items():
+                    measured = measure_function(func, args.function_repeat)
+                    results["functions"].append({
+                        "fixture": fixture["name"],
+                        "audio_seconds": duration,
+                        "name": name,
+                        **measured,
+                        "throughput_audio_s_per_s": round(duration / (measured["latency_ms"]["p50"] / 1000), 1)
+                        if measured["latency_ms"]["p50"] else None,
+                    })
+                    print(
+                        f"  {name:24s} p50={measured['latency_ms']['p50']:9.2f}ms "
+                        f"p95={measured['latency_ms']['p95']:9.2f}ms "
+                        f"alocado={measured['peak_alloc_bytes'] / 1024 ** 2:8.1f}MB"
+                    )
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
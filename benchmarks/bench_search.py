@@ -0,0 +1,146 @@
+"""
+Mede a latência da busca textual (app.core.search) sobre muitos segmentos.
+
+Grava --segments segmentos sintéticos, com vocabulário em português de
+frequências desiguais (termos raros e comuns), em --transcriptions
+transcrições, e mede a gravação com o índice ativo e os percentis da busca
+para consultas de uma palavra, de duas palavras e de frases.
+
+Por padrão usa um SQLite temporário (FTS5); passe --database-url para medir no
+PostgreSQL (tsvector/GIN). Os dados de teste são removidos ao final.
+
+Uso:
+    python -m benchmarks.bench_search [--segments 1000000] [--database-url URL]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from app.core.search import ensure_search_index, search_segments
+from app.core.segment_store import append_segments
+from app.models.schema import Base, Transcription, TranscriptionSegment
+
+VOCABULARY = (
+    "reunião orçamento projeto cliente contrato entrega prazo equipe relatório análise proposta "
+    "reunião semana próxima cronograma investimento resultado vendas marketing produto lançamento "
+    "treinamento contratação auditoria fornecedor pagamento fatura imposto jurídico diretoria conselho "
+    "estratégia meta trimestre crescimento custo receita margem risco oportunidade parceria tecnologia"
+).split()
+FILLER = "a o de da do que em para com uma um não se na no por mais como foi já está vamos".split()
+
+def synthetic_segments(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Distribuição de Zipf: poucos termos muito comuns e uma cauda de termos raros
+    weights = 1.0 / np.arange(1, len(VOCABULARY) + 1)
+    weights /= weights.sum()
+    lengths = rng.integers(6, 20, count)
+    total = int(lengths.sum())
+    terms = np.where(
+        rng.random(total) < 0.35,
+        rng.choice(len(VOCABULARY), total, p=weights),
+        len(VOCABULARY) + rng.integers(len(FILLER), size=total)
+    )
+    words = np.array(VOCABULARY + FILLER, dtype=object)[terms]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return [
+        {
+            'start_time': i * 3,
+            'end_time': i * 3 + 2,
+            'speaker': f"SPEAKER_{i % 4:02d}",
+            'text': " ".join(words[offsets[i]:offsets[i + 1]]).capitalize() + "."
+        }
+        for i in range(count)
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=1000000)
+    parser.add_argument("--transcriptions", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--database-url")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_search_")
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    Session = sessionmaker(bind=engine)
+
+    created = []
+    results = {}
+    try:
+        per_transcription = max(1, args.segments // args.transcriptions)
+        segments = iter(synthetic_segments(args.segments))
+        start = time.perf_counter()
+        with Session() as db:
+            remaining = args.segments
+            while remaining > 0:
+                transcription = Transcription(
+                    video_filename="bench.mp4", audio_filename="bench.wav", transcript_filename="bench.json",
+                    status="completed"
+                )
+                db.add(transcription)
+                db.flush()
+                created.append(transcription.id)
+                batch = [next(segments) for _ in range(min(per_transcription, remaining))]
+                append_segments(db, transcription.id, batch)
+                remaining -= len(batch)
+            db.commit()
+        results["insert_s"] = round(time.perf_counter() - start, 3)
+        print(f"gravação de {args.segments} segmentos com índice: {results['insert_s']:.2f}s")
+
+        rng = np.random.default_rng(1)
+        query_sets = {
+            "rara": lambda: VOCABULARY[-1 - rng.integers(10)],
+            "comum": lambda: VOCABULARY[rng.integers(3)],
+            "duas_palavras": lambda: " ".join(rng.choice(VOCABULARY, 2, replace=False)),
+            "frase": lambda: f'"{" ".join(rng.choice(VOCABULARY, 2, replace=False))}"',
+        }
+        with Session() as db:
+            for name, make_query in query_sets.items():
+                latencies, hits = [], []
+                for _ in range(args.queries):
+                    query = make_query()
+                    start = time.perf_counter()
+                    found = search_segments(db, query, args.limit)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    hits.append(len(found))
+                results[name] = {
+                    "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                    "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                    "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+                    "mean_hits": round(float(np.mean(hits)), 1),
+                }
+                print(
+                    f"{name:14s} p50={results[name]['p50_ms']:8.2f}ms p95={results[name]['p95_ms']:8.2f}ms "
+                    f"p99={results[name]['p99_ms']:8.2f}ms resultados={results[name]['mean_hits']:.1f}"
+                )
+    finally:
+        with Session() as db:
+            db.execute(delete(TranscriptionSegment).where(TranscriptionSegment.transcription_id.in_(created)))
+            db.execute(delete(Transcription).where(Transcription.id.in_(created)))
+            db.commit()
+        engine.dispose()
+        if tmp_dir:
+            os.remove(os.path.join(tmp_dir, "bench.db"))
+            os.rmdir(tmp_dir)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
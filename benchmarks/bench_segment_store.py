@@ -0,0 +1,125 @@
+"""
+Mede a latência de gravação e leitura dos segmentos de uma transcrição longa.
+
+Compara a gravação antiga (um objeto ORM por segmento com db.add) com a
+gravação em lote de app.core.segment_store, com e sem o blob colunar, e a
+leitura via ORM com a leitura por linhas e pelo blob.
+
+Por padrão usa um SQLite temporário; passe --database-url para medir no
+PostgreSQL (as tabelas são criadas se não existirem e os dados de teste são
+removidos ao final).
+
+Uso:
+    python -m benchmarks.bench_segment_store [--segments 100000] [--database-url URL]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from app.core.segment_store import save_segments, load_segments
+from app.models.schema import Base, Transcription, TranscriptionSegment, TranscriptionSegmentBlob
+
+def synthetic_segments(count: int):
+    speakers = [f"SPEAKER_{k:02d}" for k in range(4)]
+    return [
+        {
+            'start_time': i * 3,
+            'end_time': i * 3 + 2,
+            'speaker': speakers[i % len(speakers)],
+            'text': f"Segmento {i} com um texto de tamanho parecido com o de uma fala real."
+        }
+        for i in range(count)
+    ]
+
+def _new_transcription(db) -> int:
+    transcription = Transcription(
+        video_filename="bench.mp4", audio_filename="bench.wav", transcript_filename="bench.json",
+        status="processing"
+    )
+    db.add(transcription)
+    db.commit()
+    return transcription.id
+
+def _legacy_insert(db, transcription_id, segments) -> None:
+    for segment in segments:
+        db.add(TranscriptionSegment(transcription_id=transcription_id, **segment))
+
+def _legacy_read(db, transcription_id):
+    return db.query(TranscriptionSegment).filter(
+        TranscriptionSegment.transcription_id == transcription_id
+    ).order_by(TranscriptionSegment.start_time).all()
+
+def _timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=100000)
+    parser.add_argument("--database-url")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_segments_")
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    segments = synthetic_segments(args.segments)
+
+    writers = {
+        "orm_add": lambda db, tid: _legacy_insert(db, tid, segments),
+        "bulk": lambda db, tid: save_segments(db, tid, segments, store_blob=False),
+        "bulk_blob": lambda db, tid: save_segments(db, tid, segments, store_blob=True),
+    }
+    readers = {
+        "orm_add": _legacy_read,
+        "bulk": load_segments,
+        "bulk_blob": load_segments,
+    }
+
+    results = []
+    created = []
+    try:
+        for variant, writer in writers.items():
+            with Session() as db:
+                transcription_id = _new_transcription(db)
+                created.append(transcription_id)
+                insert_s = _timed(lambda: (writer(db, transcription_id), db.commit()))
+            with Session() as db:
+                read_s = _timed(readers[variant], db, transcription_id)
+
+            results.append({
+                "variant": variant,
+                "segments": args.segments,
+                "insert_s": round(insert_s, 3),
+                "read_s": round(read_s, 3),
+            })
+            print(f"{variant:10s} gravação={insert_s:8.3f}s leitura={read_s:8.3f}s")
+    finally:
+        with Session() as db:
+            for model in (TranscriptionSegmentBlob, TranscriptionSegment):
+                db.execute(delete(model).where(model.transcription_id.in_(created)))
+            db.execute(delete(Transcription).where(Transcription.id.in_(created)))
+            db.commit()
+        engine.dispose()
+        if tmp_dir:
+            os.remove(os.path.join(tmp_dir, "bench.db"))
+            os.rmdir(tmp_dir)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
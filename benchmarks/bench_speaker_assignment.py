@@ -0,0 +1,136 @@
+"""
+Mede a atribuição de interlocutores (app.core.speaker_assignment) com entradas
+sintéticas e confere o resultado contra a varredura O(N·M) original.
+
+Dois casos: turnos curtos distribuídos pelo arquivo ("uniform") e os mesmos
+turnos mais um turno cobrindo o arquivo inteiro ("long_turn"), que o pyannote
+produz quando um interlocutor fala do início ao fim; sem os intervalos
+elementares, esse turno tornava cada consulta O(M).
+
+A comparação com a versão antiga usa apenas os primeiros --legacy-limit
+segmentos, já que ela leva minutos em 10k×10k. Com --max-seconds o script
+termina com código 1 se a versão vetorizada ficar mais lenta que o limite,
+servindo de guarda contra regressões.
+
+Uso:
+    python -m benchmarks.bench_speaker_assignment [--segments 10000] [--turns 10000]
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from app.core.speaker_assignment import assign_speakers
+
+def synthetic_inputs(n_segments: int, n_turns: int, n_speakers: int = 4, seed: int = 0):
+    """
+    Gera segmentos de transcrição e turnos de diarização cobrindo a mesma duração,
+    com turnos sobrepostos (fala simultânea) e lacunas.
+    """
+    rng = np.random.default_rng(seed)
+    duration = max(n_segments, n_turns) * 3.0
+
+    seg_starts = np.sort(rng.uniform(0, duration, n_segments))
+    seg_ends = seg_starts + rng.uniform(0.5, 8.0, n_segments)
+    segments = [
+        {"start_time": float(s), "end_time": float(e), "text": ""}
+        for s, e in zip(seg_starts, seg_ends)
+    ]
+
+    turn_starts = np.sort(rng.uniform(0, duration, n_turns))
+    turn_ends = turn_starts + rng.uniform(0.2, 6.0, n_turns)
+    speakers = rng.integers(0, n_speakers, n_turns)
+    turns = [
+        {"start_time": float(s), "end_time": float(e), "speaker": f"SPEAKER_{k:02d}"}
+        for s, e, k in zip(turn_starts, turn_ends, speakers)
+    ]
+    return segments, turns
+
+def with_long_turn(turns, duration: float):
+    """
+    Acrescenta um turno de um interlocutor à parte cobrindo [0, duration].
+    """
+    return [{"start_time": 0.0, "end_time": duration, "speaker": "SPEAKER_LONG"}, *turns]
+
+def legacy_assign(transcription_segments, diarization_segments):
+    """
+    Varredura original de SpeakerDiarizer.assign_speakers_to_segments.
+    """
+    for trans_segment in transcription_segments:
+        overlapping_speakers = []
+        for diar_segment in diarization_segments:
+            if (diar_segment['start_time'] <= trans_segment['end_time'] and
+                    diar_segment['end_time'] >= trans_segment['start_time']):
+                overlap_start = max(trans_segment['start_time'], diar_segment['start_time'])
+                overlap_end = min(trans_segment['end_time'], diar_segment['end_time'])
+                overlapping_speakers.append({
+                    'speaker': diar_segment['speaker'],
+                    'duration': overlap_end - overlap_start
+                })
+        if overlapping_speakers:
+            trans_segment['speaker'] = max(overlapping_speakers, key=lambda x: x['duration'])['speaker']
+        else:
+            trans_segment['speaker'] = "unknown"
+    return transcription_segments
+
+def _timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy-limit", type=int, default=1000,
+                        help="Segmentos usados na comparação com a versão antiga (0 desativa)")
+    parser.add_argument("--max-seconds", type=float, help="Falha se a melhor execução passar deste tempo")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    segments, turns = synthetic_inputs(args.segments, args.turns)
+    duration = max(segment["end_time"] for segment in segments + turns)
+    cases = {"uniform": turns, "long_turn": with_long_turn(turns, duration)}
+
+    results = {}
+    for name, case_turns in cases.items():
+        runs = [_timed(assign_speakers, [dict(s) for s in segments], case_turns) for _ in range(args.repeat)]
+        result = {
+            "segments": args.segments,
+            "turns": len(case_turns),
+            "best_s": round(min(runs), 4),
+            "median_s": round(float(np.median(runs)), 4),
+        }
+
+        if args.legacy_limit:
+            sample = segments[:args.legacy_limit]
+            vectorized = assign_speakers([dict(s) for s in sample], case_turns)
+            legacy_segments = [dict(s) for s in sample]
+            result["legacy_sample"] = len(sample)
+            result["legacy_s"] = round(_timed(legacy_assign, legacy_segments, case_turns), 4)
+            mismatches = sum(a['speaker'] != b['speaker'] for a, b in zip(vectorized, legacy_segments))
+            result["mismatches"] = mismatches
+
+        print(
+            f"{name} {args.segments}x{len(case_turns)}: melhor={result['best_s']:.4f}s "
+            f"mediana={result['median_s']:.4f}s"
+            + (f" | antiga ({result['legacy_sample']} segmentos)={result['legacy_s']:.2f}s"
+               f" divergências={result['mismatches']}" if args.legacy_limit else "")
+        )
+        results[name] = result
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    for name, result in results.items():
+        if result.get("mismatches"):
+            sys.exit(f"{name}: resultado diverge da implementação original")
+        if args.max_seconds is not None and result["best_s"] > args.max_seconds:
+            sys.exit(f"{name}: regressão: {result['best_s']:.4f}s > {args.max_seconds:.4f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Mede a busca de identidades no índice de interlocutores (app.core.speaker_index)
+com embeddings sintéticos: várias vozes por identidade cadastrada, ao redor de
+um centro por pessoa, e consultas com ruído.
+
+Reporta o tempo de construção do índice, a latência por interlocutor
+consultado e, para backends aproximados, o recall@1 contra a busca exata.
+
+Uso:
+    python -m benchmarks.bench_speaker_index [--identities 10000] [--per-identity 5]
+        [--backends numpy,faiss] [--output resultados.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.speaker_index import INDEX_BACKENDS
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def synthetic_embeddings(identities: int, per_identity: int, queries: int, dim: int, seed: int = 0):
+    """
+    Gera embeddings cadastrados (com o ID da identidade dona) e consultas de identidades conhecidas.
+    """
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.normal(size=(identities, dim)))
+    owners = np.repeat(np.arange(identities), per_identity)
+    enrolled = _normalize(centers[owners] + rng.normal(scale=0.03, size=(len(owners), dim)))
+    targets = rng.integers(0, identities, queries)
+    probes = _normalize(centers[targets] + rng.normal(scale=0.03, size=(queries, dim)))
+    return enrolled, owners, probes, targets
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--identities", type=int, default=10000)
+    parser.add_argument("--per-identity", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", default="numpy,faiss")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    enrolled, owners, probes, targets = synthetic_embeddings(
+        args.identities, args.per_identity, args.queries, args.dim
+    )
+    ids = np.arange(len(enrolled), dtype=np.int64)
+
+    results = []
+    exact = None
+    for backend in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        try:
+            index = INDEX_BACKENDS[backend](args.dim)
+        except ImportError as e:
+            print(f"{backend:8s} indisponível: {e}")
+            continue
+
+        start = time.perf_counter()
+        index.add(ids, enrolled)
+        build_seconds = time.perf_counter() - start
+
+        # Uma consulta por vez, como na identificação dos interlocutores de uma gravação
+        latencies = []
+        top = np.empty(len(probes), dtype=np.int64)
+        for i, probe in enumerate(probes):
+            start = time.perf_counter()
+            _, found = index.search(probe[None], args.k)
+            latencies.append(time.perf_counter() - start)
+            top[i] = found[0, 0]
+
+        if exact is None:
+            exact = top
+        latencies_ms = np.array(latencies) * 1000
+        result = {
+            "backend": backend,
+            "embeddings": len(enrolled),
+            "build_seconds": round(build_seconds, 3),
+            "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+            "accuracy": round(float(np.mean(owners[top] == targets)), 4),
+            "recall_at_1": round(float(np.mean(top == exact)), 4),
+        }
+        results.append(result)
+        print(
+            f"{backend:8s} construção={result['build_seconds']:7.3f}s "
+            f"p50={result['p50_ms']:7.3f}ms p99={result['p99_ms']:7.3f}ms "
+            f"acerto={result['accuracy']:.3f} recall@1={result['recall_at_1']:.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Compara os backends de inferência do Whisper (reference, int8, ctranslate2)
+em um conjunto local de amostras.
+
+Para cada backend mede o fator de tempo real (tempo de transcrição / duração
+do áudio), o tempo de carga do modelo, o pico de RSS e a taxa de erro de
+palavras (WER) contra o arquivo <amostra>.txt ao lado de cada mídia, quando
+existir. A deriva (drift) é a WER contra a saída do backend reference, e
+mostra o quanto a quantização ou o CTranslate2 alteram o texto.
+
+Cada backend roda em um processo filho, para que o pico de RSS inclua apenas
+o modelo dele.
+
+Uso:
+    python -m benchmarks.bench_whisper_backends pasta/de/amostras [--model-size base]
+        [--backends reference,int8,ctranslate2] [--output resultados.json]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+MEDIA_EXTENSIONS = {".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".mp4", ".mkv", ".webm", ".mov"}
+
+def _run_backend(backend: str, model_size: str, manifest_path: str, output_path: str) -> None:
+    from app.core.audio_utils import load_audio
+    from app.core.config import AUDIO_SAMPLE_RATE, WHISPER_NUM_THREADS
+    from app.core.model_registry import configure_torch_threads
+    from app.core.transcription import WhisperTranscriber
+
+    # Mesmo número de threads para os backends torch e para o CTranslate2
+    configure_torch_threads(WHISPER_NUM_THREADS)
+    with open(manifest_path, encoding="utf-8") as f:
+        samples = json.load(f)
+
+    start = time.perf_counter()
+    transcriber = WhisperTranscriber(model_size, num_threads=WHISPER_NUM_THREADS, backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    results = []
+    for sample in samples:
+        waveform = load_audio(sample["audio_path"])
+        start = time.perf_counter()
+        result = transcriber.transcribe_audio(waveform)
+        results.append({
+            "name": sample["name"],
+            "duration_s": len(waveform) / AUDIO_SAMPLE_RATE,
+            "seconds": time.perf_counter() - start,
+            "text": result["text"],
+        })
+    transcriber.close()
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"load_seconds": load_seconds, "samples": results}, f, ensure_ascii=False)
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    WER = (substituições + inserções + remoções) / palavras da referência.
+    """
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+
+    # Distância de edição entre as sequências de palavras, uma linha por vez
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, start=1):
+        current = [i]
+        for j, other in enumerate(hyp, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / len(ref)
+
+def prepare_samples(sample_dir: str, work_dir: str) -> List[Dict[str, str]]:
+    """
+    Prepara o WAV de 16 kHz de cada mídia da pasta, fora da medição dos backends.
+    """
+    from app.core.audio_utils import prepare_audio
+
+    samples = []
+    for name in sorted(os.listdir(sample_dir)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in MEDIA_EXTENSIONS:
+            continue
+        output_dir = os.path.join(work_dir, stem)
+        os.makedirs(output_dir, exist_ok=True)
+        audio_filename = prepare_audio(os.path.join(sample_dir, name), output_dir)
+
+        sample = {"name": name, "audio_path": os.path.join(output_dir, audio_filename)}
+        reference_path = os.path.join(sample_dir, f"{stem}.txt")
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                sample["reference"] = f.read()
+        samples.append(sample)
+    return samples
+
+def measure(backend: str, model_size: str, manifest_path: str, work_dir: str) -> dict:
+    """
+    Transcreve todas as amostras com um backend em um processo filho.
+    """
+    output_path = os.path.join(work_dir, f"{backend}.json")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_whisper_backends",
+         "--child", backend, model_size, manifest_path, output_path]
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    returncode = os.waitstatus_to_exitcode(status)
+    if returncode != 0:
+        raise RuntimeError(f"Backend '{backend}' falhou com código {returncode}")
+
+    with open(output_path, encoding="utf-8") as f:
+        result = json.load(f)
+    # ru_maxrss está em KiB no Linux
+    result["peak_rss_mb"] = round(usage.ru_maxrss / 1024, 1)
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sample_dir", nargs="?")
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--backends", default="reference,int8,ctranslate2")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    parser.add_argument("--child", nargs=4, metavar=("BACKEND", "MODEL_SIZE", "MANIFEST", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_backend(*args.child)
+        return
+
+    if not args.sample_dir:
+        parser.error("informe a pasta com as amostras")
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    if "reference" in backends:
+        # A saída do reference serve de base para a deriva dos demais
+        backends.remove("reference")
+        backends.insert(0, "reference")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_backends_")
+    try:
+        samples = prepare_samples(args.sample_dir, work_dir)
+        if not samples:
+            parser.error("nenhuma mídia encontrada na pasta")
+        manifest_path = os.path.join(work_dir, "manifest.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(samples, f)
+
+        results = []
+        baseline = {}
+        for backend in backends:
+            try:
+                run = measure(backend, args.model_size, manifest_path, work_dir)
+            except RuntimeError as e:
+                print(f"{backend:12s} {e}")
+                continue
+
+            duration = sum(sample["duration_s"] for sample in run["samples"])
+            seconds = sum(sample["seconds"] for sample in run["samples"])
+            errors, drift = [], []
+            for sample, transcribed in zip(samples, run["samples"]):
+                if "reference" in sample:
+                    errors.append(word_error_rate(sample["reference"], transcribed["text"]))
+                if backend == "reference":
+                    baseline[sample["name"]] = transcribed["text"]
+                elif sample["name"] in baseline:
+                    drift.append(word_error_rate(baseline[sample["name"]], transcribed["text"]))
+
+            summary = {
+                "backend": backend,
+                "model_size": args.model_size,
+                "load_seconds": round(run["load_seconds"], 2),
+                "audio_seconds": round(duration, 1),
+                "transcribe_seconds": round(seconds, 2),
+                "real_time_factor": round(seconds / duration, 4) if duration else None,
+                "peak_rss_mb": run["peak_rss_mb"],
+                "wer": round(float(np.mean(errors)), 4) if errors else None,
+                "drift": round(float(np.mean(drift)), 4) if drift else None,
+                "samples": run["samples"],
+            }
+            results.append(summary)
+            wer = f"{summary['wer']:.3f}" if summary["wer"] is not None else "-"
+            drift_text = f"{summary['drift']:.3f}" if summary["drift"] is not None else "-"
+            print(
+                f"{backend:12s} rtf={summary['real_time_factor']:.3f} "
+                f"carga={summary['load_seconds']:6.1f}s "
+                f"rss={summary['peak_rss_mb']:8.1f}MB wer={wer} drift={drift_text}"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
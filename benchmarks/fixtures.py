@@ -0,0 +1,176 @@
+"""
+Mídia sintética com vários interlocutores para os benchmarks.
+
+Cada interlocutor tem uma "voz" própria: frequência fundamental, timbre
+(pesos dos harmônicos) e ritmo de sílabas diferentes, com vibrato e pausas
+entre palavras. As falas se alternam com silêncios curtos e alguma fala
+simultânea, o suficiente para exercitar o VAD, a diarização e a atribuição
+de interlocutores sem depender de TTS nem de gravações reais.
+
+Junto com o áudio é gerado o roteiro: os turnos de cada interlocutor e os
+segmentos com palavras e tempos, no formato devolvido pelo whisper.transcribe,
+usados pelos modelos simulados e como referência.
+
+O WAV é gravado em blocos (float32 mono em AUDIO_SAMPLE_RATE, o formato de
+prepare_audio), então fixtures de horas não precisam caber na memória.
+"""
+import json
+import os
+import shutil
+import subprocess
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.audio_utils import wav_header
+from app.core.config import AUDIO_SAMPLE_RATE, FFMPEG_BINARY
+
+WORDS = (
+    "então a gente precisa fechar o orçamento do projeto até sexta porque o cliente pediu "
+    "uma nova proposta com prazo menor e a equipe de vendas quer apresentar o relatório na "
+    "reunião da próxima semana com os resultados do trimestre e o cronograma de entrega"
+).split()
+
+# (frequência fundamental em Hz, pesos dos harmônicos 1..5, sílabas por segundo)
+VOICES = (
+    (110.0, (1.0, 0.6, 0.35, 0.2, 0.1), 4.2),
+    (210.0, (1.0, 0.4, 0.3, 0.1, 0.05), 5.0),
+    (150.0, (1.0, 0.8, 0.2, 0.25, 0.05), 3.6),
+    (250.0, (1.0, 0.3, 0.15, 0.1, 0.02), 5.5),
+    (95.0, (1.0, 0.7, 0.5, 0.3, 0.2), 3.9),
+    (180.0, (1.0, 0.5, 0.4, 0.05, 0.05), 4.6),
+)
+
+BLOCK_SECONDS = 60
+
+def speaker_label(index: int) -> str:
+    return f"SPEAKER_{index:02d}"
+
+def plan_conversation(duration: float, speakers: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Sorteia os turnos e as palavras de uma conversa de `duration` segundos.
+
+    Returns:
+        {"turns": [{start_time, end_time, speaker}], "segments": [{start, end, text, words}]}
+        com tempos em segundos; segments segue o formato do whisper.transcribe
+    """
+    if not 1 <= speakers <= len(VOICES):
+        raise ValueError(f"speakers deve estar entre 1 e {len(VOICES)}")
+    rng = np.random.default_rng(seed)
+    turns, segments = [], []
+    t, previous = 0.5, -1
+    while t < duration - 1.0:
+        speaker = int(rng.integers(speakers))
+        if speakers > 1 and speaker == previous:
+            speaker = (speaker + 1) % speakers
+        length = float(min(rng.uniform(1.5, 9.0), duration - t))
+
+        # Palavras de 0,2 a 0,6 s separadas por pausas curtas; um segmento por turno
+        words, w = [], t
+        while w < t + length - 0.25:
+            word_end = min(w + float(rng.uniform(0.2, 0.6)), t + length)
+            words.append({'word': f" {WORDS[int(rng.integers(len(WORDS)))]}", 'start': round(w, 3), 'end': round(word_end, 3)})
+            w = word_end + float(rng.uniform(0.05, 0.2))
+        if words:
+            turns.append({'start_time': words[0]['start'], 'end_time': words[-1]['end'], 'speaker': speaker_label(speaker)})
+            segments.append({
+                'start': words[0]['start'],
+                'end': words[-1]['end'],
+                'text': "".join(word['word'] for word in words),
+                'words': words
+            })
+
+        previous = speaker
+        # 10% dos turnos começam antes do fim do anterior (fala simultânea)
+        gap = -float(rng.uniform(0.2, 0.8)) if rng.random() < 0.1 else float(rng.uniform(0.1, 1.2))
+        t += max(length + gap, 0.5)
+    return {'turns': turns, 'segments': segments}
+
+def _voice(speaker: int, times: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    f0, harmonics, syllable_rate = VOICES[speaker]
+    # Vibrato lento na fundamental e envelope silábico
+    phase = 2 * np.pi * f0 * times + 3.0 * np.sin(2 * np.pi * 5.0 * times)
+    signal = sum(weight * np.sin((k + 1) * phase) for k, weight in enumerate(harmonics))
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * syllable_rate * times) ** 2
+    return (signal * envelope).astype(np.float32) + rng.normal(0, 0.01, len(times)).astype(np.float32)
+
+def render_block(plan: Dict[str, Any], start: float, end: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Amostras de [start, end) da conversa: a voz de cada turno apenas nas palavras.
+    """
+    first = int(round(start * AUDIO_SAMPLE_RATE))
+    count = int(round(end * AUDIO_SAMPLE_RATE)) - first
+    block = rng.normal(0, 0.003, count).astype(np.float32)  # ruído de fundo
+    for turn, segment in zip(plan['turns'], plan['segments']):
+        if turn['end_time'] <= start or turn['start_time'] >= end:
+            continue
+        speaker = int(turn['speaker'].rsplit("_", 1)[1])
+        for word in segment['words']:
+            lo = max(int(round(word['start'] * AUDIO_SAMPLE_RATE)), first)
+            hi = min(int(round(word['end'] * AUDIO_SAMPLE_RATE)), first + count)
+            if hi <= lo:
+                continue
+            times = np.arange(lo, hi) / AUDIO_SAMPLE_RATE
+            block[lo - first:hi - first] += 0.12 * _voice(speaker, times, rng)
+    np.clip(block, -1.0, 1.0, out=block)
+    return block
+
+def write_fixture(directory: str, duration: float, speakers: int = 3, seed: int = 0,
+                  video: bool = False) -> Dict[str, Any]:
+    """
+    Grava (ou reaproveita) uma fixture em `directory`.
+
+    Args:
+        directory: Pasta das fixtures; arquivos existentes com o mesmo nome são reaproveitados
+        duration: Duração em segundos
+        speakers: Quantidade de interlocutores (1 a len(VOICES))
+        seed: Semente do sorteio dos turnos, palavras e ruído
+        video: Também gera um MP4 (imagem parada + o áudio em AAC), se o ffmpeg estiver disponível
+
+    Returns:
+        Dicionário com name, duration, speakers, audio_path, script_path e
+        video_path (None sem vídeo)
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"conversa_{int(duration)}s_{speakers}p_s{seed}"
+    audio_path = os.path.join(directory, f"{name}.wav")
+    script_path = os.path.join(directory, f"{name}.json")
+
+    if not (os.path.exists(audio_path) and os.path.exists(script_path)):
+        plan = plan_conversation(duration, speakers, seed)
+        rng = np.random.default_rng(seed + 1)
+        num_samples = int(round(duration * AUDIO_SAMPLE_RATE))
+        tmp_path = f"{audio_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(wav_header(num_samples))
+            for block_start in np.arange(0, duration, BLOCK_SECONDS):
+                render_block(plan, float(block_start), float(min(block_start + BLOCK_SECONDS, duration)), rng).tofile(f)
+        os.replace(tmp_path, audio_path)
+        with open(script_path, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False)
+
+    video_path: Optional[str] = None
+    if video and shutil.which(FFMPEG_BINARY):
+        video_path = os.path.join(directory, f"{name}.mp4")
+        if not os.path.exists(video_path):
+            subprocess.run([
+                FFMPEG_BINARY, "-y", "-loglevel", "error",
+                "-f", "lavfi", "-i", "color=c=black:s=320x240:r=5",
+                "-i", audio_path, "-shortest",
+                "-c:v", "libx264", "-tune", "stillimage", "-pix_fmt", "yuv420p",
+                "-c:a", "aac", "-b:a", "64k", f"{video_path}.tmp.mp4"
+            ], check=True)
+            os.replace(f"{video_path}.tmp.mp4", video_path)
+
+    return {
+        "name": name,
+        "duration": duration,
+        "speakers": speakers,
+        "audio_path": audio_path,
+        "script_path": script_path,
+        "video_path": video_path,
+    }
+
+def load_script(script_path: str) -> Dict[str, Any]:
+    with open(script_path, encoding="utf-8") as f:
+        return json.load(f)
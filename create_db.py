@@ -44,10 +44,10 @@ def create_tables():
     """
     try:
         from app.models.schema import Base
-        from app.core.database import engine
+        from app.core.database import migrate
         
-        # Cria todas as tabelas definidas nos modelos
-        Base.metadata.create_all(bind=engine)
+        # Cria as tabelas definidas nos modelos e aplica as mudanças de esquema
+        migrate(Base.metadata)
         print("Tabelas criadas com sucesso!")
     except Exception as e:
         print(f"Erro ao criar tabelas: {str(e)}")
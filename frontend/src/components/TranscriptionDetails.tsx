@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { Transcription } from '../types';
+import { Transcription, TranscriptionEvent } from '../types';
 import { api } from '../services/api';
 
 export const TranscriptionDetails = () => {
@@ -8,6 +8,7 @@ export const TranscriptionDetails = () => {
   const [transcription, setTranscription] = useState<Transcription | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [progress, setProgress] = useState<TranscriptionEvent | null>(null);
 
   useEffect(() => {
     const fetchTranscription = async () => {
@@ -26,6 +27,17 @@ export const TranscriptionDetails = () => {
     fetchTranscription();
   }, [id]);
 
+  useEffect(() => {
+    if (!id) return;
+    return api.subscribeToEvents(parseInt(id), (event) => {
+      if (event.stage === 'job') {
+        setTranscription((current) => current && { ...current, status: event.status });
+      } else {
+        setProgress(event);
+      }
+    });
+  }, [id]);
+
   if (loading) {
     return (
       <div className="flex justify-center items-center h-32">
@@ -79,6 +91,13 @@ export const TranscriptionDetails = () => {
                     'bg-yellow-100 text-yellow-800'}`}>
                   {transcription.status}
                 </span>
+                {transcription.status === 'processing' && progress && (
+                  <span className="ml-2 text-xs text-gray-500">
+                    {progress.stage} {progress.progress !== undefined
+                      ? `${Math.round(progress.progress * 100)}%`
+                      : progress.status}
+                  </span>
+                )}
               </dd>
             </div>
             <div className="bg-gray-50 px-4 py-5 sm:grid sm:grid-cols-3 sm:gap-4 sm:px-6">
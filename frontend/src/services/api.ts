@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Transcription } from '../types';
+import { SearchHit, Transcription, TranscriptionEvent, TranscriptionSegment } from '../types';
 
 const API_URL = 'http://localhost:8000/api';
 
@@ -25,4 +25,37 @@ export const api = {
     const response = await axios.get(`${API_URL}/transcripts/${id}`);
     return response.data;
   },
+
+  async getSegments(id: number, start?: number, end?: number): Promise<TranscriptionSegment[]> {
+    const response = await axios.get(`${API_URL}/transcripts/${id}/segments`, {
+      params: { start, end },
+    });
+    return response.data;
+  },
+
+  async reprocess(id: number, stages: string[]): Promise<Transcription> {
+    const response = await axios.post(`${API_URL}/transcripts/${id}/reprocess`, null, {
+      params: { stages: stages.join(',') },
+    });
+    return response.data;
+  },
+
+  async search(q: string, transcriptionId?: number): Promise<SearchHit[]> {
+    const response = await axios.get(`${API_URL}/search`, {
+      params: { q, transcription_id: transcriptionId },
+    });
+    return response.data;
+  },
+
+  subscribeToEvents(id: number, onEvent: (event: TranscriptionEvent) => void): () => void {
+    const source = new EventSource(`${API_URL}/transcripts/${id}/events`);
+    source.onmessage = (message) => {
+      const event: TranscriptionEvent = JSON.parse(message.data);
+      onEvent(event);
+      if (event.stage === 'job' && (event.status === 'completed' || event.status === 'failed')) {
+        source.close();
+      }
+    };
+    return () => source.close();
+  },
 }; 
\ No newline at end of file
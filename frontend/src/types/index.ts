@@ -5,6 +5,14 @@ export interface Transcription {
   transcript_filename: string;
   created_at: string;
   status: string;
+  model_size?: string | null;
+  whisper_backend?: string | null;
+}
+
+export interface WordTimestamp {
+  word: string;
+  start: number;
+  end: number;
 }
 
 export interface TranscriptionSegment {
@@ -14,4 +22,24 @@ export interface TranscriptionSegment {
   end_time: number;
   speaker: string;
   text: string;
-} 
\ No newline at end of file
+  words?: WordTimestamp[];
+}
+
+export interface TranscriptionEvent {
+  transcription_id: number;
+  stage: string;
+  status: string;
+  timestamp: number;
+  progress?: number;
+  [detail: string]: unknown;
+}
+
+export interface SearchHit {
+  transcription_id: number;
+  segment_id: number;
+  start_time: number;
+  end_time: number;
+  speaker?: string | null;
+  snippet: string;
+  rank: number;
+}
@@ -7,9 +7,12 @@ setup(
     install_requires=[
         "fastapi==0.104.1",
         "uvicorn==0.24.0",
+        "websockets==12.0",
         "python-multipart==0.0.6",
-        "sqlalchemy==2.0.23",
+        "sqlalchemy[asyncio]==2.0.23",
         "psycopg2-binary==2.9.9",
+        "asyncpg==0.29.0",
+        "aiosqlite==0.19.0",
         "pydantic==2.5.2",
         "python-dotenv==1.0.0",
         "openai-whisper==20231117",
@@ -20,4 +23,13 @@ setup(
         "bcrypt==4.0.1",
         "pyannote.audio==3.1.1",
     ],
+    extras_require={
+        # Backend de inferência ctranslate2 (WHISPER_BACKEND=ctranslate2)
+        "ctranslate2": ["faster-whisper==1.0.3"],
+        # Métricas em /metrics e spans do OpenTelemetry (OTEL_TRACING_ENABLED=true)
+        "metrics": ["prometheus-client==0.19.0"],
+        "tracing": ["opentelemetry-api==1.21.0", "opentelemetry-sdk==1.21.0"],
+        # Compressão zstd das transcrições (ARTIFACT_COMPRESSION=zstd)
+        "zstd": ["zstandard==0.22.0"],
+    },
 ) 
\ No newline at end of file
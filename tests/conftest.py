@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+# A configuração é lida na importação de app.*: os testes usam um SQLite e um
+# armazenamento temporários, a menos que o ambiente defina outros
+_TEST_DIR = tempfile.mkdtemp(prefix="transcriber-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'api.db')}")
+os.environ.setdefault("STORE_DIR", os.path.join(_TEST_DIR, "store"))
+os.environ.setdefault("EVENTS_BACKEND", "memory")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.search import ensure_search_index
+from app.models.schema import Base
+
+@pytest.fixture
+def db():
+    """
+    Sessão em um SQLite em memória com o esquema completo e a busca textual.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def postgres_db():
+    """
+    Sessão em um PostgreSQL de testes (TEST_POSTGRES_URL, driver psycopg2),
+    desfeita ao final; pulado sem a variável.
+    """
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL não definido")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(bind=connection, join_transaction_mode="create_savepoint")()
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+        engine.dispose()
+
+@pytest.fixture
+def client():
+    """
+    Cliente da API sobre o banco de DATABASE_URL, esvaziado ao final.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.core.database import engine
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from app.core.database import SessionLocal
+from app.core.segment_store import save_segments
+from app.models.schema import Transcription
+
+def _add_transcriptions(created_at):
+    with SessionLocal() as db:
+        transcriptions = [
+            Transcription(video_filename=f"v{i}.mp4", audio_filename="", transcript_filename="",
+                          status="completed" if i % 2 else "queued", created_at=moment)
+            for i, moment in enumerate(created_at)
+        ]
+        db.add_all(transcriptions)
+        db.commit()
+        return [transcription.id for transcription in transcriptions]
+
+def _pages(client, url, params):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url, params=dict(params, **({"cursor": cursor} if cursor else {})))
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+def test_transcript_pages_follow_the_cursor(client):
+    base = datetime(2026, 1, 1)
+    # Horários repetidos: o id desempata
+    ids = _add_transcriptions([base, base, base + timedelta(minutes=1), base, base + timedelta(minutes=2)])
+    expected = sorted(ids, key=lambda i: ({ids[2]: 1, ids[4]: 2}.get(i, 0), i), reverse=True)
+
+    assert _pages(client, "/api/transcripts", {"limit": 2}) == expected
+    assert _pages(client, "/api/transcripts", {"limit": 2, "status": "completed"}) == [ids[3], ids[1]]
+
+def test_transcript_list_etag(client):
+    _add_transcriptions([datetime(2026, 1, 1)])
+    first = client.get("/api/transcripts", params={"fields": "id,status"})
+    assert list(first.json()[0]) == ["id", "status"]
+
+    cached = client.get("/api/transcripts", params={"fields": "id,status"},
+                        headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+    _add_transcriptions([datetime(2026, 1, 2)])
+    changed = client.get("/api/transcripts", params={"fields": "id,status"},
+                         headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200 and changed.headers["ETag"] != first.headers["ETag"]
+
+def test_invalid_cursor(client):
+    assert client.get("/api/transcripts", params={"cursor": "inválido"}).status_code == 400
+    assert client.get("/api/transcripts", params={"fields": "id,nada"}).status_code == 400
+
+def test_segment_pages_follow_the_cursor(client):
+    transcription_id = _add_transcriptions([datetime(2026, 1, 1)])[0]
+    segments = [
+        {'start_time': float(start), 'end_time': float(start) + 1, 'speaker': speaker, 'text': f" parte {i}"}
+        for i, (start, speaker) in enumerate([(0, "A"), (1, "B"), (1, "A"), (2, "A"), (3, "B")])
+    ]
+    with SessionLocal() as db:
+        save_segments(db, transcription_id, segments, store_blob=False)
+        db.commit()
+
+    url = f"/api/transcripts/{transcription_id}/segments"
+    everything = client.get(url).json()
+    assert [segment["text"] for segment in everything] == [segment["text"] for segment in segments]
+    assert _pages(client, url, {"limit": 2}) == [segment["id"] for segment in everything]
+    assert _pages(client, url, {"limit": 1, "speaker": "A", "start": 1, "end": 2}) == [
+        segment["id"] for segment in everything
+        if segment["speaker"] == "A" and segment["end_time"] >= 1 and segment["start_time"] <= 2
+    ]
+
+def test_search(client):
+    transcription_id = _add_transcriptions([datetime(2026, 1, 1)])[0]
+    with SessionLocal() as db:
+        save_segments(db, transcription_id, [
+            {'start_time': 0.0, 'end_time': 1.0, 'speaker': "A", 'text': " A reunião começa agora"},
+            {'start_time': 1.0, 'end_time': 2.0, 'speaker': "B", 'text': " Bom dia a todos"},
+        ], store_blob=False)
+        db.commit()
+
+    hits = client.get("/api/search", params={"q": "reuniao"}).json()
+    assert [(hit["speaker"], hit["transcription_id"]) for hit in hits] == [("A", transcription_id)]
+    assert "<mark>reunião</mark>" in hits[0]["snippet"]
+    assert client.get("/api/search", params={"q": '"bom dia"', "speaker": "A"}).json() == []
@@ -0,0 +1,23 @@
+import gzip
+import json
+
+import pytest
+
+from app.core.artifacts import read_json, write_json
+
+DATA = {'text': " Olá", 'segments': [{'start': 0.0, 'end': 1.25, 'text': " Olá"}], 'language': "pt"}
+
+@pytest.mark.parametrize("suffix", [".json", ".json.gz", ".json.zst"])
+def test_round_trip(tmp_path, suffix):
+    if suffix == ".json.zst":
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / f"artefato{suffix}")
+    write_json(path, DATA)
+    assert read_json(path) == DATA
+    assert not (tmp_path / f"artefato{suffix}.tmp").exists()
+
+def test_gzip_is_compact_json(tmp_path):
+    path = tmp_path / "artefato.json.gz"
+    write_json(str(path), DATA)
+    payload = gzip.decompress(path.read_bytes()).decode("utf-8")
+    assert payload == json.dumps(DATA, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import jobs
+from app.core.jobs import claim_job, enqueue_job, fail_job
+from app.models.schema import Transcription, TranscriptionJob
+
+def _enqueue(db, media_seconds=60.0, priority=None, tenant_id="default"):
+    transcription = Transcription(video_filename="v.mp4", audio_filename="", transcript_filename="",
+                                  status="queued", model_size="base")
+    db.add(transcription)
+    db.flush()
+    job = enqueue_job(db, transcription, "/tmp/v.mp4", media_seconds=media_seconds,
+                      priority=priority, tenant_id=tenant_id)
+    db.commit()
+    return job
+
+def test_claims_each_job_once(db):
+    first, second = _enqueue(db), _enqueue(db)
+    claimed = [claim_job(db, "h1:1:0:0"), claim_job(db, "h1:1:0:1"), claim_job(db, "h1:1:0:2")]
+    assert [job and job.id for job in claimed] == [first.id, second.id, None]
+    assert claimed[0].status == "running" and claimed[0].attempts == 1
+    assert claimed[0].locked_by == "h1:1:0:0"
+
+def test_running_cap(db, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_RUNNING_JOBS", 1)
+    _enqueue(db), _enqueue(db)
+    assert claim_job(db, "h1:1:0:0") is not None
+    assert claim_job(db, "h1:1:0:1") is None
+    assert db.query(TranscriptionJob).filter_by(status="running").count() == 1
+
+@pytest.mark.parametrize("cap", [0, 1])
+def test_no_transaction_left_open_without_a_claim(db, monkeypatch, cap):
+    monkeypatch.setattr(jobs, "MAX_RUNNING_JOBS", cap)
+    _enqueue(db)
+    claim_job(db, "h1:1:0:0")
+    # Fila vazia (cap=0) ou limite atingido (cap=1)
+    assert claim_job(db, "h1:1:0:1") is None
+    assert not db.in_transaction()
+
+def test_no_transaction_left_open_when_nothing_is_admitted(db, monkeypatch):
+    monkeypatch.setattr(jobs, "order_candidates", lambda *args: [])
+    _enqueue(db)
+    assert claim_job(db, "h1:1:0:0") is None
+    assert not db.in_transaction()
+
+def test_failed_job_is_retried_with_backoff(db, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE_SECONDS", 30)
+    job = _enqueue(db)
+    job.max_attempts = 2
+    db.commit()
+
+    claimed = claim_job(db, "h1:1:0:0")
+    assert fail_job(db, claimed, "erro") is True
+    assert claimed.status == "queued" and claimed.locked_by is None
+    assert claimed.available_at > datetime.utcnow() + timedelta(seconds=25)
+    assert claim_job(db, "h1:1:0:0") is None  # ainda no backoff
+
+    claimed.available_at = datetime.utcnow()
+    db.commit()
+    claimed = claim_job(db, "h1:1:0:0")
+    assert claimed.attempts == 2
+    assert fail_job(db, claimed, "erro") is False
+    assert claimed.status == "failed"
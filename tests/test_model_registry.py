@@ -0,0 +1,49 @@
+import gc
+import weakref
+
+import numpy as np
+
+from app.core import transcription
+from app.core.model_registry import ModelRegistry
+
+class FakeModel:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_evicts_least_recently_used_without_closing_it():
+    registry = ModelRegistry(max_bytes=10 ** 12, max_entries=2)
+    first = registry._get(("whisper", "a"), FakeModel)
+    registry._get(("whisper", "b"), FakeModel)
+    registry._get(("whisper", "a"), FakeModel)  # "b" passa a ser o menos usado
+    registry._get(("whisper", "c"), FakeModel)
+
+    assert set(registry.loaded()) == {"whisper:a", "whisper:c"}
+    assert registry._get(("whisper", "a"), FakeModel) is first
+    assert not first.closed
+
+class FakeBackend:
+    supports_batch = True
+
+def test_evicted_transcriber_stays_usable_until_released(monkeypatch):
+    monkeypatch.setattr(transcription, "create_backend", lambda *args: FakeBackend())
+    monkeypatch.setattr(transcription, "LONGFORM_WORKERS", 2)
+    registry = ModelRegistry(max_bytes=10 ** 12, max_entries=1)
+    held = registry._get(("whisper", "a"), lambda: transcription.WhisperTranscriber("tiny"))
+    held.transcribe_batch = lambda audios: [{"text": "", "segments": [], "language": "pt"} for _ in audios]
+    batcher = held._get_batcher()
+    pool = held._get_chunk_pool()
+
+    registry._get(("whisper", "b"), FakeModel)  # descarta "a", ainda em uso
+    assert registry.loaded() == {"whisper:b": 0}
+    assert batcher.submit(np.zeros(16000, dtype=np.float32)).result(timeout=5)["segments"] == []
+    assert not pool._shutdown_thread
+
+    released = weakref.ref(held)
+    del held
+    gc.collect()
+    assert released() is None
+    assert pool._shutdown_thread
+    batcher._thread.join(timeout=5)
+    assert not batcher._thread.is_alive()
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import scheduler
+from app.core.scheduler import AdmissionRejected, check_admission, host_overcommitted, order_candidates
+from app.models.schema import Transcription, TranscriptionJob
+
+GB = 1024 ** 3
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+def _job(job_id, priority="standard", tenant="default", waited=0.0, memory=GB, cost=60.0, locked_by=None):
+    return SimpleNamespace(
+        id=job_id, priority=priority, tenant_id=tenant, available_at=NOW - timedelta(seconds=waited),
+        memory_bytes=memory, cost_seconds=cost, locked_by=locked_by
+    )
+
+@pytest.fixture(autouse=True)
+def host(monkeypatch):
+    # Host com 4 slots, 1 reservado a interactive, e 8 GB de orçamento
+    monkeypatch.setattr(scheduler, "WORKER_PROCESSES", 2)
+    monkeypatch.setattr(scheduler, "WORKER_JOB_CONCURRENCY", 2)
+    monkeypatch.setattr(scheduler, "SCHEDULER_INTERACTIVE_SLOTS", 1)
+    monkeypatch.setattr(scheduler, "SCHEDULER_MEMORY_BUDGET_BYTES", 8 * GB)
+    monkeypatch.setattr(scheduler, "SCHEDULER_AGING_SECONDS", 600)
+
+def _ids(jobs):
+    return [job.id for job in jobs]
+
+def test_orders_by_class_then_age():
+    candidates = [_job(1, "batch", waited=50), _job(2, "standard", waited=10),
+                  _job(3, "interactive"), _job(4, "standard", waited=20)]
+    assert _ids(order_candidates(candidates, [], "h1:1:0:0", NOW)) == [3, 4, 2, 1]
+
+def test_aging_promotes_waiting_jobs():
+    candidates = [_job(1, "batch", waited=1300), _job(2, "standard", waited=10)]
+    # 1300 s = duas classes acima: batch passa à frente de standard
+    assert _ids(order_candidates(candidates, [], "h1:1:0:0", NOW)) == [1, 2]
+
+def test_fair_share_prefers_the_least_loaded_tenant():
+    running = [_job(10, tenant="a", cost=600, locked_by="h2:1:0:0")]
+    candidates = [_job(1, tenant="a", waited=100), _job(2, tenant="b", waited=10)]
+    assert _ids(order_candidates(candidates, running, "h1:1:0:0", NOW)) == [2, 1]
+
+def test_memory_budget_of_the_host():
+    running = [_job(10, memory=6 * GB, locked_by="h1:1:0:0")]
+    candidates = [_job(1, "interactive", memory=3 * GB), _job(2, "interactive", memory=GB)]
+    assert _ids(order_candidates(candidates, running, "h1:1:0:1", NOW)) == [2]
+    # Outro host tem o orçamento livre
+    assert _ids(order_candidates(candidates, running, "h2:1:0:0", NOW)) == [1, 2]
+
+def test_job_larger_than_the_budget_runs_alone():
+    huge = _job(1, memory=20 * GB)
+    assert _ids(order_candidates([huge], [], "h1:1:0:0", NOW)) == [1]
+    assert order_candidates([huge], [_job(10, memory=GB, locked_by="h1:1:0:0")], "h1:1:0:1", NOW) == []
+
+def test_reserves_slots_for_interactive():
+    running = [_job(10 + i, memory=GB // 8, locked_by=f"h1:1:0:{i}") for i in range(3)]
+    candidates = [_job(1, "standard"), _job(2, "interactive")]
+    assert _ids(order_candidates(candidates, running, "h1:1:1:0", NOW)) == [2]
+
+def test_host_overcommitted_after_a_concurrent_claim():
+    claimed = _job(1, memory=5 * GB, locked_by="h1:1:0:0")
+    other = _job(2, memory=5 * GB, locked_by="h1:2:0:0")
+    assert host_overcommitted(claimed, [claimed, other], "h1:1:0:0")
+    assert not host_overcommitted(claimed, [claimed], "h1:1:0:0")
+    assert not host_overcommitted(claimed, [claimed, _job(2, memory=5 * GB, locked_by="h2:1:0:0")], "h1:1:0:0")
+
+def _pending(db, tenant, cost, status="queued", priority="standard"):
+    transcription = Transcription(video_filename="v.mp4", audio_filename="", transcript_filename="")
+    db.add(transcription)
+    db.flush()
+    db.add(TranscriptionJob(transcription_id=transcription.id, video_path="/tmp/v.mp4", status=status,
+                            max_attempts=3, tenant_id=tenant, priority=priority, cost_seconds=cost))
+    db.commit()
+
+def test_admission_limits_pending_work_per_tenant(db, monkeypatch):
+    monkeypatch.setattr(scheduler, "SCHEDULER_TENANT_MAX_SECONDS", 1000)
+    monkeypatch.setattr(scheduler, "SCHEDULER_MAX_WAIT_SECONDS", 0)
+    _pending(db, "a", 900)
+    _pending(db, "a", 500, status="completed")
+
+    check_admission(db, "a", "standard", 100)
+    check_admission(db, "b", "standard", 900)
+    with pytest.raises(AdmissionRejected) as rejected:
+        check_admission(db, "a", "standard", 200)
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+
+def test_admission_limits_the_estimated_wait(db, monkeypatch):
+    monkeypatch.setattr(scheduler, "SCHEDULER_TENANT_MAX_SECONDS", 0)
+    monkeypatch.setattr(scheduler, "SCHEDULER_MAX_WAIT_SECONDS", 100)
+    monkeypatch.setattr(scheduler, "SCHEDULER_SLOTS", 2)
+    _pending(db, "a", 150, status="running")
+    _pending(db, "a", 100, priority="batch")
+
+    # À frente de um interactive ficam só os 150 s em execução: 75 s de espera
+    check_admission(db, "b", "interactive")
+    with pytest.raises(AdmissionRejected) as rejected:
+        check_admission(db, "b", "batch")
+    assert rejected.value.status_code == 503
+    assert rejected.value.retry_after == 25
@@ -0,0 +1,66 @@
+import pytest
+
+from app.core.segment_store import _copy_buffer, load_segments, rename_speaker, save_segments
+from app.models.schema import Transcription, TranscriptionSegment, TranscriptionSegmentBlob
+
+SEGMENTS = [
+    {'start_time': 0.0, 'end_time': 1.5, 'speaker': "SPEAKER_00", 'text': " Olá, \"mundo\"",
+     'words': [{'word': " Olá,", 'start': 0.0, 'end': 0.6}, {'word': " \"mundo\"", 'start': 0.7, 'end': 1.5}]},
+    {'start_time': 1.5, 'end_time': 2.0, 'speaker': "", 'text': ""},
+    {'start_time': 2.0, 'end_time': 3.25, 'speaker': "SPEAKER_01", 'text': " linha\nquebrada"},
+]
+
+def _transcription(session):
+    transcription = Transcription(video_filename="v.mp4", audio_filename="", transcript_filename="")
+    session.add(transcription)
+    session.flush()
+    return transcription.id
+
+def _round_trip(session, store_blob):
+    transcription_id = _transcription(session)
+    save_segments(session, transcription_id, SEGMENTS, store_blob=store_blob)
+    session.flush()
+    return load_segments(session, transcription_id)
+
+@pytest.mark.parametrize("store_blob", [False, True])
+def test_round_trip(db, store_blob):
+    assert _round_trip(db, store_blob) == SEGMENTS
+
+def test_round_trip_copy(postgres_db):
+    assert _round_trip(postgres_db, store_blob=False) == SEGMENTS
+
+def test_save_replaces_previous_segments(db):
+    transcription_id = _transcription(db)
+    save_segments(db, transcription_id, SEGMENTS, store_blob=False)
+    save_segments(db, transcription_id, SEGMENTS[:1], store_blob=False)
+    assert load_segments(db, transcription_id) == SEGMENTS[:1]
+
+def test_copy_buffer_distinguishes_null_from_empty_text():
+    rows = [{'transcription_id': 7, 'start_time': 1.5, 'end_time': 2.0, 'speaker': "", 'text': "", 'words': None}]
+    line = _copy_buffer(rows).getvalue()
+    # Sem aspas só o NULL; o texto vazio vai entre aspas
+    assert line == '7,1.5,2.0,"","",\n'
+
+def _renamed(segments, previous, name):
+    return [dict(segment, speaker=name if segment['speaker'] == previous else segment['speaker'])
+            for segment in segments]
+
+@pytest.mark.parametrize("store_blob", [False, True])
+def test_rename_speaker_keeps_segment_ids(db, store_blob):
+    transcription_id = _transcription(db)
+    save_segments(db, transcription_id, SEGMENTS, store_blob=store_blob)
+    ids = [row.id for row in db.query(TranscriptionSegment).order_by(TranscriptionSegment.id)]
+
+    rename_speaker(db, transcription_id, "SPEAKER_00", "Ana", store_blob=store_blob)
+
+    assert [row.id for row in db.query(TranscriptionSegment).order_by(TranscriptionSegment.id)] == ids
+    assert load_segments(db, transcription_id) == _renamed(SEGMENTS, "SPEAKER_00", "Ana")
+
+def test_rename_speaker_drops_stale_blob_when_disabled(db):
+    transcription_id = _transcription(db)
+    save_segments(db, transcription_id, SEGMENTS, store_blob=True)
+
+    rename_speaker(db, transcription_id, "SPEAKER_01", "Bruno", store_blob=False)
+
+    assert db.query(TranscriptionSegmentBlob).count() == 0
+    assert load_segments(db, transcription_id) == _renamed(SEGMENTS, "SPEAKER_01", "Bruno")
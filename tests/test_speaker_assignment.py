@@ -0,0 +1,33 @@
+import pytest
+
+from app.core.speaker_assignment import assign_speakers
+from benchmarks.bench_speaker_assignment import legacy_assign, synthetic_inputs, with_long_turn
+
+def _speakers(segments):
+    return [segment['speaker'] for segment in segments]
+
+@pytest.mark.parametrize("long_turn", [False, True])
+def test_matches_legacy_loop(long_turn):
+    segments, turns = synthetic_inputs(500, 400, seed=1)
+    if long_turn:
+        turns = with_long_turn(turns, max(turn['end_time'] for turn in turns))
+    expected = legacy_assign([dict(s) for s in segments], turns)
+    assert _speakers(assign_speakers([dict(s) for s in segments], turns)) == _speakers(expected)
+
+def test_touching_and_ties():
+    turns = [
+        {"start_time": 0.0, "end_time": 10.0, "speaker": "A"},
+        {"start_time": 0.0, "end_time": 10.0, "speaker": "B"},
+        {"start_time": 10.0, "end_time": 12.0, "speaker": "C"},
+        {"start_time": 20.0, "end_time": 20.0, "speaker": "D"},
+    ]
+    segments = [
+        {"start_time": 2.0, "end_time": 4.0},     # empate entre A e B: vence o primeiro
+        {"start_time": 10.0, "end_time": 11.0},   # toca A e B, sobrepõe C
+        {"start_time": 12.0, "end_time": 13.0},   # só toca C
+        {"start_time": 19.0, "end_time": 21.0},   # contém o turno de duração zero
+        {"start_time": 30.0, "end_time": 31.0},   # nenhum turno
+    ]
+    expected = legacy_assign([dict(s) for s in segments], turns)
+    assert _speakers(assign_speakers(segments, turns)) == _speakers(expected) == ["A", "C", "C", "D", "unknown"]
+
@@ -0,0 +1,44 @@
+import os
+
+from app.core.storage import ContentStore, artifact_digest
+
+def _write(store, digest, suffix, size, mtime):
+    path = store.path_for(digest, suffix)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+def test_evict_keeps_protected_derived_artifacts(tmp_path):
+    store = ContentStore(str(tmp_path))
+    content_hash = "a" * 64
+    transcript_digest = artifact_digest(content_hash, "small", "pt")
+    transcript = _write(store, transcript_digest, ".json.gz", 100, 1000)
+    audio = _write(store, content_hash, ".flac", 100, 1001)
+    orphan = _write(store, artifact_digest("b" * 64, "small", "pt"), ".json.gz", 100, 1002)
+
+    freed = store.evict(max_bytes=100, protected_digests=[transcript_digest])
+
+    assert freed == 200
+    assert os.path.exists(transcript)
+    assert not os.path.exists(audio) and not os.path.exists(orphan)
+
+def test_evict_media_ignores_json(tmp_path):
+    store = ContentStore(str(tmp_path))
+    transcript = _write(store, "c" * 64, ".json.gz", 100, 1000)
+    audio = _write(store, "d" * 64, ".wav", 100, 1001)
+
+    assert store.evict_media(max_bytes=0) == 100
+    assert os.path.exists(transcript) and not os.path.exists(audio)
+
+def test_evict_tolerates_files_removed_concurrently(tmp_path, monkeypatch):
+    store = ContentStore(str(tmp_path))
+    gone = _write(store, "e" * 64, ".wav", 100, 1000)
+    kept = _write(store, "f" * 64, ".wav", 100, 1001)
+    listed = list(store.artifacts())
+    os.remove(gone)  # descartado por outro processo depois da varredura
+    monkeypatch.setattr(store, "artifacts", lambda suffix=None: iter(listed))
+
+    assert store.evict(max_bytes=100) == 0
+    assert os.path.exists(kept)
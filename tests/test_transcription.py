@@ -0,0 +1,78 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from app.core import transcription
+from app.core.config import AUDIO_SAMPLE_RATE
+
+class FakeBackend:
+    supports_batch = True
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        segment = {"start": 0.0, "end": 1.0, "text": " oi"}
+        if options.get("word_timestamps"):
+            segment["words"] = [{"word": " oi", "start": 0.0, "end": 1.0}]
+        return {"text": " oi", "segments": [segment], "language": "pt"}
+
+class FakeBatcher:
+    def __init__(self):
+        self.clips = 0
+
+    def submit(self, audio):
+        self.clips += 1
+        future = Future()
+        future.set_result({"text": " oi", "segments": [{"start": 0.0, "end": 1.0, "text": " oi"}], "language": "pt"})
+        return future
+
+@pytest.fixture
+def transcriber(monkeypatch):
+    monkeypatch.setattr(transcription, "create_backend", lambda *args: FakeBackend())
+    monkeypatch.setattr(transcription, "WHISPER_BATCH_SIZE", 4)
+    monkeypatch.setattr(transcription, "LONGFORM_MIN_SECONDS", 0)
+    transcriber = transcription.WhisperTranscriber("tiny")
+    transcriber._batcher = FakeBatcher()
+    return transcriber
+
+def _clip(seconds=5):
+    return np.zeros(int(seconds * AUDIO_SAMPLE_RATE), dtype=np.float32)
+
+def test_word_timestamps_skip_the_batcher(transcriber, monkeypatch):
+    monkeypatch.setitem(transcription.TRANSCRIBE_OPTIONS, "word_timestamps", True)
+    result = transcriber.transcribe_audio(_clip())
+    assert transcriber._batcher.clips == 0
+    assert transcriber.backend.calls[0]["word_timestamps"] is True
+    assert all("words" in segment for segment in result["segments"])
+
+def test_short_clips_are_batched_without_word_timestamps(transcriber, monkeypatch):
+    monkeypatch.setitem(transcription.TRANSCRIBE_OPTIONS, "word_timestamps", False)
+    transcriber.transcribe_audio(_clip())
+    assert transcriber._batcher.clips == 1
+    assert transcriber.backend.calls == []
+
+def test_micro_batcher_groups_concurrent_clips(transcriber):
+    calls = []
+
+    def transcribe_batch(audios):
+        calls.append(len(audios))
+        return [{"text": f" {len(audio)}", "segments": [], "language": "pt"} for audio in audios]
+
+    transcriber.transcribe_batch = transcribe_batch
+    batcher = transcription._MicroBatcher(transcriber, batch_size=3, max_wait=5)
+    futures = [batcher.submit(np.zeros(size, dtype=np.float32)) for size in (10, 20, 30)]
+
+    assert [future.result(timeout=5)["text"] for future in futures] == [" 10", " 20", " 30"]
+    assert calls == [3]
+
+def test_micro_batcher_propagates_errors(transcriber):
+    def transcribe_batch(audios):
+        raise RuntimeError("falhou")
+
+    transcriber.transcribe_batch = transcribe_batch
+    batcher = transcription._MicroBatcher(transcriber, batch_size=2, max_wait=0.01)
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.zeros(10, dtype=np.float32)).result(timeout=5)